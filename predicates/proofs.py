@@ -4,7 +4,7 @@
     File name: code/predicates/proofs.py """
 
 from predicates.syntax import *
-from propositions.semantics import is_tautology
+from propositions.cache import shared_cache
 
 
 class Schema:
@@ -287,7 +287,7 @@ class Proof:
         formula = self.lines[line].formula
         prop_formula = PropositionalFormula.from_infix(formula.propositional_skeleton().infix())
         assert type(prop_formula) is PropositionalFormula
-        return is_tautology(prop_formula)
+        return shared_cache().is_tautology(prop_formula)
 
     def verify_mp_justification(self, line):
         """ Returns whether the line with the given number is validly obtained
@@ -0,0 +1,194 @@
+""" (c) This file is part of the course
+    Mathematical Logic through Programming
+    by Gonczarowski and Nisan.
+    File name: code/propositions/arena.py """
+
+from array import array
+
+from propositions.syntax import *
+from propositions.syntax import _tokenize, _parse_infix, _parse_prefix
+
+# Op codes of arena nodes. A variable node keeps the index of its name in the
+# arena's name table as its first child.
+VARIABLE = 0
+OPERATORS = [None, 'T', 'F', '~', '&', '|', '->', '<->', '-&', '-|', '?:']
+OP_CODES = {operator: code for code, operator in enumerate(OPERATORS) if operator is not None}
+TRUE_CODE, FALSE_CODE, NOT_CODE, AND_CODE, OR_CODE, IMP_CODE, IFF_CODE, NAND_CODE, NOR_CODE, \
+    MUX_CODE = range(1, len(OPERATORS))
+
+# Child index stored for a missing operand
+NO_CHILD = -1
+
+
+class FormulaArena:
+    """ A compact store of propositional formulae. Every node is a position in
+        four parallel typed arrays (its op code and the indices of its first,
+        second and third operands), and every operand is added before the
+        nodes that use it, so a node index is always larger than the indices
+        of its operands. Formulae added in one call share equal subformulae """
+
+    def __init__(self):
+        self.ops = array('B')
+        self.firsts = array('q')
+        self.seconds = array('q')
+        self.thirds = array('q')
+        self.names = []
+        self._name_indices = {}
+
+    def __len__(self):
+        return len(self.ops)
+
+    def nbytes(self):
+        """ Return the number of bytes used by the node arrays of self """
+        return sum(table.itemsize * len(table) for table in
+                   (self.ops, self.firsts, self.seconds, self.thirds))
+
+    def _make(self, root, first=None, second=None, third=None):
+        """ Append a node with the given root and operand indices, and return
+            its index """
+        if is_variable(root):
+            name_index = self._name_indices.get(root)
+            if name_index is None:
+                name_index = self._name_indices[root] = len(self.names)
+                self.names.append(root)
+            self.ops.append(VARIABLE)
+            self.firsts.append(name_index)
+        else:
+            self.ops.append(OP_CODES[root])
+            self.firsts.append(NO_CHILD if first is None else first)
+        self.seconds.append(NO_CHILD if second is None else second)
+        self.thirds.append(NO_CHILD if third is None else third)
+        return len(self.ops) - 1
+
+    def add(self, formula):
+        """ Add the given Formula to self and return the index of its root """
+        return self.add_many([formula])[0]
+
+    def add_many(self, formulae):
+        """ Add the given formulae to self and return the list of the indices
+            of their roots. Subformulae shared between them are stored once """
+        indices = {}
+        roots = []
+        for formula in formulae:
+            stack = [formula]
+            while stack:
+                node = stack[-1]
+                if node in indices:
+                    stack.pop()
+                    continue
+                operands = node.operands()
+                missing = [operand for operand in operands if operand not in indices]
+                if missing:
+                    stack.extend(missing)
+                    continue
+                stack.pop()
+                indices[node] = self._make(node.root, *[indices[operand] for operand in operands])
+            roots.append(indices[formula])
+        return roots
+
+    def add_infix(self, s):
+        """ Parse the given infix string directly into self, without creating
+            Formula objects, and return the index of its root """
+        return _parse_infix(_tokenize(s), s, self._make)
+
+    def add_prefix(self, s):
+        """ Parse the given prefix string directly into self, without creating
+            Formula objects, and return the index of its root """
+        return _parse_prefix(_tokenize(s), s, self._make)
+
+    def root(self, index):
+        """ Return the root (a string) of the node with the given index """
+        op = self.ops[index]
+        if op == VARIABLE:
+            return self.names[self.firsts[index]]
+        return OPERATORS[op]
+
+    def operands(self, index):
+        """ Return the list of operand indices of the node with the given
+            index """
+        if self.ops[index] == VARIABLE:
+            return []
+        return [child for child in (self.firsts[index], self.seconds[index], self.thirds[index])
+                if child != NO_CHILD]
+
+    def _reachable(self, index):
+        """ Return the sorted list of indices of all nodes reachable from the
+            given one, so that operands always precede the nodes using them """
+        seen = {index}
+        stack = [index]
+        while stack:
+            for child in self.operands(stack.pop()):
+                if child not in seen:
+                    seen.add(child)
+                    stack.append(child)
+        return sorted(seen)
+
+    def formula(self, index):
+        """ Return the Formula stored at the given index """
+        formulae = {}
+        for node in self._reachable(index):
+            formulae[node] = Formula(self.root(node), *[formulae[child] for child in self.operands(node)])
+        return formulae[index]
+
+    def variables(self, index):
+        """ Return the set of variables of the formula at the given index """
+        return {self.names[self.firsts[node]] for node in self._reachable(index)
+                if self.ops[node] == VARIABLE}
+
+    def evaluate(self, index, model):
+        """ Return the truth value of the formula at the given index in the
+            given model """
+        ops, firsts, seconds, thirds, names = self.ops, self.firsts, self.seconds, self.thirds, self.names
+        values = {}
+        for node in self._reachable(index):
+            op = ops[node]
+            if op == VARIABLE:
+                value = model[names[firsts[node]]]
+            elif op == TRUE_CODE:
+                value = True
+            elif op == FALSE_CODE:
+                value = False
+            elif op == NOT_CODE:
+                value = not values[firsts[node]]
+            elif op == MUX_CODE:
+                value = values[seconds[node]] if values[firsts[node]] else values[thirds[node]]
+            else:
+                first, second = values[firsts[node]], values[seconds[node]]
+                if op == AND_CODE:
+                    value = first and second
+                elif op == OR_CODE:
+                    value = first or second
+                elif op == IMP_CODE:
+                    value = (not first) or second
+                elif op == IFF_CODE:
+                    value = first == second
+                elif op == NAND_CODE:
+                    value = not (first and second)
+                else:
+                    value = not (first or second)
+            values[node] = value
+        return values[index]
+
+    def infix(self, index):
+        """ Return the infix representation of the formula at the given
+            index """
+        parts = []
+        stack = [index]
+        while stack:
+            item = stack.pop()
+            if type(item) is str:
+                parts.append(item)
+                continue
+            op = self.ops[item]
+            if op == VARIABLE or op == TRUE_CODE or op == FALSE_CODE:
+                parts.append(self.root(item))
+            elif op == NOT_CODE:
+                parts.append('~')
+                stack.append(self.firsts[item])
+            elif op == MUX_CODE:
+                stack.extend([')', self.thirds[item], ':', self.seconds[item], '?', self.firsts[item]])
+                parts.append('(')
+            else:
+                stack.extend([')', self.seconds[item], OPERATORS[op], self.firsts[item]])
+                parts.append('(')
+        return ''.join(parts)
@@ -0,0 +1,45 @@
+""" (c) This file is part of the course
+    Mathematical Logic through Programming
+    by Gonczarowski and Nisan.
+    File name: code/propositions/arena_test.py """
+
+from propositions.syntax import *
+from propositions.semantics import *
+from propositions.arena import *
+
+infixes = ['p', '~x12', '(x&y)', '~~(x|~T)', '((x1&~x2)|F)', '(p?~q:(r<->s))',
+           '((p-&q)->(q-|p))']
+
+
+def test_add_and_formula(debug=False):
+    arena = FormulaArena()
+    for infix in infixes:
+        if debug:
+            print('Testing arena round trip of', infix)
+        formula = Formula.from_infix(infix)
+        for index in [arena.add(formula), arena.add_infix(infix), arena.add_prefix(formula.prefix())]:
+            assert arena.formula(index) is formula
+            assert arena.infix(index) == infix
+            assert arena.root(index) == formula.root
+
+
+def test_add_many_shares_subformulae(debug=False):
+    if debug:
+        print('Testing that formulae added together share subformulae')
+    arena = FormulaArena()
+    first, second = arena.add_many([Formula.from_infix('((p&q)|r)'),
+                                    Formula.from_infix('~(p&q)')])
+    assert len(arena) == 6
+    assert arena.operands(second) == [arena.operands(first)[0]]
+
+
+def test_variables_and_evaluate(debug=False):
+    arena = FormulaArena()
+    for infix in infixes:
+        formula = Formula.from_infix(infix)
+        index = arena.add_infix(infix)
+        if debug:
+            print('Testing arena variables and evaluation of', infix)
+        assert arena.variables(index) == formula.variables()
+        for model in all_models(list(formula.variables())):
+            assert arena.evaluate(index, model) == evaluate(formula, model)
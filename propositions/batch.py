@@ -0,0 +1,70 @@
+""" (c) This file is part of the course
+    Mathematical Logic through Programming
+    by Gonczarowski and Nisan.
+    File name: code/propositions/batch.py """
+
+import os
+
+from propositions.syntax import *
+from propositions.semantics import *
+
+TAUTOLOGY = 'TAUTOLOGY'
+
+
+def read_formulae(source, offset=0, prefix=False):
+    """ Return an iterator over the formulae in the given newline-delimited
+        source, which is either a path or an object opened for binary reading
+        that supports seek and readline (such as a file or an mmap).
+        Formulae are in prefix notation if prefix is True and in infix notation
+        otherwise, and blank lines are skipped. Reading starts at the given
+        byte offset and only one line is held in memory at a time. Every item
+        is a triple (offset, next_offset, formula), where offset is where the
+        line of the formula starts and next_offset is where reading should
+        resume after it. A line that cannot be parsed yields the ValueError
+        raised by the parser in place of the formula """
+    if isinstance(source, (str, os.PathLike)):
+        with open(source, 'rb') as file:
+            yield from read_formulae(file, offset, prefix)
+        return
+    parse = Formula.from_prefix if prefix else Formula.from_infix
+    source.seek(offset)
+    while True:
+        line = source.readline()
+        if not line:
+            return
+        next_offset = offset + len(line)
+        text = line.strip().decode('ascii', 'replace')
+        if text:
+            try:
+                formula = parse(text)
+            except ValueError as error:
+                formula = error
+            yield offset, next_offset, formula
+        offset = next_offset
+
+
+def describe_model(model):
+    """ Return a one-line description of the given model, such as 'p=T q=F' """
+    return ' '.join(variable + '=' + ('T' if model[variable] else 'F') for variable in sorted(model))
+
+
+def check_tautologies(source, sink, offset=0, prefix=False, limit=None):
+    """ Check whether each formula read from the given source (as in
+        read_formulae) is a tautology, and write one line per formula to the
+        given sink (any object with a write method): the offset of the
+        formula's line, a tab, and then TAUTOLOGY, a counterexample model as
+        returned by describe_model, or ERROR followed by the parse error.
+        At most limit formulae are checked if limit is given. Return the
+        offset from which a later call should resume """
+    checked = 0
+    for line_offset, offset, formula in read_formulae(source, offset, prefix):
+        if isinstance(formula, ValueError):
+            verdict = 'ERROR ' + str(formula)
+        else:
+            model = find_counterexample(formula)
+            verdict = TAUTOLOGY if model is None else describe_model(model)
+        sink.write('%d\t%s\n' % (line_offset, verdict))
+        checked += 1
+        if limit is not None and checked >= limit:
+            break
+    return offset
@@ -0,0 +1,58 @@
+""" (c) This file is part of the course
+    Mathematical Logic through Programming
+    by Gonczarowski and Nisan.
+    File name: code/propositions/batch_test.py """
+
+import io
+import mmap
+import os
+import tempfile
+
+from propositions.syntax import *
+from propositions.batch import *
+
+lines = [b'(p|~p)', b'', b'(p->q)', b'(p&', b'~(x&~x)']
+
+
+def test_read_formulae(debug=False):
+    if debug:
+        print('Testing reading formulae from a stream of lines')
+    data = b'\n'.join(lines) + b'\n'
+    items = list(read_formulae(io.BytesIO(data)))
+    assert [item[0] for item in items] == [0, 8, 15, 19]
+    assert [item[1] for item in items] == [7, 15, 19, 27]
+    assert items[0][2] is Formula.from_infix('(p|~p)')
+    assert isinstance(items[2][2], ValueError)
+    if debug:
+        print('Testing resuming to read from an offset')
+    assert [item[:2] for item in read_formulae(io.BytesIO(data), 15)] == \
+           [item[:2] for item in items[2:]]
+    if debug:
+        print('Testing reading prefix formulae through mmap')
+    handle, path = tempfile.mkstemp()
+    try:
+        with os.fdopen(handle, 'wb') as file:
+            file.write(b'|p~p\n->pq')
+        with open(path, 'rb') as file:
+            with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                assert [item[2].infix() for item in read_formulae(mapped, prefix=True)] == \
+                       ['(p|~p)', '(p->q)']
+        assert len(list(read_formulae(path, prefix=True))) == 2
+    finally:
+        os.remove(path)
+
+
+def test_check_tautologies(debug=False):
+    if debug:
+        print('Testing batch tautology checking')
+    data = io.BytesIO(b'\n'.join(lines))
+    sink = io.StringIO()
+    offset = check_tautologies(data, sink, limit=2)
+    assert offset == 15
+    offset = check_tautologies(data, sink, offset)
+    assert offset == 26
+    results = sink.getvalue().splitlines()
+    assert results[0] == '0\t' + TAUTOLOGY
+    assert results[1] == '8\tp=T q=F'
+    assert results[2].startswith('15\tERROR ')
+    assert results[3] == '19\t' + TAUTOLOGY
@@ -0,0 +1,487 @@
+""" (c) This file is part of the course
+    Mathematical Logic through Programming
+    by Gonczarowski and Nisan.
+    File name: code/propositions/bdd.py """
+
+from weakref import WeakKeyDictionary
+
+from propositions.syntax import *
+
+FALSE_NODE = 0
+TRUE_NODE = 1
+
+# Variable index of the two terminal nodes
+TERMINAL = -1
+
+# Number of slots of the computed table, which must be a power of two. A new
+# result evicts the result stored in its slot
+CACHE_SIZE = 1 << 16
+
+# Sifting stops moving a variable in one direction once the diagram grows
+# beyond this factor of the best size found so far
+MAX_GROWTH = 1.2
+
+# The shared manager is cleared when it has more nodes than this
+SHARED_NODE_LIMIT = 1 << 20
+
+
+class Manager:
+    """ A manager of reduced ordered binary decision diagrams over variables
+        of propositional formulae. A diagram is an integer node: FALSE_NODE,
+        TRUE_NODE, or an inner node testing a variable and having a low child
+        for the case where the variable is false and a high child for the case
+        where it is true. A unique table keeps a single node per (variable,
+        low, high), so two diagrams represent the same function exactly when
+        they are the same node. Results of ite are kept in a computed table
+        of fixed size """
+
+    def __init__(self, cache_size=CACHE_SIZE):
+        self.variables = [TERMINAL, TERMINAL]
+        self.lows = [FALSE_NODE, TRUE_NODE]
+        self.highs = [FALSE_NODE, TRUE_NODE]
+        self.references = [0, 0]
+        self.free = []
+        self.names = []
+        self.indices = {}
+        self.order = []
+        self.levels = []
+        self.unique = []
+        self.cache = [None] * cache_size
+        self.cache_mask = cache_size - 1
+        self.formulae = WeakKeyDictionary()
+
+    def size(self):
+        """ Return the number of inner nodes of self """
+        return len(self.variables) - 2 - len(self.free)
+
+    def variable(self, name):
+        """ Return the node of the given variable, adding the variable below
+            all the existing ones if it is new """
+        index = self.indices.get(name)
+        if index is None:
+            index = len(self.names)
+            self.names.append(name)
+            self.indices[name] = index
+            self.levels.append(len(self.order))
+            self.order.append(index)
+            self.unique.append({})
+        return self._make(index, FALSE_NODE, TRUE_NODE)
+
+    def _level(self, node):
+        variable = self.variables[node]
+        return len(self.order) if variable == TERMINAL else self.levels[variable]
+
+    def _new(self, variable, low, high):
+        if self.free:
+            node = self.free.pop()
+            self.variables[node] = variable
+            self.lows[node] = low
+            self.highs[node] = high
+            self.references[node] = 0
+        else:
+            node = len(self.variables)
+            self.variables.append(variable)
+            self.lows.append(low)
+            self.highs.append(high)
+            self.references.append(0)
+        self.unique[variable][low, high] = node
+        return node
+
+    def _make(self, variable, low, high):
+        if low == high:
+            return low
+        node = self.unique[variable].get((low, high))
+        if node is None:
+            node = self._new(variable, low, high)
+        return node
+
+    def _cofactors(self, node, variable):
+        if self.variables[node] == variable:
+            return self.lows[node], self.highs[node]
+        return node, node
+
+    def ite(self, first, second, third):
+        """ Return the node of 'if first then second else third'. The
+            cofactors are taken one level at a time, low before high, with an
+            explicit stack of pending calls, so that diagrams over any number
+            of variables can be combined without reaching the recursion limit
+            of Python """
+        variables, lows, highs = self.variables, self.lows, self.highs
+        levels, order = self.levels, self.order
+        cache = self.cache
+        mask = self.cache_mask
+        results = []
+        # A pending call is a triple of nodes, and a pending combination of
+        # the results of the two calls above it is a quadruple of None, its
+        # variable, and the key and slot under which to cache it
+        stack = [(first, second, third)]
+        while stack:
+            task = stack.pop()
+            if len(task) == 4:
+                _, variable, key, slot = task
+                high = results.pop()
+                result = self._make(variable, results.pop(), high)
+                cache[slot] = (key, result)
+                results.append(result)
+                continue
+            first, second, third = task
+            if first == TRUE_NODE:
+                results.append(second)
+                continue
+            if first == FALSE_NODE:
+                results.append(third)
+                continue
+            if second == first:
+                second = TRUE_NODE
+            if third == first:
+                third = FALSE_NODE
+            if second == third:
+                results.append(second)
+                continue
+            if second == TRUE_NODE and third == FALSE_NODE:
+                results.append(first)
+                continue
+            key = (first, second, third)
+            slot = hash(key) & mask
+            entry = cache[slot]
+            if entry is not None and entry[0] == key:
+                results.append(entry[1])
+                continue
+            # first is an inner node, and the cofactors are inlined as this
+            # is the innermost loop of all operations on diagrams
+            level = levels[variables[first]]
+            if variables[second] != TERMINAL and levels[variables[second]] < level:
+                level = levels[variables[second]]
+            if variables[third] != TERMINAL and levels[variables[third]] < level:
+                level = levels[variables[third]]
+            variable = order[level]
+            if variables[first] == variable:
+                first_low, first_high = lows[first], highs[first]
+            else:
+                first_low = first_high = first
+            if variables[second] == variable:
+                second_low, second_high = lows[second], highs[second]
+            else:
+                second_low = second_high = second
+            if variables[third] == variable:
+                third_low, third_high = lows[third], highs[third]
+            else:
+                third_low = third_high = third
+            stack.append((None, variable, key, slot))
+            stack.append((first_high, second_high, third_high))
+            stack.append((first_low, second_low, third_low))
+        return results[0]
+
+    def negate(self, node):
+        """ Return the node of the negation of the given node """
+        return self.ite(node, FALSE_NODE, TRUE_NODE)
+
+    def from_formula(self, formula):
+        """ Return the node of the given formula. Nodes of formulae are
+            remembered for as long as the formulae exist, so queries about
+            formulae that share subformulae share the work """
+        nodes = self.formulae
+        for subformula in postorder(formula, nodes.__contains__):
+            if subformula in nodes:
+                continue
+            root = subformula.root
+            if is_variable(root):
+                nodes[subformula] = self.variable(root)
+                continue
+            if is_constant(root):
+                nodes[subformula] = TRUE_NODE if root == 'T' else FALSE_NODE
+                continue
+            operands = [nodes[operand] for operand in subformula.operands()]
+            if is_unary(root):
+                node = self.negate(operands[0])
+            elif is_ternary(root):
+                node = self.ite(*operands)
+            else:
+                first, second = operands
+                if root == '&' or root == '-&':
+                    node = self.ite(first, second, FALSE_NODE)
+                elif root == '|' or root == '-|':
+                    node = self.ite(first, TRUE_NODE, second)
+                elif root == '->':
+                    node = self.ite(first, second, TRUE_NODE)
+                else:
+                    node = self.ite(first, second, self.negate(second))
+                if root == '-&' or root == '-|':
+                    node = self.negate(node)
+            nodes[subformula] = node
+        return nodes[formula]
+
+    def from_models(self, models, values):
+        """ Return the node of the function that is true exactly in those of
+            the given models whose respective value is True """
+        result = FALSE_NODE
+        for model, value in zip(models, values):
+            if not value:
+                continue
+            for name in model:
+                self.variable(name)
+            cube = TRUE_NODE
+            for name in sorted(model, key=lambda name: -self.levels[self.indices[name]]):
+                if model[name]:
+                    cube = self._make(self.indices[name], FALSE_NODE, cube)
+                else:
+                    cube = self._make(self.indices[name], cube, FALSE_NODE)
+            result = self.ite(result, TRUE_NODE, cube)
+        return result
+
+    def nodes(self, node):
+        """ Return a list of the nodes reachable from the given node, each
+            after its children """
+        result = []
+        done = set()
+        stack = [node]
+        while stack:
+            current = stack[-1]
+            if current in done:
+                stack.pop()
+                continue
+            if current > TRUE_NODE:
+                children = [child for child in (self.highs[current], self.lows[current])
+                            if child not in done]
+                if children:
+                    stack += children
+                    continue
+            stack.pop()
+            done.add(current)
+            result.append(current)
+        return result
+
+    def support(self, node):
+        """ Return the set of the names of the variables the given node
+            depends on """
+        return {self.names[self.variables[current]] for current in self.nodes(node)
+                if current > TRUE_NODE}
+
+    def evaluate(self, node, model):
+        """ Return the value of the given node in the given model """
+        while node > TRUE_NODE:
+            if model[self.names[self.variables[node]]]:
+                node = self.highs[node]
+            else:
+                node = self.lows[node]
+        return node == TRUE_NODE
+
+    def find(self, node, value, variables):
+        """ Return a model over the given variables, which must include the
+            support of the given node, in which the node has the given value,
+            or None if there is no such model. Variables are False in the
+            model wherever possible """
+        model = {name: False for name in variables}
+        target = TRUE_NODE if value else FALSE_NODE
+        if node <= TRUE_NODE:
+            return model if node == target else None
+        while node > TRUE_NODE:
+            # Every inner node is a non-constant function, so both of its
+            # children that are not the other terminal lead to target
+            if self.lows[node] == 1 - target:
+                model[self.names[self.variables[node]]] = True
+                node = self.highs[node]
+            else:
+                node = self.lows[node]
+        return model
+
+    def count(self, node, variables=None):
+        """ Return the number of models in which the given node is true, over
+            the given variables (by default, all the variables of self), which
+            must include the support of the node """
+        total_levels = len(self.order)
+        counts = {FALSE_NODE: 0, TRUE_NODE: 1}
+        for current in self.nodes(node):
+            if current <= TRUE_NODE:
+                continue
+            level = self._level(current)
+            low, high = self.lows[current], self.highs[current]
+            counts[current] = (counts[low] << (self._level(low) - level - 1)) + \
+                              (counts[high] << (self._level(high) - level - 1))
+        total = counts[node] << self._level(node)
+        if variables is None:
+            return total
+        variables = set(variables)
+        if not self.support(node) <= variables:
+            raise ValueError('Variables %s do not include the support of the node' % sorted(variables))
+        outside = total_levels - len(variables & set(self.indices))
+        return (total >> outside) << len(variables - set(self.indices))
+
+    def restrict(self, node, model):
+        """ Return the node obtained from the given node by fixing the
+            variables of the given (partial) model to their values in it """
+        values = {self.indices[name]: value for name, value in model.items() if name in self.indices}
+        results = {FALSE_NODE: FALSE_NODE, TRUE_NODE: TRUE_NODE}
+        for current in self.nodes(node):
+            if current <= TRUE_NODE:
+                continue
+            variable = self.variables[current]
+            if variable in values:
+                results[current] = results[self.highs[current] if values[variable] else self.lows[current]]
+            else:
+                results[current] = self._make(variable, results[self.lows[current]],
+                                              results[self.highs[current]])
+        return results[node]
+
+    def compose(self, node, name, replacement):
+        """ Return the node obtained from the given node by substituting the
+            given replacement node for the variable with the given name """
+        return self.ite(replacement, self.restrict(node, {name: True}), self.restrict(node, {name: False}))
+
+    def to_formula(self, node, default_variable):
+        """ Return a formula over not, and, and or for the given node, with
+            subformulae of shared nodes shared. The constant nodes are
+            expressed over the given variable name """
+        if node == TRUE_NODE:
+            return Formula('|', Formula(default_variable), Formula('~', Formula(default_variable)))
+        if node == FALSE_NODE:
+            return Formula('&', Formula(default_variable), Formula('~', Formula(default_variable)))
+        formulae = {}
+        for current in self.nodes(node):
+            if current <= TRUE_NODE:
+                continue
+            variable = Formula(self.names[self.variables[current]])
+            low, high = self.lows[current], self.highs[current]
+            if low == FALSE_NODE:
+                formula = variable if high == TRUE_NODE else Formula('&', variable, formulae[high])
+            elif high == FALSE_NODE:
+                negation = Formula('~', variable)
+                formula = negation if low == TRUE_NODE else Formula('&', negation, formulae[low])
+            elif low == TRUE_NODE:
+                formula = Formula('|', Formula('~', variable), formulae[high])
+            elif high == TRUE_NODE:
+                formula = Formula('|', variable, formulae[low])
+            else:
+                formula = Formula('|', Formula('&', variable, formulae[high]),
+                                  Formula('&', Formula('~', variable), formulae[low]))
+            formulae[current] = formula
+        return formulae[node]
+
+    def _clear_caches(self):
+        self.cache = [None] * len(self.cache)
+        self.formulae = WeakKeyDictionary()
+
+    def collect(self, roots):
+        """ Free all the nodes that are not reachable from the given nodes,
+            whose numbers may then be reused, and count the references to each
+            remaining node. The computed table and the remembered nodes of
+            formulae are cleared """
+        alive = {FALSE_NODE, TRUE_NODE}
+        for root in roots:
+            alive.update(self.nodes(root))
+        for node in range(len(self.references)):
+            self.references[node] = 0
+        for root in roots:
+            self.references[root] += 1
+        for table in self.unique:
+            for key, node in list(table.items()):
+                if node in alive:
+                    self.references[key[0]] += 1
+                    self.references[key[1]] += 1
+                else:
+                    del table[key]
+                    self.variables[node] = TERMINAL
+                    self.free.append(node)
+        self._clear_caches()
+
+    def _reference(self, variable, low, high):
+        """ Return the node for (variable, low, high) with one more reference,
+            creating it if needed """
+        if low == high:
+            self.references[low] += 1
+            return low
+        node = self.unique[variable].get((low, high))
+        if node is None:
+            node = self._new(variable, low, high)
+            self.references[low] += 1
+            self.references[high] += 1
+        self.references[node] += 1
+        return node
+
+    def _dereference(self, node):
+        stack = [node]
+        while stack:
+            node = stack.pop()
+            self.references[node] -= 1
+            if node > TRUE_NODE and self.references[node] == 0:
+                low, high = self.lows[node], self.highs[node]
+                del self.unique[self.variables[node]][low, high]
+                self.variables[node] = TERMINAL
+                self.free.append(node)
+                stack += [low, high]
+
+    def _swap(self, level):
+        """ Exchange the variables at the given level and the level below it,
+            in place: every node keeps representing the same function. Nodes
+            of the upper variable that depend on the lower one become nodes of
+            the lower one, over new nodes of the upper one. Requires counted
+            references, as set by collect """
+        upper, lower = self.order[level], self.order[level + 1]
+        moving = []
+        staying = {}
+        for key, node in self.unique[upper].items():
+            if self.variables[key[0]] == lower or self.variables[key[1]] == lower:
+                moving.append(node)
+            else:
+                staying[key] = node
+        self.unique[upper] = staying
+        self.order[level], self.order[level + 1] = lower, upper
+        self.levels[upper], self.levels[lower] = level + 1, level
+        for node in moving:
+            low, high = self.lows[node], self.highs[node]
+            low_low, low_high = self._cofactors(low, lower)
+            high_low, high_high = self._cofactors(high, lower)
+            new_low = self._reference(upper, low_low, high_low)
+            new_high = self._reference(upper, low_high, high_high)
+            self.variables[node] = lower
+            self.lows[node] = new_low
+            self.highs[node] = new_high
+            self.unique[lower][new_low, new_high] = node
+            self._dereference(low)
+            self._dereference(high)
+
+    def _sift(self, variable):
+        """ Move the given variable to the level that minimizes the number of
+            nodes, trying every level until the diagram grows too much """
+        best_size = self.size()
+        best_level = level = self.levels[variable]
+        last = len(self.order) - 1
+        for step in ((1, -1) if level > last - level else (-1, 1)):
+            while 0 <= level + step <= last:
+                self._swap(level if step == 1 else level - 1)
+                level += step
+                if self.size() < best_size:
+                    best_size, best_level = self.size(), level
+                elif self.size() > best_size * MAX_GROWTH:
+                    break
+        while level < best_level:
+            self._swap(level)
+            level += 1
+        while level > best_level:
+            self._swap(level - 1)
+            level -= 1
+
+    def reorder(self, roots):
+        """ Reorder the variables of self by sifting, to reduce the number of
+            nodes reachable from the given nodes, which keep representing the
+            same functions. All other nodes are freed as in collect. Return
+            the resulting number of nodes """
+        self.collect(roots)
+        for variable in sorted(range(len(self.order)), key=lambda index: -len(self.unique[index])):
+            self._sift(variable)
+        self._clear_caches()
+        return self.size()
+
+
+_shared = None
+
+
+def shared_manager():
+    """ Return a manager shared by all callers, so that repeated queries over
+        the same variables and subformulae share their work. The manager is
+        cleared when it grows beyond SHARED_NODE_LIMIT nodes, so nodes from it
+        must not be kept across calls """
+    global _shared
+    if _shared is None or _shared.size() > SHARED_NODE_LIMIT:
+        _shared = Manager()
+    return _shared
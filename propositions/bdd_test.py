@@ -0,0 +1,112 @@
+""" (c) This file is part of the course
+    Mathematical Logic through Programming
+    by Gonczarowski and Nisan.
+    File name: code/propositions/bdd_test.py """
+
+from propositions.syntax import *
+from propositions.semantics import *
+from propositions.bdd import *
+
+infixes = ['T', 'F', 'p', '~(p&q7)', '(p&~p)', '(p?~q:(r<->s))', '((p-&q)->(q-|p))', '((p|q)&~(p|q))',
+           '(((p1->p2)&(p2->p3))->(p1->p3))', '((p<->q)<->(q<->p))', '(p?T:F)', '~(x-|(y-&F))']
+
+
+def test_from_formula(debug=False):
+    manager = Manager()
+    for infix in infixes:
+        formula = Formula.from_infix(infix)
+        if debug:
+            print('Testing the decision diagram of', infix)
+        node = manager.from_formula(formula)
+        variables = sorted(formula.variables())
+        values = [evaluate(formula, model) for model in all_models(variables)]
+        assert [manager.evaluate(node, model) for model in all_models(variables)] == values
+        assert manager.count(node, variables) == sum(values)
+        assert manager.support(node) <= set(variables)
+        assert (node == TRUE_NODE) == is_tautology(formula)
+        model = manager.find(node, False, variables)
+        assert (model is None) == is_tautology(formula)
+        if model is not None:
+            assert not evaluate(formula, model)
+
+
+def test_canonicity(debug=False):
+    manager = Manager()
+    pairs = [('(p->q)', '(~q->~p)'), ('(p?q:r)', '((p&q)|(~p&r))'), ('(p-|q)', '(~p&~q)'),
+             ('(p-&q)', '(~p|~q)'), ('((p<->q)<->r)', '(p<->(q<->r))'), ('(p|~p)', 'T')]
+    for first, second in pairs:
+        if debug:
+            print('Testing that', first, 'and', second, 'have the same node')
+        assert manager.from_formula(Formula.from_infix(first)) == \
+               manager.from_formula(Formula.from_infix(second))
+    assert manager.from_formula(Formula.from_infix('(p->q)')) != \
+           manager.from_formula(Formula.from_infix('(q->p)'))
+
+
+def test_restrict_and_compose(debug=False):
+    manager = Manager()
+    formula = Formula.from_infix('((p&q)|(~p&r))')
+    node = manager.from_formula(formula)
+    if debug:
+        print('Testing restriction and composition of', formula)
+    assert manager.restrict(node, {'p': True}) == manager.from_formula(Formula('q'))
+    assert manager.restrict(node, {'p': False, 'r': False}) == FALSE_NODE
+    composed = manager.compose(node, 'p', manager.from_formula(Formula.from_infix('(q&r)')))
+    assert composed == manager.from_formula(Formula.from_infix('((q&r)|r)'))
+
+
+def test_deep_diagrams(debug=False):
+    # More levels than the default recursion limit of Python
+    count = 3000
+    manager = Manager()
+    variables = [manager.variable('x' + str(index)) for index in range(count)]
+    conjunction, disjunction = TRUE_NODE, FALSE_NODE
+    for variable in reversed(variables):
+        conjunction = manager.ite(variable, conjunction, FALSE_NODE)
+        disjunction = manager.ite(variable, TRUE_NODE, disjunction)
+    if debug:
+        print('Testing operations on diagrams over', count, 'variables')
+    negation = manager.negate(conjunction)
+    assert manager.count(negation) == 2 ** count - 1
+    assert manager.ite(conjunction, TRUE_NODE, disjunction) == disjunction
+    assert manager.ite(disjunction, conjunction, FALSE_NODE) == conjunction
+    assert manager.negate(negation) == conjunction
+
+
+def test_reorder(debug=False):
+    # (x0&y0)|(x1&y1)|... is exponential in the order x0,x1,...,y0,y1,...
+    # and linear when every xi is next to yi
+    pairs = 6
+    manager = Manager()
+    for index in range(pairs):
+        manager.variable('x' + str(index))
+    for index in range(pairs):
+        manager.variable('y' + str(index))
+    formula = Formula(AND, Formula('x0'), Formula('y0'))
+    for index in range(1, pairs):
+        formula = Formula(OR, formula, Formula(AND, Formula('x' + str(index)), Formula('y' + str(index))))
+    node = manager.from_formula(formula)
+    count = manager.count(node)
+    manager.collect([node])
+    if debug:
+        print('Testing sifting of a diagram of', manager.size(), 'nodes')
+    assert manager.size() == 2 ** (pairs + 1) - 2
+    assert manager.reorder([node]) == 2 * pairs
+    assert manager.count(node) == count
+    assert manager.from_formula(formula) == node
+    variables = sorted(formula.variables())
+    assert [manager.evaluate(node, model) for model in all_models(variables)] == \
+           [evaluate(formula, model) for model in all_models(variables)]
+
+
+def test_bdd_backend(debug=False):
+    for infix in infixes:
+        formula = Formula.from_infix(infix)
+        if debug:
+            print('Testing the BDD backend on', infix)
+        assert is_tautology(formula, BDD) == is_tautology(formula, TRUTH_TABLE)
+        models = list(all_models(sorted(formula.variables() | {'p'})))
+        values = truth_values(formula, models, BDD)
+        assert values == truth_values(formula, models)
+        synthesized = synthesize(models, values, BDD)
+        assert truth_values(synthesized, models) == values
@@ -0,0 +1,98 @@
+""" (c) This file is part of the course
+    Mathematical Logic through Programming
+    by Gonczarowski and Nisan.
+    File name: code/propositions/cache.py """
+
+from collections import OrderedDict
+
+from propositions.syntax import *
+from propositions.semantics import is_tautology, AUTO
+from propositions.truth_table import TruthTable
+
+DEFAULT_CACHE_SIZE = 4096
+
+# Truth tables over more variables than this are computed but not cached
+MAX_TABLE_VARIABLES = 16
+
+# Kinds of cached results
+TAUTOLOGY = 'tautology'
+TABLE = 'table'
+
+
+def canonical_form(formula):
+    """ Return the formula obtained from the given formula by renaming its
+        variables to p1, p2, ... in the order of their first occurrence from
+        left to right, together with the list of the original variables in
+        that order. Formulae that differ only in the names of their variables
+        have the same canonical form """
+    order = [node.root for node in postorder(formula) if is_variable(node.root)]
+    names = {Formula(variable): Formula('p' + str(index + 1)) for index, variable in enumerate(order)}
+    return fold(formula, lambda node, operands: Formula(node.root, *operands) if operands else node, names), order
+
+
+class ResultCache:
+    """ A bounded cache of tautology verdicts and truth tables of formulae,
+        keyed by their canonical forms, that drops the least recently used
+        results beyond its maximal size and counts its hits and misses """
+
+    def __init__(self, maxsize=DEFAULT_CACHE_SIZE):
+        self.maxsize = maxsize
+        self.results = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def _get(self, key, compute):
+        if key in self.results:
+            self.hits += 1
+            self.results.move_to_end(key)
+            return self.results[key]
+        self.misses += 1
+        result = self.results[key] = compute()
+        if len(self.results) > self.maxsize:
+            self.results.popitem(last=False)
+            self.evictions += 1
+        return result
+
+    def is_tautology(self, formula, backend=AUTO):
+        """ Return whether the given formula is a tautology, checked with the
+            given backend if its canonical form is not cached """
+        canonical, order = canonical_form(formula)
+        return self._get((TAUTOLOGY, canonical), lambda: is_tautology(canonical, backend))
+
+    def truth_table(self, formula):
+        """ Return the truth table of the given formula as an integer whose bit
+            i is its value in model number i in the order of all_models over
+            its variables in sorted order. Formulae with the same canonical
+            form whose variables have the same relative order share a cached
+            table """
+        canonical, order = canonical_form(formula)
+        variables = sorted(order)
+        renamed = ['p' + str(order.index(variable) + 1) for variable in variables]
+
+        def compute():
+            table = TruthTable(canonical, renamed)
+            return sum(column << first_row for first_row, column in table.chunks())
+
+        if len(variables) > MAX_TABLE_VARIABLES:
+            return compute()
+        return self._get((TABLE, canonical, tuple(renamed)), compute)
+
+    def statistics(self):
+        """ Return a dictionary of the numbers of hits, misses, and evictions
+            of self, and of its current and maximal sizes """
+        return {'hits': self.hits, 'misses': self.misses, 'evictions': self.evictions,
+                'size': len(self.results), 'maxsize': self.maxsize}
+
+    def clear(self):
+        """ Drop all the results of self and reset its statistics """
+        self.results.clear()
+        self.hits = self.misses = self.evictions = 0
+
+
+_shared = ResultCache()
+
+
+def shared_cache():
+    """ Return a cache shared by all callers """
+    return _shared
@@ -0,0 +1,42 @@
+""" (c) This file is part of the course
+    Mathematical Logic through Programming
+    by Gonczarowski and Nisan.
+    File name: code/propositions/cache_test.py """
+
+from propositions.syntax import *
+from propositions.semantics import *
+from propositions.cache import *
+
+
+def test_canonical_form(debug=False):
+    for first, second, same in [['(z1->(z2->z1))', '(z7->(z3->z7))', True], ['(z1->(z2->z1))', '(z1->(z2->z2))', False],
+                                ['((x&y)|~(x&y))', '((q&p)|~(q&p))', True], ['(p|q)', '(q|p)', True],
+                                ['(p|q)', '(p|p)', False], ['(T->x)', '(T->y)', True], ['(T->x)', '(F->x)', False]]:
+        if debug:
+            print('Testing the canonical forms of', first, 'and', second)
+        first_form, first_order = canonical_form(Formula.from_infix(first))
+        second_form, second_order = canonical_form(Formula.from_infix(second))
+        assert (first_form == second_form) == same
+    form, order = canonical_form(Formula.from_infix('((z2->z10)&(z10|~z5))'))
+    assert form.infix() == '((p1->p2)&(p2|~p3))'
+    assert order == ['z2', 'z10', 'z5']
+
+
+def test_result_cache(debug=False):
+    cache = ResultCache(maxsize=3)
+    for infix, tautology in [['(z1->(z2->z1))', True], ['(z4->(z9->z4))', True], ['(z1|z2)', False],
+                             ['(z3|z1)', False], ['(x|~x)', True], ['(z1&z2)', False],
+                             ['(z1->(z2->z1))', True]]:
+        if debug:
+            print('Testing the cached verdict of', infix)
+        assert cache.is_tautology(Formula.from_infix(infix)) == tautology
+    assert cache.statistics() == {'hits': 2, 'misses': 5, 'evictions': 2, 'size': 3, 'maxsize': 3}
+    for infix in ['((x&~y)|z)', '((q&~r)|s)', '((s&~r)|q)', '(p?q:~r)', '(z10->z9)', '(z9->z10)', 'T']:
+        if debug:
+            print('Testing the cached truth table of', infix)
+        formula = Formula.from_infix(infix)
+        table = cache.truth_table(formula)
+        assert table == sum(evaluate(formula, model) << row
+                            for row, model in enumerate(all_models(sorted(formula.variables()))))
+    cache.clear()
+    assert cache.statistics() == {'hits': 0, 'misses': 0, 'evictions': 0, 'size': 0, 'maxsize': 3}
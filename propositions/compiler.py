@@ -0,0 +1,88 @@
+""" (c) This file is part of the course
+    Mathematical Logic through Programming
+    by Gonczarowski and Nisan.
+    File name: code/propositions/compiler.py """
+
+from functools import lru_cache
+
+from propositions.syntax import *
+
+_BINARY_EXPRESSIONS = {'&': '%s and %s',
+                       '|': '%s or %s',
+                       '->': 'not %s or %s',
+                       '<->': '%s == %s',
+                       '-&': 'not (%s and %s)',
+                       '-|': 'not (%s or %s)'}
+
+
+def _body(formula, variables):
+    """ Return the lines of straight-line Python code that compute the value
+        of the given formula into the local _result, given locals named like
+        the variables. Every distinct subformula is computed once, into a
+        local named _0, _1, ... (variable names never start with '_') """
+    names = {Formula(variable): variable for variable in variables}
+    lines = []
+    for node in postorder(formula, names.__contains__):
+        if node in names:
+            continue
+        root = node.root
+        if is_constant(root):
+            expression = 'True' if root == 'T' else 'False'
+        elif is_variable(root):
+            raise ValueError('Variable %s of %s is not among %s' % (root, formula, list(variables)))
+        elif is_unary(root):
+            expression = 'not ' + names[node.first]
+        elif is_ternary(root):
+            expression = '%s if %s else %s' % (names[node.second], names[node.first], names[node.third])
+        else:
+            expression = _BINARY_EXPRESSIONS[root] % (names[node.first], names[node.second])
+        names[node] = '_' + str(len(lines))
+        lines.append('%s = %s' % (names[node], expression))
+    lines.append('_result = bool(%s)' % names[formula])
+    return lines
+
+
+def compile_formula(formula, variables=None):
+    """ Return a Python function that computes the truth value of the given
+        formula. The function takes a tuple of the truth values of the given
+        variables, in order (by default, the variables of formula in sorted
+        order, which are then kept in the variables attribute of the function).
+        The function also has a from_model attribute, a function that takes a
+        model, and a from_index attribute, a function that takes the number of
+        a model in the order of all_models(variables), that is, an integer
+        whose bits from the most significant one are the values of the
+        variables. Compiled functions are cached """
+    if variables is None:
+        variables = sorted(formula.variables())
+    return _compile(formula, tuple(variables))
+
+
+@lru_cache(maxsize=1024)
+def _compile(formula, variables):
+    count = len(variables)
+    source = ['def from_values(_values):']
+    if count > 0:
+        source.append('    %s, = _values' % ', '.join(variables))
+    source += ['    ' + line for line in _body(formula, variables)]
+    source += ['    return _result', '',
+               'def from_model(_model):',
+               '    return from_values((%s))' % ''.join('_model[%r], ' % variable for variable in variables),
+               '',
+               'def from_index(_index):',
+               '    return from_values((%s))' % ''.join('_index >> %d & 1, ' % (count - 1 - position)
+                                                        for position in range(count))]
+    namespace = {}
+    exec(compile('\n'.join(source), '<formula>', 'exec'), namespace)
+    function = namespace['from_values']
+    function.variables = list(variables)
+    function.from_model = namespace['from_model']
+    function.from_index = namespace['from_index']
+    return function
+
+
+def model_from_index(variables, index):
+    """ Return the model over the given variables whose number in the order of
+        all_models(variables) is index """
+    count = len(variables)
+    return {variable: bool(index >> (count - 1 - position) & 1)
+            for position, variable in enumerate(variables)}
@@ -0,0 +1,49 @@
+""" (c) This file is part of the course
+    Mathematical Logic through Programming
+    by Gonczarowski and Nisan.
+    File name: code/propositions/compiler_test.py """
+
+from propositions.syntax import *
+from propositions.semantics import *
+from propositions.compiler import *
+
+
+def test_compile_formula(debug=False):
+    for infix in ['T', '~F', 'p', '~(p&q7)', '(p?~q:(r<->s))', '((p-&q)->(q-|p))',
+                  '((p|q)&~(p|q))']:
+        formula = Formula.from_infix(infix)
+        if debug:
+            print('Testing compilation of', infix)
+        function = compile_formula(formula)
+        assert function.variables == sorted(formula.variables())
+        for index, model in enumerate(all_models(function.variables)):
+            value = evaluate(formula, model)
+            assert function(tuple(model[variable] for variable in function.variables)) == value
+            assert function.from_model(model) == value
+            assert function.from_index(index) == value
+            assert model_from_index(function.variables, index) == model
+
+
+def test_compile_formula_with_variables(debug=False):
+    formula = Formula.from_infix('(q->p)')
+    if debug:
+        print('Testing compilation of', formula, 'over given variables')
+    function = compile_formula(formula, ['p', 'q', 'r'])
+    assert function.variables == ['p', 'q', 'r']
+    assert [function.from_index(index) for index in range(8)] == \
+           [True, True, False, False, True, True, True, True]
+    assert compile_formula(formula, ['p', 'q', 'r']) is function
+    try:
+        compile_formula(formula, ['p'])
+        assert False
+    except ValueError:
+        pass
+
+
+def test_truth_values_on_both_sides_of_threshold(debug=False):
+    formula = Formula.from_infix('((p1&~p2)|(p3?p4:(p5<->p6)))')
+    models = list(all_models(sorted(formula.variables())))
+    for count in [0, 1, COMPILED_MODELS, COMPILED_MODELS + 1, len(models)]:
+        if debug:
+            print('Testing the truth values of', formula, 'in', count, 'models')
+        assert truth_values(formula, models[:count]) == [evaluate(formula, model) for model in models[:count]]
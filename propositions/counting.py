@@ -0,0 +1,204 @@
+""" (c) This file is part of the course
+    Mathematical Logic through Programming
+    by Gonczarowski and Nisan.
+    File name: code/propositions/counting.py """
+
+from propositions.syntax import *
+from propositions.sat import encode
+
+
+class _Clauses:
+    """ Collects the clauses of a Tseitin encoding, in place of a solver """
+
+    def __init__(self):
+        self.variables = 0
+        self.clauses = []
+
+    def new_variable(self):
+        self.variables += 1
+        return self.variables
+
+    def add_clause(self, literals):
+        self.clauses.append(tuple(set(literals)))
+
+
+class _Counter:
+    """ The state of a DPLL model count of clauses over the variables 1, 2,
+        ..., each a tuple of literals. The clauses containing each literal are
+        listed once, and the numbers of true and of false literals of every
+        clause are updated as literals are assigned and unassigned, so that
+        propagating a literal only visits the clauses in which it occurs """
+
+    def __init__(self, variables, clauses):
+        self.clauses = clauses
+        self.assignment = [None] * (variables + 1)
+        self.occurrences = {}
+        for variable in range(1, variables + 1):
+            self.occurrences[variable] = []
+            self.occurrences[-variable] = []
+        for index, clause in enumerate(clauses):
+            for literal in clause:
+                self.occurrences[literal].append(index)
+        self.true = [0] * len(clauses)
+        self.false = [0] * len(clauses)
+        self.trail = []
+
+    def assign(self, literals):
+        """ Make the given literals and all the literals they imply through
+            unit clauses true, and return whether no clause is then falsified.
+            Either way, the assigned literals are appended to the trail """
+        assignment, clauses, occurrences = self.assignment, self.clauses, self.occurrences
+        true, false, trail = self.true, self.false, self.trail
+        units = list(literals)
+        consistent = True
+        while units and consistent:
+            literal = units.pop()
+            value = assignment[abs(literal)]
+            if value is not None:
+                consistent = value == (literal > 0)
+                continue
+            assignment[abs(literal)] = literal > 0
+            trail.append(literal)
+            for clause in occurrences[literal]:
+                true[clause] += 1
+            # All the counts are updated before a conflict is reported, so
+            # that undo can take the literal back
+            for clause in occurrences[-literal]:
+                false[clause] += 1
+                if true[clause] == 0 and consistent:
+                    free = len(clauses[clause]) - false[clause]
+                    if free == 0:
+                        consistent = False
+                    elif free == 1:
+                        for unit in clauses[clause]:
+                            if assignment[abs(unit)] is None:
+                                units.append(unit)
+                                break
+        return consistent
+
+    def undo(self, length):
+        """ Unassign the literals of the trail beyond the given length """
+        assignment, occurrences, true, false, trail = \
+            self.assignment, self.occurrences, self.true, self.false, self.trail
+        while len(trail) > length:
+            literal = trail.pop()
+            assignment[abs(literal)] = None
+            for clause in occurrences[literal]:
+                true[clause] -= 1
+            for clause in occurrences[-literal]:
+                false[clause] -= 1
+
+    def components(self, clauses):
+        """ Return a list of pairs, one per connected component of the
+            unsatisfied clauses of the given clauses, two clauses being
+            connected if they share an unassigned variable. Each pair consists
+            of the list of the clauses of the component and of a dictionary
+            that maps each unassigned variable in them to the number of these
+            clauses in which it occurs """
+        assignment, occurrences, true = self.assignment, self.occurrences, self.true
+        # The given clauses are a component or all the clauses, so every
+        # unsatisfied clause with an unassigned variable in them is among them
+        seen = set()
+        components = []
+        for start in clauses:
+            if true[start] != 0 or start in seen:
+                continue
+            seen.add(start)
+            component, counts = [], {}
+            pending = [start]
+            while pending:
+                clause = pending.pop()
+                component.append(clause)
+                for literal in self.clauses[clause]:
+                    variable = abs(literal)
+                    if assignment[variable] is not None:
+                        continue
+                    if variable in counts:
+                        counts[variable] += 1
+                        continue
+                    counts[variable] = 1
+                    for occurrence in (variable, -variable):
+                        for other in occurrences[occurrence]:
+                            if true[other] == 0 and other not in seen:
+                                seen.add(other)
+                                pending.append(other)
+            components.append((component, counts))
+        return components
+
+
+def _count(counter, component, cache):
+    """ A generator computing the number of assignments to the variables of
+        the given component of the clauses of the given counter that satisfy
+        all its clauses. The count of a component is the sum of its counts
+        with its most frequent variable set to each value, and each of those
+        is the product of the counts of the components into which the
+        remaining clauses then fall. Counts of components are kept in the
+        given cache. The count of every smaller component is obtained by
+        yielding it, and the count is then sent back in, so that the search
+        is driven by _run without recursion """
+    clauses, occurrences = component
+    key = (frozenset(clauses), frozenset(occurrences))
+    if key in cache:
+        return cache[key]
+    # Ties go to the variable encoded first, so that the search sweeps the
+    # formula from one end rather than depending on the order of the clauses
+    variable = max(occurrences, key=lambda variable: (occurrences[variable], -variable))
+    count = 0
+    for literal in (variable, -variable):
+        length = len(counter.trail)
+        if counter.assign([literal]):
+            free = len(occurrences) - (len(counter.trail) - length)
+            product = 1
+            for part in counter.components(clauses):
+                free -= len(part[1])
+                product *= yield part
+                if product == 0:
+                    break
+            count += product << free
+        counter.undo(length)
+    cache[key] = count
+    return count
+
+
+def _run(counter, component, cache):
+    """ Return the count computed by _count for the given component """
+    stack = [_count(counter, component, cache)]
+    value = None
+    while True:
+        try:
+            request = stack[-1].send(value)
+        except StopIteration as stop:
+            stack.pop()
+            if not stack:
+                return stop.value
+            value = stop.value
+            continue
+        stack.append(_count(counter, request, cache))
+        value = None
+
+
+def count_models(formula, partial_model=None):
+    """ Return the number of models over the variables of the given formula
+        that agree with the given partial model and in which the formula
+        holds. The models are counted by a DPLL search on the Tseitin encoding
+        of formula, which splits the clauses into independent components and
+        caches the counts of components, and every model of the formula has
+        exactly one extension that satisfies the encoding """
+    collector = _Clauses()
+    variables = {}
+    root = encode(formula, collector, variables)
+    fixed = [variables[name] if value else -variables[name]
+             for name, value in (partial_model or {}).items() if name in variables]
+    counter = _Counter(collector.variables, collector.clauses)
+    units = [clause[0] for clause in collector.clauses if len(clause) == 1]
+    if not counter.assign([root] + units + fixed):
+        return 0
+    free = collector.variables - len(counter.trail)
+    total = 1
+    cache = {}
+    for component in counter.components(range(len(collector.clauses))):
+        free -= len(component[1])
+        total *= _run(counter, component, cache)
+        if total == 0:
+            return 0
+    return total << free
@@ -0,0 +1,98 @@
+""" (c) This file is part of the course
+    Mathematical Logic through Programming
+    by Gonczarowski and Nisan.
+    File name: code/propositions/counting_test.py """
+
+import time
+
+from propositions.syntax import *
+from propositions.semantics import AND, OR, BDD, AUTO, evaluate, all_models, count_models_under
+from propositions.counting import *
+from propositions.counting import _Counter
+
+# The connected formula of test_count_models_of_connected_formula must be
+# counted within this many seconds
+CONNECTED_SECONDS = 20
+
+
+def test_components(debug=False):
+    clauses = [(1, 2), (-2, 3), (4, 5), (-5, 6), (6, -6), (3, -7)]
+    if debug:
+        print('Testing the connected components of', clauses)
+    counter = _Counter(7, clauses)
+
+    def components():
+        return sorted((sorted(component), counts) for component, counts in counter.components(range(len(clauses))))
+
+    assert components() == [([0, 1, 5], {1: 1, 2: 2, 3: 2, 7: 1}), ([2, 3, 4], {4: 1, 5: 2, 6: 3})]
+    assert counter.assign([-5])
+    assert counter.trail == [-5, 4]
+    assert components() == [([0, 1, 5], {1: 1, 2: 2, 3: 2, 7: 1}), ([4], {6: 2})]
+    assert not counter.assign([-1, -2])
+    counter.undo(2)
+    assert counter.trail == [-5, 4]
+    assert components() == [([0, 1, 5], {1: 1, 2: 2, 3: 2, 7: 1}), ([4], {6: 2})]
+    counter.undo(0)
+    assert counter.true == [0] * len(clauses) and counter.false == [0] * len(clauses)
+    assert counter.components([]) == []
+
+
+def test_count_models(debug=False):
+    for infix in ['T', 'F', '~T', '(T&F)', 'p', '(p&T)', '(p|T)', '(p&F)', '(p|F)', '(p->F)', '(F->p)',
+                  '(T?p:q)', '(F?p:q)', '(p?T:F)', '((p&F)|q)', '((p-&T)<->(q-|F))', '~(p&q7)',
+                  '(p?~q:(r<->s))', '((p|q)&(r|s))', '(((p|q)&T)&((r->s)|F))', '((p<->q)&~(r<->s))',
+                  '((p|q)&~(p|q))', '(((p1->p2)&(p2->p3))->(p1->p3))']:
+        formula = Formula.from_infix(infix)
+        variables = sorted(formula.variables())
+        if debug:
+            print('Testing the model count of', infix)
+        for partial_model in [None, {}, {'p': True}, {'p': False, 'r': True, 'x': False}]:
+            count = len([model for model in all_models(variables) if evaluate(formula, model) and
+                         all(model[variable] == value for variable, value in (partial_model or {}).items()
+                             if variable in model)])
+            assert count_models(formula, partial_model) == count
+
+
+def test_count_models_of_components(debug=False):
+    # A conjunction of independent clauses over three variables each, with
+    # constants in between, has 7 models per clause
+    clauses = 40
+    formula = Formula('T')
+    for index in range(clauses):
+        clause = Formula(OR, Formula(OR, Formula('p' + str(index)), Formula('q' + str(index))),
+                         Formula('r' + str(index)))
+        formula = Formula(AND, formula, Formula(OR, clause, Formula('F')) if index % 2 else clause)
+    if debug:
+        print('Testing the model count of', clauses, 'independent clauses')
+    assert count_models(formula) == 7 ** clauses
+    assert count_models(formula, {'p0': False, 'q0': False}) == 7 ** (clauses - 1)
+    assert count_models(formula, {'p0': False, 'q0': False, 'r0': False}) == 0
+    assert count_models(Formula(AND, formula, Formula('F'))) == 0
+    assert count_models(Formula(OR, formula, Formula('T'))) == 2 ** (3 * clauses)
+
+
+def test_count_models_of_connected_formula(debug=False):
+    # A chain of 700 connectives over 30 variables, each of which occurs in
+    # many places, so that the clauses stay connected until most variables
+    # are set
+    operators = [AND, OR, '->', '-&', '-|']
+    formula = Formula('x0')
+    for index in range(1, 700):
+        formula = Formula(operators[index % len(operators)], formula, Formula('x' + str(index * 7 % 30)))
+    if debug:
+        print('Testing the model count of a chain of', formula.size(), 'nodes')
+    assert formula.size() > 1000
+    start = time.time()
+    count = count_models(formula)
+    assert count == count_models_under(formula, {}, BDD)
+    assert count_models(formula, {'x3': True, 'x8': False}) == \
+           count_models_under(formula, {'x3': True, 'x8': False}, BDD)
+    assert time.time() - start < CONNECTED_SECONDS
+    # AUTO counts formulae over this many variables with decision diagrams,
+    # and the parity of 100 further variables holds in half of their models
+    parity = Formula('y0')
+    for index in range(1, 100):
+        parity = Formula('<->', parity, Formula('y' + str(index)))
+    start = time.time()
+    assert count_models_under(Formula(AND, formula, parity), {}, AUTO) == count << 99
+    assert time.time() - start < CONNECTED_SECONDS
@@ -0,0 +1,123 @@
+""" (c) This file is part of the course
+    Mathematical Logic through Programming
+    by Gonczarowski and Nisan.
+    File name: code/propositions/incremental.py """
+
+from heapq import heapify, heappop, heappush
+
+from propositions.syntax import *
+
+
+class IncrementalEvaluator:
+    """ Keeps the truth value of every distinct subformula of a formula in a
+        model. When the value of a single variable changes, only the
+        subformulae on paths from that variable up to the root are
+        re-evaluated, and propagation stops at subformulae whose value does
+        not change """
+
+    def __init__(self, formula, model):
+        """ Evaluate the given formula in the given model """
+        nodes = list(postorder(formula))
+        positions = {node: position for position, node in enumerate(nodes)}
+        self.roots = [node.root for node in nodes]
+        self.operands = [[positions[operand] for operand in node.operands()] for node in nodes]
+        self.parents = [[] for node in nodes]
+        for position, operands in enumerate(self.operands):
+            for operand in set(operands):
+                self.parents[operand].append(position)
+        self.leaves = {node.root: position for position, node in enumerate(nodes)
+                       if is_variable(node.root)}
+        self.model = {variable: model[variable] for variable in self.leaves}
+        self.values = []
+        for position in range(len(nodes)):
+            self.values.append(self._compute(position))
+
+    def _compute(self, position):
+        """ Return the value of the subformula at the given position, given the
+            current values of its operands """
+        root = self.roots[position]
+        values = self.values
+        operands = self.operands[position]
+        if is_variable(root):
+            return self.model[root]
+        elif is_constant(root):
+            return root == 'T'
+        elif is_unary(root):
+            return not values[operands[0]]
+        elif is_ternary(root):
+            return values[operands[1]] if values[operands[0]] else values[operands[2]]
+        first, second = values[operands[0]], values[operands[1]]
+        if root == '&':
+            return first and second
+        elif root == '|':
+            return first or second
+        elif root == '->':
+            return (not first) or second
+        elif root == '<->':
+            return first == second
+        elif root == '-&':
+            return not (first and second)
+        else:
+            return not (first or second)
+
+    def value(self):
+        """ Return the truth value of the formula in the current model """
+        return self.values[-1]
+
+    def set(self, variable, value):
+        """ Change the value of the given variable in the current model, and
+            re-evaluate the subformulae affected by the change. Subformulae are
+            re-evaluated in increasing position, so each operand is up to date
+            before the subformulae using it """
+        position = self.leaves.get(variable)
+        if position is None or self.model[variable] == value:
+            return
+        self.model[variable] = value
+        self.values[position] = value
+        pending = list(self.parents[position])
+        heapify(pending)
+        queued = set(pending)
+        while pending:
+            position = heappop(pending)
+            value = self._compute(position)
+            if value != self.values[position]:
+                self.values[position] = value
+                for parent in self.parents[position]:
+                    if parent not in queued:
+                        queued.add(parent)
+                        heappush(pending, parent)
+
+    def flip(self, variable):
+        """ Negate the value of the given variable in the current model """
+        self.set(variable, not self.model[variable])
+
+
+def sweep(formula, variables=None):
+    """ Return an iterator over pairs of a model and the truth value of the
+        given formula in it, over all models over the given variables (by
+        default, the variables of formula in sorted order), in the Gray code
+        order of all_models. Consecutive models differ in one variable, and
+        the formula is re-evaluated incrementally. The model is a single
+        dictionary that is updated in place between iterations """
+    if variables is None:
+        variables = sorted(formula.variables())
+    variables = list(variables)
+    count = len(variables)
+    model = {variable: False for variable in variables}
+    evaluator = IncrementalEvaluator(formula, model)
+    yield model, evaluator.value()
+    for number in range(1, 2 ** count):
+        variable = variables[count - (number & -number).bit_length()]
+        model[variable] = not model[variable]
+        evaluator.set(variable, model[variable])
+        yield model, evaluator.value()
+
+
+def find_counterexample(formula):
+    """ Return a model over the variables of the given formula in which it
+        does not hold, found by an incremental sweep, or None if the formula
+        is a tautology """
+    for model, value in sweep(formula):
+        if not value:
+            return dict(model)
+    return None
@@ -0,0 +1,51 @@
+""" (c) This file is part of the course
+    Mathematical Logic through Programming
+    by Gonczarowski and Nisan.
+    File name: code/propositions/incremental_test.py """
+
+from propositions.syntax import *
+from propositions.semantics import *
+from propositions.incremental import *
+
+infixes = ['T', 'p', '~(p&q7)', '(p?~q:(r<->s))', '((p-&q)->(q-|p))', '((p|q)&~(p|q))',
+           '(((p1->p2)&(p2->p3))->(p1->p3))']
+
+
+def test_incremental_evaluator(debug=False):
+    for infix in infixes:
+        formula = Formula.from_infix(infix)
+        variables = sorted(formula.variables())
+        if debug:
+            print('Testing incremental evaluation of', infix)
+        evaluator = IncrementalEvaluator(formula, {variable: False for variable in variables})
+        for model in all_models(variables):
+            for variable in variables:
+                evaluator.set(variable, model[variable])
+            assert evaluator.value() == evaluate(formula, model)
+        for variable in variables:
+            evaluator.flip(variable)
+            model[variable] = not model[variable]
+            assert evaluator.value() == evaluate(formula, model)
+
+
+def test_sweep(debug=False):
+    for infix in infixes:
+        formula = Formula.from_infix(infix)
+        if debug:
+            print('Testing Gray code sweep of', infix)
+        variables = sorted(formula.variables())
+        swept = [(dict(model), value) for model, value in sweep(formula)]
+        assert [model for model, value in swept] == list(all_models(variables, GRAY))
+        assert [value for model, value in swept] == [evaluate(formula, model) for model, value in swept]
+
+
+def test_find_counterexample(debug=False):
+    for infix in infixes:
+        formula = Formula.from_infix(infix)
+        if debug:
+            print('Testing incremental search for a counterexample to', infix)
+        model = find_counterexample(formula)
+        assert (model is None) == is_tautology(formula)
+        assert is_tautology(formula, INCREMENTAL) == is_tautology(formula)
+        if model is not None:
+            assert not evaluate(formula, model)
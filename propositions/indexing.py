@@ -0,0 +1,252 @@
+""" (c) This file is part of the course
+    Mathematical Logic through Programming
+    by Gonczarowski and Nisan.
+    File name: code/propositions/indexing.py """
+
+from propositions.syntax import *
+from propositions.proofs import *
+from propositions.validation import compile_rule
+
+# The symbol that stands in a discrimination tree for a template variable,
+# which matches any formula
+WILDCARD = '*'
+
+
+def _arity(symbol):
+    if is_unary(symbol):
+        return 1
+    if is_binary(symbol):
+        return 2
+    if is_ternary(symbol):
+        return 3
+    return 0
+
+
+class DiscriminationTree:
+    """ Maps formulae to lists of values, in a trie over the symbols of the
+        formulae in prefix order. Some variables of a stored formula may be
+        stored as WILDCARD, so that the formula stands for all of its
+        instances. Lookups return a superset of the matching values, since
+        repeated variables are not checked to be substituted consistently """
+
+    def __init__(self):
+        self.root = {}
+
+    def insert(self, formula, value, wildcards=()):
+        """ Add the given value to the values of the given formula, in which
+            the given variables are wildcards """
+        node = self.root
+        pending = [formula]
+        while pending:
+            formula = pending.pop()
+            symbol = WILDCARD if formula.root in wildcards else formula.root
+            node = node.setdefault(symbol, {})
+            if symbol != WILDCARD:
+                pending.extend(reversed(formula.operands()))
+        node.setdefault(None, []).append(value)
+
+    def generalizations(self, formula):
+        """ Return an iterator over the values of the stored formulae of
+            which the given formula may be an instance """
+        # The formulae still to be matched are kept as a linked list of pairs
+        states = [(self.root, (formula, None))]
+        while states:
+            node, pending = states.pop()
+            if pending is None:
+                yield from node.get(None, ())
+                continue
+            formula, rest = pending
+            if WILDCARD in node:
+                states.append((node[WILDCARD], rest))
+            if formula.root in node:
+                for operand in reversed(formula.operands()):
+                    rest = (operand, rest)
+                states.append((node[formula.root], rest))
+
+    def _skip(self, node):
+        """ Return an iterator over the nodes reached from the given node by
+            the symbols of a single stored formula """
+        states = [(node, 1)]
+        while states:
+            node, needed = states.pop()
+            if needed == 0:
+                yield node
+                continue
+            for symbol, child in node.items():
+                if symbol is not None:
+                    states.append((child, needed - 1 + _arity(symbol)))
+
+    def instances(self, template, instantiation_map):
+        """ Return an iterator over the values of the stored formulae that may
+            be instances of the given template consistently with the given
+            map: each variable of the template in the map stands for the
+            formula it is mapped to, and any other one for any formula """
+        # The pending formulae are flagged with whether they are parts of the
+        # template, whose variables are wildcards or are to be substituted
+        states = [(self.root, (template, True, None))]
+        while states:
+            node, pending = states.pop()
+            if pending is None:
+                yield from node.get(None, ())
+                continue
+            formula, in_template, rest = pending
+            if in_template and is_variable(formula.root):
+                if formula.root not in instantiation_map:
+                    for child in self._skip(node):
+                        states.append((child, rest))
+                    continue
+                formula, in_template = instantiation_map[formula.root], False
+            if WILDCARD in node:
+                states.append((node[WILDCARD], rest))
+            if formula.root in node:
+                for operand in reversed(formula.operands()):
+                    rest = (operand, in_template, rest)
+                states.append((node[formula.root], rest))
+
+
+class RuleIndex:
+    """ An index of a list of inference rules by their conclusions, which
+        finds the rules that a formula may be a conclusion of, and the
+        justifications of proof lines, without trying every rule """
+
+    def __init__(self, rules):
+        self.rules = rules
+        self.tree = DiscriminationTree()
+        self.conclusions = []
+        for index, rule in enumerate(rules):
+            self.tree.insert(rule.conclusion, index, rule.variables())
+            self.conclusions.append(compile_rule(InferenceRule([], rule.conclusion)).instantiation)
+        # The assumptions of each rule in the order they are matched: those
+        # whose variables are all in the conclusion first, then larger first
+        self.orders = []
+        for rule in rules:
+            variables = rule.conclusion.variables()
+            self.orders.append(sorted(range(len(rule.assumptions)), key=lambda position: (
+                not rule.assumptions[position].variables() <= variables, -rule.assumptions[position].size())))
+
+    def candidates(self, formula):
+        """ Return the sorted list of the indices of the rules whose
+            conclusion may have the given formula as an instance """
+        return sorted(set(self.tree.generalizations(formula)))
+
+    def instances(self, formula):
+        """ Return a list of pairs of the index of each rule whose conclusion
+            has the given formula as an instance, in order, and the map from
+            the variables of that conclusion to the formulae substituted for
+            them """
+        found = []
+        for index in self.candidates(formula):
+            instantiation_map = self.conclusions[index](formula)
+            if instantiation_map is not None:
+                found.append((index, instantiation_map))
+        return found
+
+    def justify(self, formula, lines):
+        """ Return a pair of the index of a rule and a list of numbers of
+            lines, such that the rule instantiated to the conclusions of these
+            lines as assumptions and the given formula as conclusion is an
+            instance of the rule, or None if there is no such pair. The lines
+            are given as a LineIndex of the conclusions of previous lines """
+        for index, instantiation_map in self.instances(formula):
+            justification = self._assumptions(index, instantiation_map, lines)
+            if justification is not None:
+                return index, justification
+        return None
+
+    def _assumptions(self, index, instantiation_map, lines):
+        """ Return the list of numbers of lines whose conclusions instantiate
+            the assumptions of the rule with the given index consistently with
+            the given map, or None. Assumptions whose variables are all
+            assigned are looked up directly, and the others are matched with
+            the candidates found in lines, backtracking on failure """
+        assumptions = self.rules[index].assumptions
+        order = self.orders[index]
+        states = [(0, instantiation_map, ())]
+        while states:
+            step, instantiation_map, chosen = states.pop()
+            if step == len(order):
+                justification = [None] * len(assumptions)
+                for position, number in zip(order, chosen):
+                    justification[position] = number
+                return justification
+            template = assumptions[order[step]]
+            if template.variables() <= instantiation_map.keys():
+                number = lines.find(instantiate(template, instantiation_map))
+                if number is not None:
+                    states.append((step + 1, instantiation_map, chosen + (number,)))
+                continue
+            matches = compile_rule(InferenceRule([], template)).instantiation
+            options = []
+            for number in lines.instances(template, instantiation_map):
+                extension = matches(lines.conclusions[number])
+                if extension is not None and all(instantiation_map.get(variable, formula) is formula
+                                                 for variable, formula in extension.items()):
+                    options.append((step + 1, dict(instantiation_map, **extension), chosen + (number,)))
+            states.extend(sorted(options, key=lambda state: -state[2][-1]))
+        return None
+
+
+class LineIndex:
+    """ An index of the conclusions of the lines of a proof, added in order,
+        by their formulae, by their roots with each of their operands, and in
+        a discrimination tree """
+
+    def __init__(self):
+        self.conclusions = []
+        self.numbers = {}
+        self.operands = {}
+        self.tree = DiscriminationTree()
+
+    def add(self, conclusion):
+        """ Add a line with the given conclusion and return its number """
+        number = len(self.conclusions)
+        self.conclusions.append(conclusion)
+        if conclusion not in self.numbers:
+            self.numbers[conclusion] = number
+            for position, operand in enumerate(conclusion.operands()):
+                self.operands.setdefault((conclusion.root, position, operand), []).append(number)
+            self.tree.insert(conclusion, number)
+        return number
+
+    def find(self, conclusion):
+        """ Return the number of the first line with the given conclusion, or
+            None if there is none """
+        return self.numbers.get(conclusion)
+
+    def instances(self, template, instantiation_map):
+        """ Return an iterator over the numbers of lines whose conclusions may
+            be instances of the given template consistently with the given
+            map, as in DiscriminationTree.instances. If all the variables of
+            some operand of the template are in the map, only the lines whose
+            conclusions have the same root and that operand are returned """
+        for position, operand in enumerate(template.operands()):
+            if operand.variables() <= instantiation_map.keys():
+                key = (template.root, position, instantiate(operand, instantiation_map))
+                return iter(self.operands.get(key, ()))
+        return self.tree.instances(template, instantiation_map)
+
+
+def rejustify(proof, rules=None):
+    """ Return a proof of the statement of the given proof via the given list
+        of inference rules (by default, the rules of proof), with the same
+        conclusions in its lines, but with the rule and justification of each
+        line found anew with a RuleIndex. Lines with assumptions of the
+        statement as their conclusions become assumption lines. Raise
+        ValueError if some line cannot be justified by the lines before it """
+    if rules is None:
+        rules = proof.rules
+    index = RuleIndex(rules)
+    assumptions = set(proof.statement.assumptions)
+    lines = LineIndex()
+    new_lines = []
+    for number, line in enumerate(proof.lines):
+        conclusion = line.conclusion
+        if conclusion in assumptions:
+            new_lines.append(DeductiveProof.Line(conclusion))
+        else:
+            found = index.justify(conclusion, lines)
+            if found is None:
+                raise ValueError('Line %d, %s, cannot be justified' % (number, conclusion.infix()))
+            new_lines.append(DeductiveProof.Line(conclusion, *found))
+        lines.add(conclusion)
+    return DeductiveProof(proof.statement, rules, new_lines)
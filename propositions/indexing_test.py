@@ -0,0 +1,71 @@
+""" (c) This file is part of the course
+    Mathematical Logic through Programming
+    by Gonczarowski and Nisan.
+    File name: code/propositions/indexing_test.py """
+
+from random import Random
+
+from propositions.syntax import *
+from propositions.proofs import *
+from propositions.tautology import *
+from propositions.indexing import *
+
+
+def test_discrimination_tree(debug=False):
+    tree = DiscriminationTree()
+    stored = ['(x->y)', '(x->(y|z))', '((x&y)->y)', '~x', '(p?q:r)', 'T']
+    for position, infix in enumerate(stored):
+        tree.insert(Formula.from_infix(infix), position)
+    for template, instantiation_map, expected in [['(p->q)', {}, [0, 1, 2]], ['(p->q)', {'q': 'y'}, [0, 2]],
+                                                  ['(p->p)', {}, [0, 1, 2]], ['(p->(q|r))', {'p': 'x'}, [1]],
+                                                  ['~p', {}, [3]], ['(p?q:r)', {'p': 'p'}, [4]], ['p', {}, [0, 1, 2, 3, 4, 5]],
+                                                  ['(p&q)', {}, []]]:
+        if debug:
+            print('Testing the stored instances of', template, 'under', instantiation_map)
+        instantiation_map = {variable: Formula.from_infix(infix) for variable, infix in instantiation_map.items()}
+        assert sorted(tree.instances(Formula.from_infix(template), instantiation_map)) == expected
+    tree = DiscriminationTree()
+    tree.insert(Formula.from_infix('(p->(q->p))'), 0, {'p', 'q'})
+    tree.insert(Formula.from_infix('(p->T)'), 1, {'p'})
+    assert sorted(tree.generalizations(Formula.from_infix('(x->(y->x))'))) == [0]
+    assert sorted(tree.generalizations(Formula.from_infix('(x->(y->y))'))) == [0]
+    assert sorted(tree.generalizations(Formula.from_infix('(x->T)'))) == [1]
+
+
+def test_rule_index(debug=False):
+    index = RuleIndex(AXIOMATIC_SYSTEM)
+    for infix in ['((x->y)->(x->y))', '(x->(y->x))', '~~(x&y)', '(~(x|y)->~x)', 'T', '~F', '((x&y)->(~y->~x))',
+                  '((~x->~y)->((~x->y)->x))', '(((x->y)->z)->((x->y)->z))', 'x', '(x|y)']:
+        formula = Formula.from_infix(infix)
+        if debug:
+            print('Testing the rules whose conclusion', infix, 'is an instance of')
+        expected = []
+        for position, rule in enumerate(AXIOMATIC_SYSTEM):
+            instantiation_map = {}
+            if InferenceRule([], formula).is_instance_of(InferenceRule([], rule.conclusion), instantiation_map):
+                expected.append((position, instantiation_map))
+        assert index.instances(formula) == expected
+        assert {position for position, instantiation_map in expected} <= set(index.candidates(formula))
+
+
+def test_rejustify(debug=False):
+    random = Random(0)
+    for infix in ['((p->q)->(~q->~p))', '(((p->q)&(q->r))->(p->r))', '((x|y)->(y|x))']:
+        proof = proof_or_counterexample(Formula.from_infix(infix))
+        rules = list(proof.rules)
+        random.shuffle(rules)
+        if debug:
+            print('Testing the rejustification of a proof of', infix, 'via', rules)
+        rejustified = rejustify(proof, rules)
+        assert rejustified.rules == rules
+        assert [line.conclusion for line in rejustified.lines] == [line.conclusion for line in proof.lines]
+        assert rejustified.is_valid()
+    statement = InferenceRule([Formula.from_infix('x')], Formula.from_infix('(y->x)'))
+    lines = [DeductiveProof.Line(Formula.from_infix(infix)) for infix in ['x', '(x->(y->x))', '(y->x)']]
+    rejustified = rejustify(DeductiveProof(statement, AXIOMATIC_SYSTEM, lines))
+    assert [(line.rule, line.justification) for line in rejustified.lines] == [(None, None), (1, []), (0, [0, 1])]
+    try:
+        rejustify(DeductiveProof(statement, [AXIOMATIC_SYSTEM[0]], lines))
+        assert False
+    except ValueError:
+        pass
@@ -0,0 +1,87 @@
+""" (c) This file is part of the course
+    Mathematical Logic through Programming
+    by Gonczarowski and Nisan.
+    File name: code/propositions/inference.py """
+
+from random import Random
+
+from propositions.syntax import *
+from propositions.compiler import compile_formula, model_from_index
+from propositions.truth_table import DEFAULT_CHUNK_VARIABLES, TruthTable, evaluate_columns
+from propositions.sat import Solver, encode
+
+# Selectivity is estimated on this many random models, evaluated at once as
+# the bits of random columns
+SAMPLE_SIZE = 64
+
+
+class InferenceChecker:
+    """ Checks an inference rule given by a list of assumptions and a
+        conclusion. The formulae are compiled once, and the assumptions are
+        ordered by their estimated selectivity, the one that holds in the
+        fewest sampled models first, so that a model is dropped as soon as
+        possible once one assumption is false in it """
+
+    def __init__(self, assumptions, conclusion):
+        variables = set(conclusion.variables())
+        for assumption in assumptions:
+            variables |= assumption.variables()
+        self.variables = sorted(variables)
+        random = Random(0)
+        full = (1 << SAMPLE_SIZE) - 1
+        columns = {variable: random.getrandbits(SAMPLE_SIZE) for variable in self.variables}
+        selectivity = {assumption: bin(evaluate_columns(assumption, columns, full)).count('1')
+                       for assumption in assumptions}
+        self.assumptions = sorted(assumptions, key=selectivity.get)
+        self.conclusion = conclusion
+        self.compiled_assumptions = [compile_formula(assumption).from_model
+                                     for assumption in self.assumptions]
+        self.compiled_conclusion = compile_formula(conclusion).from_model
+
+    def holds(self, model):
+        """ Return whether the rule holds in the given model, that is, whether
+            some assumption is false in it or the conclusion is true in it """
+        for assumption in self.compiled_assumptions:
+            if not assumption(model):
+                return True
+        return self.compiled_conclusion(model)
+
+    def find_counterexample(self, chunk_variables=DEFAULT_CHUNK_VARIABLES):
+        """ Return a model over the variables of the rule in which all the
+            assumptions hold and the conclusion does not, or None if there is
+            no such model. Models are checked a chunk of rows of the truth
+            tables at a time, as in TruthTable: the rows where all the
+            assumptions so far hold are intersected with the column of the
+            next assumption, and the rest of a chunk is skipped as soon as no
+            row is left """
+        tables = [TruthTable(assumption, self.variables, chunk_variables) for assumption in self.assumptions]
+        conclusion = TruthTable(self.conclusion, self.variables, chunk_variables)
+        full = (1 << conclusion.chunk_rows) - 1
+        for number in range(conclusion.rows // conclusion.chunk_rows):
+            rows = full
+            for table in tables:
+                rows &= table.chunk(number)
+                if not rows:
+                    break
+            else:
+                rows &= full ^ conclusion.chunk(number)
+                if rows:
+                    row = number * conclusion.chunk_rows + (rows & -rows).bit_length() - 1
+                    return model_from_index(self.variables, row)
+        return None
+
+    def find_counterexample_with_sat(self):
+        """ Return a counterexample as find_counterexample does, found by the
+            SAT solver on the Tseitin encodings of the assumptions and the
+            negation of the conclusion, which share the encodings of common
+            subformulae. The assumptions are added in their order, so unit
+            propagation starts from the most selective one """
+        solver = Solver()
+        variables = {}
+        literals = {}
+        for assumption in self.assumptions:
+            solver.add_clause([encode(assumption, solver, variables, literals)])
+        solver.add_clause([-encode(self.conclusion, solver, variables, literals)])
+        if not solver.solve():
+            return None
+        return {variable: solver.value(variables[variable]) for variable in self.variables}
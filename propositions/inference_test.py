@@ -0,0 +1,52 @@
+""" (c) This file is part of the course
+    Mathematical Logic through Programming
+    by Gonczarowski and Nisan.
+    File name: code/propositions/inference_test.py """
+
+from propositions.syntax import *
+from propositions.semantics import *
+from propositions.proofs import InferenceRule
+from propositions.inference import *
+
+rules = [[[], '(~p|p)', True], [[], '(p|p)', False], [['(~p|q)', 'p'], 'q', True], [['(p|q)', 'p'], 'q', False],
+         [['(p|q)', '(~p|r)'], '(q|r)', True], [['(p->q)', '(q->r)'], 'r', False],
+         [['(p->q)', '(q->r)'], '(p->r)', True], [['(x&y)', 'T'], 'x', True], [['F'], 'x', True],
+         [['(x?y:z)', '~y', '(x|w)'], '(w&z)', True], [['(x?y:z)', '~y'], '(w&z)', False]]
+
+
+def test_selectivity_order(debug=False):
+    assumptions = [Formula.from_infix(infix) for infix in ['(p|(q|r))', '((p&q)&r)', 'T', '(p&q)']]
+    if debug:
+        print('Testing the order of assumptions', assumptions)
+    checker = InferenceChecker(assumptions, Formula('s'))
+    assert checker.assumptions[0] == assumptions[1]
+    assert checker.assumptions[1] == assumptions[3]
+    assert checker.assumptions[-1] == assumptions[2]
+    assert checker.variables == ['p', 'q', 'r', 's']
+
+
+def test_inference_backends(debug=False):
+    for assumptions, conclusion, tautological in rules:
+        rule = InferenceRule([Formula.from_infix(assumption) for assumption in assumptions],
+                             Formula.from_infix(conclusion))
+        variables = sorted(set(rule.conclusion.variables()).union(
+            *[assumption.variables() for assumption in rule.assumptions]))
+        for backend in [TRUTH_TABLE, SAT, BDD, INCREMENTAL, AUTO]:
+            if debug:
+                print('Testing', rule, 'with the', backend, 'backend')
+            assert is_tautological_inference(rule, backend) == tautological
+            model = find_inference_counterexample(rule, backend)
+            assert (model is None) == tautological
+            if model is not None:
+                assert not evaluate_inference(rule, dict({variable: False for variable in variables}, **model))
+        checker = InferenceChecker(rule.assumptions, rule.conclusion)
+        for chunk_variables in [0, 1, 2]:
+            assert (checker.find_counterexample(chunk_variables) is None) == tautological
+
+
+def test_evaluate_inference_without_assumptions(debug=False):
+    rule = InferenceRule([], Formula.from_infix('(p|q)'))
+    if debug:
+        print('Testing evaluation of', rule)
+    for model in all_models(['p', 'q']):
+        assert evaluate_inference(rule, model) == (model['p'] or model['q'])
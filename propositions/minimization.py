@@ -0,0 +1,269 @@
+""" (c) This file is part of the course
+    Mathematical Logic through Programming
+    by Gonczarowski and Nisan.
+    File name: code/propositions/minimization.py """
+
+from propositions.syntax import *
+from propositions.truth_table import bit_column
+
+# A function over n variables is given by integers of 2**n bits, whose bit i
+# is the value in model number i in the order of all_models: an on table of
+# the models where it must be true, and a don't care table of the models
+# where it may be either. A cube is a pair (value, mask) of n-bit integers,
+# matching the models whose number agrees with value on the bits of mask, and
+# variable number p (from zero) is bit n-1-p.
+
+# Methods of minimize
+EXACT = 'exact'
+HEURISTIC = 'heuristic'
+
+# By default, functions over at most this many variables are minimized exactly
+EXACT_VARIABLES = 6
+
+
+def _popcount(number):
+    return bin(number).count('1')
+
+
+def _rows(table):
+    """ Return the list of the numbers of the set bits of the given table """
+    rows = []
+    while table:
+        low = table & -table
+        rows.append(low.bit_length() - 1)
+        table ^= low
+    return rows
+
+
+def cube_table(count, cube):
+    """ Return the table over the given number of variables of the models that
+        match the given cube """
+    value, mask = cube
+    full = (1 << (1 << count)) - 1
+    table = full
+    for bit in range(count):
+        if mask >> bit & 1:
+            column = bit_column(count, bit)
+            table &= column if value >> bit & 1 else full ^ column
+    return table
+
+
+def prime_implicants(count, on, dont_care=0):
+    """ Return the set of the prime implicants of the given function over the
+        given number of variables, found by Quine-McCluskey: cubes that differ
+        in the value of a single bit of their mask are merged, level by
+        level, and cubes that merge with no other cube are prime """
+    full = (1 << count) - 1
+    cubes = {(row, full) for row in _rows(on | dont_care)}
+    primes = set()
+    while cubes:
+        merged = set()
+        used = set()
+        for value, mask in cubes:
+            for bit in range(count):
+                single = 1 << bit
+                if mask & single and not value & single and (value | single, mask) in cubes:
+                    merged.add((value, mask ^ single))
+                    used.add((value, mask))
+                    used.add((value | single, mask))
+        primes |= cubes - used
+        cubes = merged
+    return primes
+
+
+def _cost(cubes):
+    return len(cubes), sum(_popcount(mask) for value, mask in cubes)
+
+
+def quine_mccluskey(count, on, dont_care=0):
+    """ Return a list of cubes whose union is a minimum sum of products for
+        the given function over the given number of variables: the fewest
+        cubes, and the fewest literals among those. Essential prime
+        implicants are taken first, and the rest of the on rows are covered
+        by a branch and bound search over the prime implicants """
+    rows = _rows(on)
+    primes = sorted(prime_implicants(count, on, dont_care), key=lambda cube: _popcount(cube[1]))
+    covers = []
+    for value, mask in primes:
+        covered = 0
+        for position, row in enumerate(rows):
+            if row & mask == value:
+                covered |= 1 << position
+        covers.append(covered)
+    universe = (1 << len(rows)) - 1
+    chosen = []
+    covered = 0
+    for position in range(len(rows)):
+        covering = [index for index, cover in enumerate(covers) if cover >> position & 1]
+        if len(covering) == 1 and covering[0] not in chosen:
+            chosen.append(covering[0])
+            covered |= covers[covering[0]]
+    best = _greedy_cover(covers, universe, chosen, covered)
+    best_cost = _cost([primes[index] for index in best])
+    literals = [_popcount(mask) for value, mask in primes]
+    # The primes covering each row, as a bitmask of their indices
+    coverings = [sum(1 << index for index, cover in enumerate(covers) if cover >> position & 1)
+                 for position in range(len(rows))]
+    # Each state is a list of chosen primes and the rows they cover, and the
+    # cheapest way found to cover each set of rows is remembered
+    pending = [(chosen, covered, sum(literals[index] for index in chosen))]
+    cheapest = {}
+    while pending:
+        chosen, covered, cost = pending.pop()
+        if covered in cheapest and cheapest[covered] <= (len(chosen), cost):
+            continue
+        cheapest[covered] = (len(chosen), cost)
+        if covered == universe:
+            if (len(chosen), cost) < best_cost:
+                best, best_cost = chosen, (len(chosen), cost)
+            continue
+        uncovered = sorted(_rows(universe ^ covered), key=lambda position: _popcount(coverings[position]))
+        # Rows that no single prime covers together need a prime each
+        bound = 0
+        used = 0
+        for position in uncovered:
+            if not coverings[position] & used:
+                bound += 1
+                used |= coverings[position]
+        if (len(chosen) + bound, cost) >= best_cost:
+            continue
+        for index in sorted(_rows(coverings[uncovered[0]]), key=lambda index: _popcount(covers[index] & ~covered)):
+            pending.append((chosen + [index], covered | covers[index], cost + literals[index]))
+    return [primes[index] for index in best]
+
+
+def _greedy_cover(covers, universe, chosen, covered):
+    chosen = list(chosen)
+    while covered != universe:
+        index = max(range(len(covers)), key=lambda index: _popcount(covers[index] & ~covered))
+        chosen.append(index)
+        covered |= covers[index]
+    return chosen
+
+
+def _expand(count, cube, off, order):
+    """ Return a cube containing the given cube and disjoint from the off
+        table, obtained by dropping the bits of the mask in the given order
+        whenever the larger cube stays disjoint from off """
+    value, mask = cube
+    for bit in order:
+        single = 1 << bit
+        if mask & single:
+            larger = (value & ~single, mask ^ single)
+            if not cube_table(count, larger) & off:
+                value, mask = larger
+    return value, mask
+
+
+def _irredundant(count, cubes, on):
+    """ Return the given cubes without those whose on rows are covered by the
+        others, dropping the cubes with the most literals first """
+    tables = [cube_table(count, cube) & on for cube in cubes]
+    kept = list(range(len(cubes)))
+    for index in sorted(kept, key=lambda index: -_popcount(cubes[index][1])):
+        others = 0
+        for other in kept:
+            if other != index:
+                others |= tables[other]
+        if not tables[index] & ~others:
+            kept.remove(index)
+    return [cubes[index] for index in kept]
+
+
+def _reduce(count, cubes, on):
+    """ Return the given cubes, each shrunk in turn to the smallest cube that
+        contains the on rows covered by it alone """
+    cubes = list(cubes)
+    full = (1 << (1 << count)) - 1
+    for index in range(len(cubes)):
+        others = 0
+        for other, cube in enumerate(cubes):
+            if other != index:
+                others |= cube_table(count, cube)
+        unique = cube_table(count, cubes[index]) & on & ~others
+        if not unique:
+            continue
+        value, mask = 0, 0
+        for bit in range(count):
+            column = bit_column(count, bit)
+            if not unique & (full ^ column):
+                value |= 1 << bit
+                mask |= 1 << bit
+            elif not unique & column:
+                mask |= 1 << bit
+        cubes[index] = (value, mask)
+    return cubes
+
+
+def espresso(count, on, dont_care=0):
+    """ Return a list of cubes whose union is a small sum of products for the
+        given function over the given number of variables, found by an
+        Espresso-style heuristic: every on row that is not yet covered is
+        expanded into a prime implicant and redundant cubes are dropped, and
+        then the cubes are repeatedly reduced, expanded in the opposite order
+        of bits and made irredundant, for as long as this lowers the cost """
+    full = (1 << (1 << count)) - 1
+    off = full & ~(on | dont_care)
+    order = list(range(count))
+    cubes = []
+    covered = 0
+    remaining = on
+    while remaining:
+        row = (remaining & -remaining).bit_length() - 1
+        cube = _expand(count, (row, (1 << count) - 1), off, order)
+        cubes.append(cube)
+        covered |= cube_table(count, cube)
+        remaining = on & ~covered
+    cubes = _irredundant(count, cubes, on)
+    cost = _cost(cubes)
+    while True:
+        order.reverse()
+        candidate = [_expand(count, cube, off, order) for cube in _reduce(count, cubes, on)]
+        candidate = _irredundant(count, list(dict.fromkeys(candidate)), on)
+        if _cost(candidate) >= cost:
+            return cubes
+        cubes, cost = candidate, _cost(candidate)
+
+
+def cubes_to_formula(variables, cubes):
+    """ Return the disjunction of the conjunctions of the literals of the
+        given cubes over the given list of variables. The empty disjunction
+        and the empty conjunction are expressed over the first variable """
+    count = len(variables)
+    first = Formula(variables[0])
+    if not cubes:
+        return Formula('&', first, Formula('~', first))
+    disjunction = None
+    for value, mask in cubes:
+        conjunction = None
+        for position, variable in enumerate(variables):
+            bit = count - 1 - position
+            if mask >> bit & 1:
+                literal = Formula(variable) if value >> bit & 1 else Formula('~', Formula(variable))
+                conjunction = literal if conjunction is None else Formula('&', conjunction, literal)
+        if conjunction is None:
+            return Formula('|', first, Formula('~', first))
+        disjunction = conjunction if disjunction is None else Formula('|', disjunction, conjunction)
+    return disjunction
+
+
+def minimal_cubes(count, on, dont_care=0, method=None):
+    """ Return a list of cubes whose union is a sum of products for the given
+        function over the given number of variables, minimized with the given
+        method: EXACT or HEURISTIC, by default EXACT for at most
+        EXACT_VARIABLES variables """
+    if method is None:
+        method = EXACT if count <= EXACT_VARIABLES else HEURISTIC
+    if method == EXACT:
+        return quine_mccluskey(count, on, dont_care)
+    elif method == HEURISTIC:
+        return espresso(count, on, dont_care)
+    raise ValueError('Unknown method ' + str(method))
+
+
+def minimize(variables, on, dont_care=0, method=None):
+    """ Return a sum of products formula over the given list of variables that
+        is true in the models of the on table and false outside the on and
+        don't care tables, minimized with the given method as in
+        minimal_cubes """
+    return cubes_to_formula(variables, minimal_cubes(len(variables), on, dont_care, method))
@@ -0,0 +1,69 @@
+""" (c) This file is part of the course
+    Mathematical Logic through Programming
+    by Gonczarowski and Nisan.
+    File name: code/propositions/minimization_test.py """
+
+from propositions.syntax import *
+from propositions.semantics import *
+from propositions.minimization import *
+
+
+def _check(variables, on, dont_care, formula):
+    for row, value in enumerate(truth_values(formula, all_models(variables))):
+        if not dont_care >> row & 1:
+            assert value == bool(on >> row & 1)
+
+
+def test_prime_implicants(debug=False):
+    # (p&q)|(~p&r) has the consensus term (q&r) as a third prime implicant
+    formula = Formula.from_infix('((p&q)|(~p&r))')
+    on = TruthTable(formula).chunk(0)
+    if debug:
+        print('Testing the prime implicants of', formula)
+    assert prime_implicants(3, on) == {(0b110, 0b110), (0b001, 0b101), (0b011, 0b011)}
+    assert sorted(quine_mccluskey(3, on)) == [(0b001, 0b101), (0b110, 0b110)]
+
+
+def test_minimize(debug=False):
+    cases = [['(p|(q&r))', 2], ['((p&q)|((p&~q)|(~p&q)))', 2], ['((p<->q)<->r)', 4], ['(p|~p)', 1],
+             ['(p&~p)', 0], ['(((p&q)&r)|(((p&q)&~r)|((p&~q)&r)))', 2],
+             ['((x1&x2)|((x3&~x4)|(x5&(x2|x6))))', 4]]
+    for infix, size in cases:
+        formula = Formula.from_infix(infix)
+        variables = sorted(formula.variables())
+        on = TruthTable(formula).chunk(0)
+        for method in [EXACT, HEURISTIC]:
+            if debug:
+                print('Testing', method, 'minimization of', infix)
+            minimized = minimize(variables, on, method=method)
+            _check(variables, on, 0, minimized)
+            if method == EXACT:
+                assert len(quine_mccluskey(len(variables), on)) == size
+            assert len(espresso(len(variables), on)) >= size
+
+
+def test_dont_cares(debug=False):
+    # Binary coded decimal digits 0-9 whose segment e is lit: 0, 2, 6, 8
+    variables = ['p', 'q', 'r', 's']
+    on = (1 << 0) | (1 << 2) | (1 << 6) | (1 << 8)
+    dont_care = sum(1 << row for row in range(10, 16))
+    if debug:
+        print('Testing minimization with don\'t cares')
+    for method in [EXACT, HEURISTIC]:
+        formula = minimize(variables, on, dont_care, method)
+        _check(variables, on, dont_care, formula)
+    assert sorted(quine_mccluskey(4, on, dont_care)) == [(0b0000, 0b0101), (0b0010, 0b0011)]
+
+
+def test_synthesize_minimized(debug=False):
+    variables = ['p', 'q', 'r']
+    models = list(all_models(variables))
+    values = [model['p'] or model['q'] for model in models]
+    if debug:
+        print('Testing minimized synthesis')
+    formula = synthesize(models, values, minimize=True)
+    assert truth_values(formula, models) == values
+    assert formula.variables() == {'p', 'q'}
+    formula = synthesize(models[:4], values[:4], minimize=HEURISTIC)
+    assert truth_values(formula, models[:4]) == values[:4]
+    assert formula == Formula('q')
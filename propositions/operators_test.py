@@ -163,3 +163,23 @@ def __count_operators(formula):
         return 1 + reduce(add, [__count_operators(getattr(formula, attr))
                                 for attr in ('first', 'second', 'third')
                                 if hasattr(formula, attr)])
+
+
+def test_to_deep_formula(debug=False):
+    if debug:
+        print('Testing reductions of a formula 3000 levels deep')
+    formula = Formula('p')
+    for i in range(3000):
+        formula = Formula(['|', '->', '<->', '-&', '-|', '?:'][i % 6], formula, Formula('~', Formula('q')),
+                          Formula('r') if i % 6 == 5 else None)
+    models = list(all_models(['p', 'q', 'r']))
+    values = truth_values(formula, models)
+    for reduction, tokens in [[to_not_and_or, ['~', '&', '|', 'T', 'F']],
+                              [to_not_and, ['~', '&']],
+                              [to_implies_false, ['->', 'F']],
+                              [to_nand, ['-&']],
+                              [to_nor, ['-|']],
+                              [to_mux, ['?:', 'F', 'T']]]:
+        reduced = reduction(formula)
+        assert {node.root for node in postorder(reduced)} <= set(tokens + ['p', 'q', 'r'])
+        assert truth_values(reduced, models) == values
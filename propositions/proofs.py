@@ -5,7 +5,7 @@
 
 from propositions.syntax import *
 from propositions.semantics import *
-from copy import deepcopy
+from propositions.validation import ProofValidator, compile_rule
 
 
 class InferenceRule:
@@ -162,170 +162,184 @@ class DeductiveProof:
         conclusion = self.lines[line].conclusion
         return InferenceRule(assumption_list, conclusion)
 
-    def is_valid(self):
-        """ Return whether lines are a valid proof of statement from rules """
-        for line in range(len(self.lines)):
-            if self.lines[line].rule is None:
-                if not self.lines[line].conclusion in self.statement.assumptions:
-                    return False
-            else:
-                justification = self.lines[line].justification
-                if justification is None:
-                    return False
-                elif len(justification) > 0 and (
-                        line < max(justification) or min(justification) < 0):
-                    x=self.lines[line]
-                    return False
-                inference_rule_to_check = self.instance_for_line(line)
-                rule_to_check = self.rules[self.lines[line].rule]
-                if not inference_rule_to_check.is_instance_of(rule_to_check):
-                    inference_rule_to_check.is_instance_of(rule_to_check)
-                    return False
-        if len(self.lines) == 0:
-            if self.statement.conclusion == Formula(TRUE) or \
-                            self.statement.conclusion == Formula(NOT, Formula(FALSE)):
-                return True
-            else:
-                return False
-        if self.statement.conclusion == self.lines[len(self.lines) - 1].conclusion:
-            return True
-        return False
+    def first_error(self, workers=None):
+        """ Return None if lines are a valid proof of statement from rules,
+            and otherwise a pair of the number of the first invalid line (or
+            None if only the proof as a whole is invalid) and the reason why
+            it is invalid. If a number of workers is given, the lines are
+            checked in a pool of that many processes """
+        return ProofValidator(self.statement, self.rules).first_error(self.lines, workers)
 
+    def is_valid(self, workers=None):
+        """ Return whether lines are a valid proof of statement from rules,
+            checked in a pool of the given number of worker processes if
+            given """
+        return self.first_error(workers) is None
 
-def instantiate(formula, instantiation_map):
+
+def instantiate(formula, instantiation_map, results=None):
     """ Return a formula obtained from the given formula by simultaneously
         substituting, for each variable v that is a key of instantiation_map,
-        each occurrence v with the formula instantiation_map[v] """
-    first, second, third = None, None, None
-    if is_unary(formula.root):
-        first = instantiate(formula.first, instantiation_map)
-    elif is_binary(formula.root):
-        first = instantiate(formula.first, instantiation_map)
-        second = instantiate(formula.second, instantiation_map)
-    elif is_ternary(formula.root):
-        first = instantiate(formula.first, instantiation_map)
-        second = instantiate(formula.second, instantiation_map)
-        third = instantiate(formula.third, instantiation_map)
-    elif is_variable(formula.root):
-        if formula.root in instantiation_map:
-            return deepcopy(instantiation_map[formula.root])
-        else:
-            return deepcopy(formula)
+        each occurrence v with the formula instantiation_map[v]. Subformulae
+        without substituted variables are shared with the given formula. If
+        a results dictionary is given, it memoizes the instances of
+        subformulae, and may be shared between calls with the same map """
+
+    def substitute(node, operands):
+        if is_variable(node.root):
+            return instantiation_map.get(node.root, node)
+        return Formula(node.root, *operands) if operands else node
 
-    return Formula(formula.root, first, second, third)
+    return fold(formula, substitute, results)
 
 
-def change_InferenceRule(inference_rule, instantiation_map):
-    conclusion = instantiate(inference_rule.conclusion, instantiation_map)
-    index_len = len(inference_rule.assumptions)
-    assumptions = []
-    for assumption, index in zip(inference_rule.assumptions, range(index_len)):
-        assumptions.append(instantiate(assumption, instantiation_map))
+def change_InferenceRule(inference_rule, instantiation_map, results=None):
+    if results is None:
+        results = {}
+    conclusion = instantiate(inference_rule.conclusion, instantiation_map, results)
+    assumptions = [instantiate(assumption, instantiation_map, results)
+                   for assumption in inference_rule.assumptions]
     return InferenceRule(assumptions, conclusion)
 
 
 def prove_instance(proof, instance):
     """ Return a proof of the given instance of the inference rule that proof
         proves, via the same inference rules used by proof """
-    tmp_dict = {}
-    proof_deepcopy = deepcopy(proof)
-    instance.is_instance_of(proof_deepcopy.statement, tmp_dict)
-    proof_deepcopy.statement = change_InferenceRule(proof_deepcopy.statement, tmp_dict)
-    for line, index in zip(proof_deepcopy.lines, range(len(proof_deepcopy.lines))):
-        proof_deepcopy.lines[index].conclusion = instantiate(line.conclusion, tmp_dict)
-    return proof_deepcopy
+    instantiation_map = {}
+    instance.is_instance_of(proof.statement, instantiation_map)
+    results = {}
+    lines = [DeductiveProof.Line(instantiate(line.conclusion, instantiation_map, results), line.rule,
+                                 None if line.justification is None else list(line.justification))
+             for line in proof.lines]
+    return DeductiveProof(change_InferenceRule(proof.statement, instantiation_map, results), list(proof.rules),
+                          lines)
+
+
+def _is_instance(rule, template):
+    return len(rule.assumptions) == len(template.assumptions) and \
+           compile_rule(template)(rule.conclusion, *rule.assumptions)
 
 
 def inline_proof_creat_rules(main_proof, lemma_proof):
     """
     create a rule list for inline_proof without the statement of lemma_proof and without rules
     of lemma_proof that are instance of rules of main_proof
-    :return: a list of rules
+    :return: a list of rules, a list of the new index of each rule of main_proof (None for
+    the rule replaced by the lemma), and a list of the new index of each rule of lemma_proof
     """
-    main_rule_list = []
-    lemma_rule_dict, main_rule_dict = {}, {}
-    found_rule = False
-    replace_rule_index = -1
+    rule_list = []
+    main_rule_indices = []
     for main_rule in main_proof.rules:
-        if not main_rule.is_instance_of(lemma_proof.statement):
-            main_rule_list.append(main_rule)
-            main_rule_dict[main_proof.rules.index(main_rule)] = main_rule_list.index(main_rule)
+        if _is_instance(main_rule, lemma_proof.statement):
+            main_rule_indices.append(None)
         else:
-            replace_rule_index = main_proof.rules.index(main_rule)
+            main_rule_indices.append(len(rule_list))
+            rule_list.append(main_rule)
+    lemma_rule_indices = []
     for lemma_rule in lemma_proof.rules:
-        for main_rule, index in zip(main_rule_list, range(len(main_rule_list))):
-            if lemma_rule.is_instance_of(main_rule):
-                found_rule = True
-                lemma_rule_dict[lemma_proof.rules.index(lemma_rule)] = index
+        for index, rule in enumerate(rule_list):
+            if _is_instance(lemma_rule, rule):
+                lemma_rule_indices.append(index)
                 break
-        if not found_rule:
-            main_rule_list.append(lemma_rule)
-            lemma_rule_dict[lemma_proof.rules.index(lemma_rule)] = main_rule_list.index(lemma_rule)
-        found_rule = False
-    return main_rule_list, main_rule_dict, lemma_rule_dict, replace_rule_index
+        else:
+            lemma_rule_indices.append(len(rule_list))
+            rule_list.append(lemma_rule)
+    return rule_list, main_rule_indices, lemma_rule_indices
 
 
-def inline_proof_lemma(main_proof, line_index, lemma_proof, lines, lemma_rule_dict, line_count,
-                       main_lines_dict):
+def inline_proof_lemma(main_proof, line_index, lemma_proof, lines, lemma_rule_indices, line_numbers):
     """
-    create the lines for replace a rule with a lemma
+    append to lines the lines of the proof of the instance of the lemma that justifies the
+    given line of main_proof, instantiated without copying the lemma proof
     :param main_proof: the full proof
     :param line_index: the index of the line in the original proof
     :param lemma_proof: the lemma proof
     :param lines: a list of lines in the new proof
-    :param lemma_rule_dict: a dictionary to find the correct line of the lemma
-    :param line_count: the current index for the latest line
-    :param main_lines_dict: a dictionary to find the correct line in the new proof
-    :return: the list of lines, th line counter and the main lines dictionary
+    :param lemma_rule_indices: the new index of each rule of the lemma
+    :param line_numbers: a dictionary from the conclusions of lines to the first line
+    in the new proof with that conclusion, which is extended with the appended lines
+    :return: the number of the line of the new proof with the conclusion of the lemma instance
+    :raise ValueError: if the lemma proof has no lines, or if the conclusion of an assumption
+    line of the lemma instance is not the conclusion of any previous line of the new proof
     """
-    inference_rule = main_proof.instance_for_line(line_index)
-    new_proof = prove_instance(lemma_proof, inference_rule)
-    lemma_line_dict = {}
-    for lemma_line, lemma_line_index in zip(new_proof.lines, range(len(new_proof.lines))):
+    if len(lemma_proof.lines) == 0:
+        raise ValueError('The lemma proof of ' + str(lemma_proof.statement) + ' has no lines')
+    instantiation_map = {}
+    main_proof.instance_for_line(line_index).is_instance_of(lemma_proof.statement, instantiation_map)
+    results = {}
+    conclusions = [instantiate(lemma_line.conclusion, instantiation_map, results)
+                   for lemma_line in lemma_proof.lines]
+    for lemma_line, conclusion in zip(lemma_proof.lines, conclusions):
+        if lemma_line.rule is None and conclusion not in line_numbers:
+            raise ValueError('The assumption ' + conclusion.infix() + ' of the lemma instance for line ' +
+                             str(line_index) + ' is not the conclusion of any previous line')
+    lemma_line_numbers = []
+    for lemma_line, conclusion in zip(lemma_proof.lines, conclusions):
         if lemma_line.rule is None:
-            for tmp_line, tmp_index in zip(lines, range(len(lines))):
-                if tmp_line.conclusion == lemma_line.conclusion:
-                    lemma_line_dict[lemma_line_index] = tmp_index
-                    break
-        else:
-            lemma_line.rule = lemma_rule_dict[lemma_line.rule]
-            for num, index in zip(lemma_line.justification,
-                                  range(len(lemma_line.justification))):
-                lemma_line.justification[index] = lemma_line_dict[num]
-            lemma_line_dict[lemma_line_index] = line_count
-            lines.append(lemma_line)
-            line_count += 1
-    main_lines_dict[line_index] = line_count - 1
-    lemma_line_dict.clear()
-    return lines, line_count, main_lines_dict
+            lemma_line_numbers.append(line_numbers[conclusion])
+            continue
+        lemma_line_numbers.append(len(lines))
+        line_numbers.setdefault(conclusion, len(lines))
+        lines.append(DeductiveProof.Line(conclusion, lemma_rule_indices[lemma_line.rule],
+                                         [lemma_line_numbers[number] for number in lemma_line.justification]))
+    return lemma_line_numbers[-1]
 
 
 def inline_proof(main_proof, lemma_proof):
     """ Return a proof of the inference rule that main_proof proves, via the
         inference rules used in main_proof except for the one proven by
         lemma_proof, as well as via the inference rules used in lemma_proof
-        (with duplicates removed) """
-    main_proof, lemma_proof = deepcopy(main_proof), deepcopy(lemma_proof)
-    rule_list, main_rule_dict, lemma_rule_dict, lemma_rule_index = inline_proof_creat_rules(
-        main_proof, lemma_proof)
+        (with duplicates removed). Neither proof is copied or modified, and
+        the conclusions of the new lines share their subformulae with them """
+    rule_list, main_rule_indices, lemma_rule_indices = inline_proof_creat_rules(main_proof, lemma_proof)
     lines = []
-    line_count = 0
-    main_lines_dict = {}
-    for line, line_index in zip(main_proof.lines, range(len(main_proof.lines))):
+    # The number of the line of the new proof for each line of main_proof, and
+    # of the first line of the new proof with each conclusion
+    main_line_numbers = []
+    line_numbers = {}
+    for line_index, line in enumerate(main_proof.lines):
+        if line.rule is not None and main_rule_indices[line.rule] is None:
+            main_line_numbers.append(inline_proof_lemma(main_proof, line_index, lemma_proof, lines,
+                                                        lemma_rule_indices, line_numbers))
+            continue
+        main_line_numbers.append(len(lines))
+        line_numbers.setdefault(line.conclusion, len(lines))
         if line.rule is None:
-            lines.append(line)
-            main_lines_dict[line_index] = line_count
-            line_count += 1
-        elif line.rule != lemma_rule_index:
-            main_lines_dict[line_index] = line_count
-            line.rule = main_rule_dict[line.rule]
-            for num, index in zip(line.justification, range(len(line.justification))):
-                line.justification[index] = main_lines_dict[num]
-            lines.append(line)
-            line_count += 1
+            lines.append(DeductiveProof.Line(line.conclusion))
         else:
-            lines, line_count, main_lines_dict = inline_proof_lemma(main_proof, line_index,
-                                                                    lemma_proof, lines,
-                                                                    lemma_rule_dict, line_count,
-                                                                    main_lines_dict)
+            lines.append(DeductiveProof.Line(line.conclusion, main_rule_indices[line.rule],
+                                             [main_line_numbers[number] for number in line.justification]))
     return DeductiveProof(main_proof.statement, rule_list, lines)
+
+
+def compact(proof, statistics=None):
+    """ Return a proof of the inference rule that the given valid proof
+        proves, via the same inference rules, with the lines that the last
+        line does not depend on dropped, and with every line justified by the
+        first line with its conclusion in place of later lines with the same
+        conclusion. If a statistics dictionary is given, it is (cleared and)
+        populated with the numbers of lines before and after compaction """
+    # The number of the first line with the conclusion of each line
+    first_numbers = {}
+    representatives = [first_numbers.setdefault(line.conclusion, number)
+                       for number, line in enumerate(proof.lines)]
+    used = [False] * len(proof.lines)
+    if proof.lines:
+        used[representatives[-1]] = True
+    for number in range(len(proof.lines) - 1, -1, -1):
+        if used[number] and proof.lines[number].justification is not None:
+            for assumption in proof.lines[number].justification:
+                used[representatives[assumption]] = True
+    lines = []
+    new_numbers = {}
+    for number, line in enumerate(proof.lines):
+        if not used[number]:
+            continue
+        new_numbers[number] = len(lines)
+        justification = None if line.justification is None else \
+            [new_numbers[representatives[assumption]] for assumption in line.justification]
+        lines.append(DeductiveProof.Line(line.conclusion, line.rule, justification))
+    if statistics is not None:
+        statistics.clear()
+        statistics.update({'lines_before': len(proof.lines), 'lines_after': len(lines)})
+    return DeductiveProof(proof.statement, list(proof.rules), lines)
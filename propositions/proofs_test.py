@@ -586,3 +586,98 @@ def test_inline_proof_extended(debug):
     assert inlined_proof.rules == [MP, I1]
     # Will be tested with the course staff's implementation of is_valid()
     assert inlined_proof.is_valid()
+
+
+def test_inline_proof_keeps_proofs(debug=False):
+    # A main proof applying disjunction commutativity many times, to the same
+    # and to different formulae
+    statement = InferenceRule([Formula.from_infix('(x|y)')], Formula.from_infix('(x|y)'))
+    lines = [DeductiveProof.Line(Formula.from_infix('(x|y)'))]
+    for line in range(200):
+        lines.append(DeductiveProof.Line(Formula.from_infix('(y|x)' if line % 2 == 0 else '(x|y)'), 0,
+                                         [line]))
+    proof = DeductiveProof(statement, [DISJUNCTION_COMMUTATIVITY_PROOF.statement], lines)
+    main_text, lemma_text = str(proof), str(DISJUNCTION_COMMUTATIVITY_PROOF)
+    if debug:
+        print('Testing that inline_proof keeps its arguments for a proof of', len(lines), 'lines')
+    inlined_proof = inline_proof(proof, DISJUNCTION_COMMUTATIVITY_PROOF)
+    assert str(proof) == main_text
+    assert str(DISJUNCTION_COMMUTATIVITY_PROOF) == lemma_text
+    assert inlined_proof.rules == DISJUNCTION_COMMUTATIVITY_PROOF.rules
+    assert inlined_proof.is_valid()
+    instance = InferenceRule([Formula.from_infix('((p|q)|r)')], Formula.from_infix('(r|(p|q))'))
+    instance_proof = prove_instance(DISJUNCTION_COMMUTATIVITY_PROOF, instance)
+    assert str(DISJUNCTION_COMMUTATIVITY_PROOF) == lemma_text
+    assert instance_proof.lines[0].conclusion.first is instance.assumptions[0].first
+    assert instance_proof.is_valid()
+
+
+def test_compact(debug=False):
+    statement = InferenceRule([Formula.from_infix('(x|y)')], Formula.from_infix('(x|y)'))
+    rules = [DISJUNCTION_COMMUTATIVITY_PROOF.statement, InferenceRule([], Formula.from_infix('(~p|p)'))]
+    proof = DeductiveProof(statement, rules,
+                           [DeductiveProof.Line(Formula.from_infix('(x|y)')),
+                            DeductiveProof.Line(Formula.from_infix('(~z|z)'), 1, []),
+                            DeductiveProof.Line(Formula.from_infix('(y|x)'), 0, [0]),
+                            DeductiveProof.Line(Formula.from_infix('(z|~z)'), 0, [1]),
+                            DeductiveProof.Line(Formula.from_infix('(y|x)'), 0, [0]),
+                            DeductiveProof.Line(Formula.from_infix('(x|y)'), 0, [4])])
+    if debug:
+        print('Testing compact for the following proof:\n' + str(proof))
+    statistics = {}
+    compacted = compact(proof, statistics)
+    assert statistics == {'lines_before': 6, 'lines_after': 1}
+    assert [str(line) for line in compacted.lines] == ['(x|y)']
+    assert compacted.is_valid()
+    proof.statement = InferenceRule([Formula.from_infix('(x|y)')], Formula.from_infix('(y|x)'))
+    proof.lines[5].conclusion = Formula.from_infix('(x|(y|x))')
+    proof.lines[5].rule = None
+    proof.lines.append(DeductiveProof.Line(Formula.from_infix('(y|x)'), 0, [0]))
+    compacted = compact(proof, statistics)
+    assert statistics == {'lines_before': 7, 'lines_after': 2}
+    assert [str(line) for line in compacted.lines] == [
+        '(x|y)', '(y|x) (Inference Rule 0; Assumption 0: Line 0.)']
+    assert compacted.is_valid()
+    for proof in [DISJUNCTION_COMMUTATIVITY_PROOF, DISJUNCTION_RIGHT_ASSOCIATIVITY_PROOF]:
+        compacted = compact(proof, statistics)
+        assert statistics['lines_after'] <= statistics['lines_before']
+        assert compacted.is_valid()
+
+
+def test_proof_transformations_copy_rules(debug=False):
+    rules = list(DISJUNCTION_COMMUTATIVITY_PROOF.rules)
+    instance = InferenceRule([Formula.from_infix('(p|q)')], Formula.from_infix('(q|p)'))
+    if debug:
+        print('Testing that prove_instance and compact do not share the rules of the given proof')
+    for transformed in [prove_instance(DISJUNCTION_COMMUTATIVITY_PROOF, instance),
+                        compact(DISJUNCTION_COMMUTATIVITY_PROOF)]:
+        assert transformed.rules == rules
+        transformed.rules.append(InferenceRule([], Formula('T')))
+        assert DISJUNCTION_COMMUTATIVITY_PROOF.rules == rules
+
+
+def test_inline_proof_errors(debug=False):
+    statement = InferenceRule([], Formula.from_infix('(T|T)'))
+    rules = [InferenceRule([], Formula('T')), InferenceRule([Formula('p')], Formula.from_infix('(p|p)'))]
+    proof = DeductiveProof(statement, rules, [DeductiveProof.Line(Formula('T'), 0, []),
+                                              DeductiveProof.Line(Formula.from_infix('(T|T)'), 1, [0])])
+    assert proof.is_valid()
+    empty_lemma_proof = DeductiveProof(rules[0], [], [])
+    if debug:
+        print('Testing inline_proof with a lemma proof without lines')
+    try:
+        inline_proof(proof, empty_lemma_proof)
+        assert False
+    except ValueError:
+        pass
+    # An invalid lemma proof with an assumption line that is not an
+    # assumption of its statement
+    lemma_proof = DeductiveProof(rules[1], [], [DeductiveProof.Line(Formula('q')),
+                                                DeductiveProof.Line(Formula.from_infix('(p|p)'))])
+    if debug:
+        print('Testing inline_proof with a lemma proof with a stray assumption')
+    try:
+        inline_proof(proof, lemma_proof)
+        assert False
+    except ValueError:
+        pass
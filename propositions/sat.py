@@ -0,0 +1,366 @@
+""" (c) This file is part of the course
+    Mathematical Logic through Programming
+    by Gonczarowski and Nisan.
+    File name: code/propositions/sat.py """
+
+from heapq import heapify, heappop, heappush
+
+from propositions.syntax import *
+
+# Restarts happen after RESTART_BASE times the next element of the Luby
+# sequence conflicts
+RESTART_BASE = 100
+
+# Learned clauses are reduced at a restart once there are more of them than
+# this, and the bound then grows by LEARNED_GROWTH
+LEARNED_LIMIT = 2000
+LEARNED_GROWTH = 1.1
+
+ACTIVITY_DECAY = 0.95
+
+
+def _luby(index):
+    """ Return the element at the given position (counting from zero) of the
+        Luby sequence 1, 1, 2, 1, 1, 2, 4, 1, 1, 2, ... """
+    size, power = 1, 0
+    while size < index + 1:
+        power += 1
+        size = 2 * size + 1
+    while size - 1 != index:
+        size = (size - 1) // 2
+        power -= 1
+        index %= size
+    return 2 ** power
+
+
+class Solver:
+    """ A CDCL satisfiability solver for formulae in conjunctive normal form.
+        Variables are positive integers returned by new_variable, a literal is
+        a variable or its negation, and a clause is a list of literals.
+        Propagation uses two watched literals per clause, conflicts are
+        analyzed into learned clauses at the first unique implication point,
+        decisions follow variable activity with saved phases, and the search
+        restarts along the Luby sequence """
+
+    def __init__(self):
+        self.assignment = [None]
+        self.levels = [0]
+        self.reasons = [None]
+        self.activity = [0.0]
+        self.phases = [False]
+        self.watches = {}
+        self.clauses = []
+        self.learned = []
+        self.trail = []
+        self.limits = []
+        self.head = 0
+        self.heap = []
+        self.increment = 1.0
+        self.learned_limit = LEARNED_LIMIT
+        self.inconsistent = False
+        self.conflicts = 0
+        self.model = None
+
+    def variables(self):
+        """ Return the number of variables of self """
+        return len(self.assignment) - 1
+
+    def new_variable(self):
+        """ Add a variable to self and return it """
+        variable = len(self.assignment)
+        self.assignment.append(None)
+        self.levels.append(0)
+        self.reasons.append(None)
+        self.activity.append(0.0)
+        self.phases.append(False)
+        self.watches[variable] = []
+        self.watches[-variable] = []
+        heappush(self.heap, (0.0, variable))
+        return variable
+
+    def _value(self, literal):
+        value = self.assignment[abs(literal)]
+        return value if value is None or literal > 0 else not value
+
+    def add_clause(self, literals):
+        """ Add the clause with the given literals to self. Return False if
+            self is now known to be unsatisfiable, and True otherwise """
+        self._backtrack(0)
+        clause = []
+        for literal in literals:
+            value = self._value(literal)
+            if value or -literal in clause:
+                return True
+            if value is None and literal not in clause:
+                clause.append(literal)
+        if len(clause) == 0:
+            self.inconsistent = True
+        elif len(clause) == 1:
+            self._assign(clause[0], None)
+            if self._propagate() is not None:
+                self.inconsistent = True
+        else:
+            self._attach(clause)
+            self.clauses.append(clause)
+        return not self.inconsistent
+
+    def _attach(self, clause):
+        self.watches[clause[0]].append(clause)
+        self.watches[clause[1]].append(clause)
+
+    def _assign(self, literal, reason):
+        variable = abs(literal)
+        self.assignment[variable] = literal > 0
+        self.levels[variable] = len(self.limits)
+        self.reasons[variable] = reason
+        self.trail.append(literal)
+
+    def _propagate(self):
+        """ Assign the literals implied by unit clauses, until there are no
+            more such literals or until some clause is falsified. Return the
+            falsified clause, or None. The first two literals of every clause
+            are watched, and only clauses watching a literal that has just
+            become false are visited """
+        assignment = self.assignment
+        watches = self.watches
+        trail = self.trail
+        while self.head < len(trail):
+            false = -trail[self.head]
+            self.head += 1
+            watching = watches[false]
+            kept = []
+            for position, clause in enumerate(watching):
+                if clause[0] == false:
+                    clause[0], clause[1] = clause[1], false
+                first = clause[0]
+                value = assignment[abs(first)]
+                if value is not None and value == (first > 0):
+                    kept.append(clause)
+                    continue
+                for other in range(2, len(clause)):
+                    literal = clause[other]
+                    value = assignment[abs(literal)]
+                    if value is None or value == (literal > 0):
+                        clause[1] = literal
+                        clause[other] = false
+                        watches[literal].append(clause)
+                        break
+                else:
+                    kept.append(clause)
+                    if assignment[abs(first)] is None:
+                        self._assign(first, clause)
+                    else:
+                        kept.extend(watching[position + 1:])
+                        watches[false] = kept
+                        self.head = len(trail)
+                        return clause
+            watches[false] = kept
+        return None
+
+    def _bump(self, variable):
+        activity = self.activity
+        activity[variable] += self.increment
+        if activity[variable] > 1e100:
+            for other in range(1, len(activity)):
+                activity[other] *= 1e-100
+            self.increment *= 1e-100
+            self.heap = [(-activity[other], other) for other in range(1, len(activity))
+                         if self.assignment[other] is None]
+            heapify(self.heap)
+        elif self.assignment[variable] is None:
+            heappush(self.heap, (-activity[variable], variable))
+
+    def _analyze(self, conflict):
+        """ Return a clause learned from the given falsified clause, with the
+            literal that it asserts first, together with the decision level to
+            which the search should go back. The clause is obtained by
+            resolving with the reasons of the literals of the current level in
+            reverse trail order, until one literal of that level is left """
+        levels = self.levels
+        trail = self.trail
+        level = len(self.limits)
+        learned = [None]
+        seen = set()
+        pending = 0
+        position = len(trail) - 1
+        clause = conflict
+        while True:
+            for literal in clause:
+                variable = abs(literal)
+                if variable not in seen and levels[variable] > 0:
+                    seen.add(variable)
+                    self._bump(variable)
+                    if levels[variable] == level:
+                        pending += 1
+                    else:
+                        learned.append(literal)
+            while abs(trail[position]) not in seen:
+                position -= 1
+            literal = trail[position]
+            position -= 1
+            pending -= 1
+            if pending == 0:
+                break
+            clause = self.reasons[abs(literal)]
+        learned[0] = -literal
+        self.increment /= ACTIVITY_DECAY
+        if len(learned) == 1:
+            return learned, 0
+        highest = max(range(1, len(learned)), key=lambda index: levels[abs(learned[index])])
+        learned[1], learned[highest] = learned[highest], learned[1]
+        return learned, levels[abs(learned[1])]
+
+    def _backtrack(self, level):
+        if len(self.limits) <= level:
+            return
+        start = self.limits[level]
+        for literal in self.trail[start:]:
+            variable = abs(literal)
+            self.phases[variable] = literal > 0
+            self.assignment[variable] = None
+            self.reasons[variable] = None
+            heappush(self.heap, (-self.activity[variable], variable))
+        del self.trail[start:]
+        del self.limits[level:]
+        self.head = start
+
+    def _decide(self):
+        while self.heap:
+            activity, variable = heappop(self.heap)
+            if self.assignment[variable] is None:
+                return variable if self.phases[variable] else -variable
+        return None
+
+    def _reduce(self):
+        """ Forget the longer half of the learned clauses. Must be called at
+            decision level 0, where no learned clause is needed as a reason """
+        self.learned.sort(key=len)
+        forgotten = {id(clause) for clause in self.learned[len(self.learned) // 2:]
+                     if len(clause) > 2}
+        self.learned = [clause for clause in self.learned if id(clause) not in forgotten]
+        for literal, watching in self.watches.items():
+            self.watches[literal] = [clause for clause in watching if id(clause) not in forgotten]
+        self.learned_limit *= LEARNED_GROWTH
+
+    def solve(self):
+        """ Return whether the clauses of self are satisfiable. If they are, a
+            satisfying assignment is kept in self, and the value of each
+            variable in it is returned by value """
+        self.model = None
+        if self.inconsistent:
+            return False
+        self._backtrack(0)
+        restarts = 0
+        conflicts = 0
+        budget = RESTART_BASE * _luby(restarts)
+        while True:
+            conflict = self._propagate()
+            if conflict is not None:
+                self.conflicts += 1
+                conflicts += 1
+                if not self.limits:
+                    self.inconsistent = True
+                    return False
+                learned, level = self._analyze(conflict)
+                self._backtrack(level)
+                if len(learned) == 1:
+                    self._assign(learned[0], None)
+                else:
+                    self._attach(learned)
+                    self.learned.append(learned)
+                    self._assign(learned[0], learned)
+            elif conflicts >= budget:
+                restarts += 1
+                conflicts = 0
+                budget = RESTART_BASE * _luby(restarts)
+                self._backtrack(0)
+                if len(self.learned) > self.learned_limit:
+                    self._reduce()
+            else:
+                literal = self._decide()
+                if literal is None:
+                    self.model = list(self.assignment)
+                    self._backtrack(0)
+                    return True
+                self.limits.append(len(self.trail))
+                self._assign(literal, None)
+
+    def value(self, variable):
+        """ Return the value of the given variable in the satisfying assignment
+            found by the last call to solve """
+        return self.model[variable]
+
+
+def encode(formula, solver, variables, literals=None):
+    """ Add to the given solver the clauses of the Tseitin encoding of the
+        given formula, and return a literal that is equivalent to it under
+        these clauses. The given dictionary maps variable names of formulae to
+        variables of the solver, and is extended with any new variable names.
+        Every distinct subformula gets at most one new variable, and
+        negations get none. If a dictionary of the literals of already
+        encoded subformulae is given, these are reused and it is extended """
+    if literals is None:
+        literals = {}
+    for node in postorder(formula, literals.__contains__):
+        if node in literals:
+            continue
+        root = node.root
+        if is_variable(root):
+            if root not in variables:
+                variables[root] = solver.new_variable()
+            literals[node] = variables[root]
+            continue
+        if is_constant(root):
+            if None not in variables:
+                variables[None] = solver.new_variable()
+                solver.add_clause([variables[None]])
+            literals[node] = variables[None] if root == 'T' else -variables[None]
+            continue
+        operands = [literals[operand] for operand in node.operands()]
+        if is_unary(root):
+            literals[node] = -operands[0]
+            continue
+        literal = solver.new_variable()
+        if is_ternary(root):
+            first, second, third = operands
+            for clause in ([-literal, -first, second], [-literal, first, third],
+                           [literal, -first, -second], [literal, first, -third],
+                           [-literal, second, third], [literal, -second, -third]):
+                solver.add_clause(clause)
+            literals[node] = literal
+            continue
+        first, second = operands
+        if root == '<->':
+            for clause in ([-literal, -first, second], [-literal, first, -second],
+                           [literal, first, second], [literal, -first, -second]):
+                solver.add_clause(clause)
+            literals[node] = literal
+            continue
+        if root == '->':
+            first = -first
+        if root in ('&', '-&'):
+            clauses = [[-literal, first], [-literal, second], [literal, -first, -second]]
+        else:
+            clauses = [[literal, -first], [literal, -second], [-literal, first, second]]
+        for clause in clauses:
+            solver.add_clause(clause)
+        literals[node] = -literal if root in ('-&', '-|') else literal
+    return literals[formula]
+
+
+def satisfying_model(formula):
+    """ Return a model over the variables of the given formula in which it
+        holds, or None if it is not satisfiable """
+    solver = Solver()
+    variables = {}
+    solver.add_clause([encode(formula, solver, variables)])
+    if not solver.solve():
+        return None
+    return {name: solver.value(variable) for name, variable in variables.items()
+            if name is not None}
+
+
+def find_counterexample(formula):
+    """ Return a model over the variables of the given formula in which it
+        does not hold, or None if the formula is a tautology """
+    return satisfying_model(Formula('~', formula))
@@ -0,0 +1,78 @@
+""" (c) This file is part of the course
+    Mathematical Logic through Programming
+    by Gonczarowski and Nisan.
+    File name: code/propositions/sat_test.py """
+
+from propositions.syntax import *
+from propositions.semantics import *
+from propositions.proofs import InferenceRule
+from propositions.sat import *
+
+infixes = ['T', 'F', 'p', '~(p&q7)', '(p&~p)', '(p?~q:(r<->s))', '((p-&q)->(q-|p))', '((p|q)&~(p|q))',
+           '(((p1->p2)&(p2->p3))->(p1->p3))', '((p<->q)<->(q<->p))', '(p?T:F)', '~(x-|(y-&F))']
+
+
+def test_satisfying_model(debug=False):
+    for infix in infixes:
+        formula = Formula.from_infix(infix)
+        if debug:
+            print('Testing SAT solving of', infix)
+        model = satisfying_model(formula)
+        assert (model is None) == is_tautology(Formula(NOT, formula), TRUTH_TABLE)
+        if model is not None:
+            assert set(model) == formula.variables()
+            assert evaluate(formula, model)
+
+
+def test_sat_backend(debug=False):
+    for infix in infixes:
+        formula = Formula.from_infix(infix)
+        if debug:
+            print('Testing the SAT backend on', infix)
+        assert is_tautology(formula, SAT) == is_tautology(formula, TRUTH_TABLE)
+        model = find_counterexample(formula)
+        if model is not None:
+            assert not evaluate(formula, model)
+
+
+def test_pigeonhole(debug=False):
+    for holes in range(1, 6):
+        if debug:
+            print('Testing', holes + 1, 'pigeons in', holes, 'holes')
+        solver = Solver()
+        placed = [[solver.new_variable() for hole in range(holes)] for pigeon in range(holes + 1)]
+        for pigeon in placed:
+            solver.add_clause(pigeon)
+        for hole in range(holes):
+            for first in range(holes + 1):
+                for second in range(first + 1, holes + 1):
+                    solver.add_clause([-placed[first][hole], -placed[second][hole]])
+        assert not solver.solve()
+        solver = Solver()
+        placed = [[solver.new_variable() for hole in range(holes)] for pigeon in range(holes)]
+        for pigeon in placed:
+            solver.add_clause(pigeon)
+        for hole in range(holes):
+            for first in range(holes):
+                for second in range(first + 1, holes):
+                    solver.add_clause([-placed[first][hole], -placed[second][hole]])
+        assert solver.solve()
+        for hole in range(holes):
+            assert sum(solver.value(pigeon[hole]) for pigeon in placed) <= 1
+
+
+def test_many_variables(debug=False):
+    # A chain of 60 implications, which is hopeless to check by enumeration
+    variables = ['p' + str(index) for index in range(60)]
+    chain = Formula(IMP, Formula(variables[0]), Formula(variables[1]))
+    for first, second in zip(variables[1:], variables[2:]):
+        chain = Formula(AND, chain, Formula(IMP, Formula(first), Formula(second)))
+    formula = Formula(IMP, chain, Formula(IMP, Formula(variables[0]), Formula(variables[-1])))
+    if debug:
+        print('Testing a tautology over', len(variables), 'variables')
+    assert is_tautology(formula)
+    assert is_tautological_inference(InferenceRule([chain, Formula(variables[0])], Formula(variables[-1])))
+    broken = Formula(IMP, chain, Formula(IMP, Formula(variables[-1]), Formula(variables[0])))
+    model = find_counterexample(broken)
+    assert model is not None and not evaluate(broken, model)
+    assert not is_tautological_inference(InferenceRule([chain], Formula(variables[-1])))
@@ -3,9 +3,16 @@
     by Gonczarowski and Nisan.
     File name: code/propositions/semantics.py """
 
+import sys
+from functools import lru_cache
+from multiprocessing import Pool
+
 from propositions.syntax import *
-import math
-import copy
+from propositions.compiler import compile_formula, model_from_index
+from propositions.inference import InferenceChecker
+from propositions.truth_table import TruthTable, evaluate_columns, column_bits, MARKDOWN, CSV
+from propositions import incremental, sat, counting, minimization
+from propositions.bdd import shared_manager
 
 AND = '&'
 OR = '|'
@@ -18,172 +25,257 @@ MUX = '?:'
 FALSE = 'F'
 TRUE = 'T'
 
+# Orders of models for all_models
+LEXICOGRAPHIC = 'lexicographic'
+GRAY = 'gray'
+
+# Forms of the models yielded by all_models
+DICT = 'dict'
+SHARED = 'shared'
+TUPLE = 'tuple'
+BITS = 'bits'
+
+# Engines for finding counterexamples: bit-parallel truth tables, an
+# incremental evaluation along a Gray code sweep of the models, a CDCL solver
+# on the Tseitin encoding, binary decision diagrams in a shared manager, or
+# one of the first and third chosen by the number of variables
+TRUTH_TABLE = 'truth_table'
+INCREMENTAL = 'incremental'
+SAT = 'sat'
+BDD = 'bdd'
+AUTO = 'auto'
+
+# AUTO uses the SAT solver for formulae with more variables than this, and
+# truth tables otherwise. For counting models, AUTO uses binary decision
+# diagrams instead of the SAT counter above this many variables, as the DPLL
+# count is exponential in the width of formulae like long chains
+AUTO_SAT_VARIABLES = 16
+
+# truth_values calls the compiled formula once per model for at most this many
+# models, and builds bit-parallel columns for more
+COMPILED_MODELS = 32
+
+# A parallel search splits the models into about this many cofactors per
+# worker, so that workers that finish early get more work
+COFACTORS_PER_WORKER = 4
+
 
 def evaluate(formula, model):
     """ Return the truth value of the given formula in the given model """
     # Task 2.1
-    if is_unary(formula.root):
-        return not evaluate(formula.first, model)
-    elif is_ternary(formula.root):
-        if evaluate(formula.first,model):
-            return evaluate(formula.second,model)
-        else:
-            return evaluate(formula.third,model)
-    elif is_binary(formula.root):
-        if formula.root == '&':
-            return evaluate(formula.first, model) and evaluate(formula.second, model)
-        elif formula.root == '|':
-            return evaluate(formula.first, model) or evaluate(formula.second, model)
-        elif formula.root == '<->':
-            return not (evaluate(formula.first, model) ^ evaluate(formula.second, model))
-        elif formula.root == '-&':
-            return not (evaluate(formula.first, model) and evaluate(formula.second, model))
-        elif formula.root == '-|':
-            return not (evaluate(formula.first, model) or evaluate(formula.second, model))
-        else:
-            return (not evaluate(formula.first, model)) or evaluate(formula.second, model)
-    elif is_constant(formula.root):
-        if formula.root == 'T':
-            return True
+    values = {}
+    for node in postorder(formula):
+        root = node.root
+        if is_variable(root):
+            value = model[root]
+        elif is_constant(root):
+            value = root == TRUE
+        elif is_unary(root):
+            value = not values[node.first]
+        elif is_ternary(root):
+            value = values[node.second] if values[node.first] else values[node.third]
         else:
-            return False
-    else:
-        return model[formula.root]
-    #
-    # if is_constant(formula.root):
-    #     if formula.root == 'T':
-    #         return True
-    #     elif formula.root == 'F':
-    #         return False
-    # elif is_variable(formula.root):
-    #     return model[formula.root]
-    #
-    # elif is_unary(formula.root):
-    #     return not evaluate(formula.first, model)
-    # assert (type(formula.first) is Formula) and (type(formula.second) is Formula)
-    # if is_binary(formula.root):
-    #     if formula.root == '&':
-    #         return evaluate(formula.first, model) and evaluate(formula.second, model)
-    #     elif formula.root == '|':
-    #         return evaluate(formula.first, model) or evaluate(formula.second, model)
-    #     elif formula.root == '->':
-    #         if evaluate(formula.first, model) and not evaluate(formula.second, model):
-    #             return False
-    #         else:
-    #             return True
-    #     elif formula.root == '<->':
-    #         if (not evaluate(formula.first, model) and not evaluate(formula.second, model)) or (
-    #                     evaluate(formula.first, model) and evaluate(formula.second, model)):
-    #             return True
-    #         else:
-    #             return False
-    #     elif formula.root == '-&':
-    #         if evaluate(formula.first, model) and evaluate(formula.second, model):
-    #             return False
-    #         else:
-    #             return True
-    #     elif formula.root == '-|':
-    #         if not evaluate(formula.first, model) and not evaluate(formula.second, model):
-    #             return True
-    #         else:
-    #             return False
-    # else:
-    #     if evaluate(formula.first, model):
-    #         return evaluate(formula.second, model)
-    #     else:
-    #         return evaluate(formula.third, model)
-
-
-def all_models(variables):
+            first, second = values[node.first], values[node.second]
+            if root == AND:
+                value = first and second
+            elif root == OR:
+                value = first or second
+            elif root == IFF:
+                value = first == second
+            elif root == NAND:
+                value = not (first and second)
+            elif root == NOR:
+                value = not (first or second)
+            else:
+                value = (not first) or second
+        values[node] = value
+    return values[formula]
+
+
+def model_at(variables, number, order=LEXICOGRAPHIC):
+    """ Return the model that all_models(variables, order) yields at the given
+        position (counting from zero) """
+    if order == GRAY:
+        number ^= number >> 1
+    return model_from_index(list(variables), number)
+
+
+def all_models(variables, order=LEXICOGRAPHIC, form=DICT, start=0, stop=None):
     """ Return an iterator over all possible models over the variables in the
         given list of variables. The order of the models is lexicographic
         according to the order of the variables in the given list, where False
-        precedes True """
+        precedes True. If order is GRAY, the models are in the order of the
+        binary reflected Gray code instead, so that each model differs from the
+        previous one in the value of a single variable. Models are generated
+        lazily, and only the models at positions start (inclusive) to stop
+        (exclusive) are generated, so that the space of models may be split
+        between workers. Each model is yielded in the given form: DICT for a
+        new dictionary per model, SHARED for a single dictionary that is
+        updated in place between models, TUPLE for a tuple of the values of
+        the variables, or BITS for the number of the model in lexicographic
+        order, whose bits from the most significant one are these values """
     # Task 2.2
-    list_of_models = []
-    basic_model = {}
-    list_of_variables = list(variables)
-    number_of_variables = len(list_of_variables)
-    for variable in list_of_variables:
-        basic_model[variable] = False
-    list_of_models.append(basic_model)
-    number_of_models = (math.pow(2, number_of_variables)) - 1
-    current_model = basic_model
-    for model in range(int(number_of_models)):
-        current_model = copy.deepcopy(current_model)
-        current_variable_number = number_of_variables - 1
-        while current_model[list_of_variables[current_variable_number]]:
-            if current_variable_number < 0:
-                break
+    variables = list(variables)
+    count = len(variables)
+    stop = 2 ** count if stop is None else min(stop, 2 ** count)
+    if start >= stop:
+        return
+    if form == BITS:
+        for number in range(start, stop):
+            yield number ^ (number >> 1) if order == GRAY else number
+        return
+    model = model_at(variables, start, order)
+    values = [model[variable] for variable in variables]
+    for number in range(start, stop):
+        if number > start:
+            if order == GRAY:
+                changed = [count - (number & -number).bit_length()]
             else:
-                current_variable_number -= 1
-        current_model[list_of_variables[current_variable_number]] = True
-        while current_variable_number < number_of_variables - 1:
-            current_variable_number += 1
-            current_model[list_of_variables[current_variable_number]] = False
-        list_of_models.append(current_model)
-    return iter(list_of_models)
+                changed = [count - 1]
+                while values[changed[-1]]:
+                    changed.append(changed[-1] - 1)
+            for position in changed:
+                values[position] = not values[position]
+                if form == SHARED:
+                    model[variables[position]] = values[position]
+        if form == TUPLE:
+            yield tuple(values)
+        elif form == SHARED:
+            yield model
+        else:
+            yield dict(zip(variables, values))
 
 
-def truth_values(formula, models):
+def truth_values(formula, models, backend=TRUTH_TABLE):
     """ Return a list of the truth values of the given formula in each model
-        in the given list of models """
+        in the given list of models, computed with the compiled formula for at
+        most COMPILED_MODELS models and with bit-parallel truth tables for
+        more, or, if backend is BDD, by walking the decision diagram of
+        formula """
     # Task 2.3
-    list_of_truth_values = []
-    for model in models:
-        list_of_truth_values.append(evaluate(formula, model))
-    return list_of_truth_values
+    models = list(models)
+    if backend == BDD:
+        manager = shared_manager()
+        node = manager.from_formula(formula)
+        return [manager.evaluate(node, model) for model in models]
+    if len(models) <= COMPILED_MODELS:
+        from_model = compile_formula(formula).from_model
+        return [from_model(model) for model in models]
+    full = (1 << len(models)) - 1
+    columns = {}
+    for variable in formula.variables():
+        bits = ''.join('1' if model[variable] else '0' for model in reversed(models))
+        columns[variable] = int(bits or '0', 2)
+    return column_bits(evaluate_columns(formula, columns, full), len(models))
+
+
+def find_counterexample(formula, backend=AUTO, workers=None):
+    """ Return a model over the variables of the given formula in which it
+        does not hold, or None if the formula is a tautology. The search is
+        done with the given backend, and if a number of workers is given, in
+        that many processes as described in _find_counterexample_in_parallel """
+    if workers is not None and workers > 1:
+        return _find_counterexample_in_parallel(formula, backend, workers)
+    if backend == AUTO:
+        backend = SAT if len(formula.variables()) > AUTO_SAT_VARIABLES else TRUTH_TABLE
+    if backend == SAT:
+        return sat.find_counterexample(formula)
+    elif backend == BDD:
+        manager = shared_manager()
+        return manager.find(manager.from_formula(formula), False, sorted(formula.variables()))
+    elif backend == INCREMENTAL:
+        return incremental.find_counterexample(formula)
+    elif backend != TRUTH_TABLE:
+        raise ValueError('Unknown backend ' + str(backend))
+    table = TruthTable(formula)
+    row = table.first_row(False)
+    return None if row is None else model_from_index(table.variables, row)
+
+
+def is_tautology(formula, backend=AUTO, workers=None):
+    """ Return whether the given formula is a tautology, checked with the
+        given backend in the given number of worker processes """
+    return find_counterexample(formula, backend, workers) is None
+
 
+def _cofactor(formula, model):
+    """ Return the formula obtained from the given formula by substituting for
+        each variable of the given model the constant of its value there """
+    constants = {Formula(variable): Formula(TRUE if value else FALSE) for variable, value in model.items()}
+    return fold(formula, lambda node, operands: Formula(node.root, *operands) if operands else node, constants)
 
-def is_tautology(formula):
-    """ Return whether the given formula is a tautology """
-    values = list(formula.variables())
-    if len(values) is 0:
-        return evaluate(formula, {})
-    for m in all_models(values):
-        if not evaluate(formula, m):
-            return False
-    return True
 
+_worker_formula = None
 
-def print_truth_table(formula):
-    """ Print the truth table of the given formula """
+
+def _start_worker(formula):
+    global _worker_formula
+    _worker_formula = formula
+
+
+def _check_cofactor(task):
+    model, backend = task
+    counterexample = find_counterexample(_cofactor(_worker_formula, model), backend)
+    if counterexample is not None:
+        counterexample.update(model)
+    return counterexample
+
+
+def _find_counterexample_in_parallel(formula, backend, workers):
+    """ Return a counterexample to the given formula as find_counterexample
+        does, searching a pool of the given number of processes. The first k
+        variables of formula in sorted order are fixed to each of their 2**k
+        combinations, with k chosen to give each worker about
+        COFACTORS_PER_WORKER cofactors, and each cofactor is checked with the
+        given backend in some process. All processes are terminated as soon as
+        one of them finds a counterexample """
+    variables = sorted(formula.variables())
+    split = min(len(variables), (COFACTORS_PER_WORKER * workers - 1).bit_length())
+    tasks = [(model, backend) for model in all_models(variables[:split])]
+    with Pool(workers, _start_worker, (formula,)) as pool:
+        for counterexample in pool.imap_unordered(_check_cofactor, tasks):
+            if counterexample is not None:
+                return counterexample
+    return None
+
+
+def count_models(formula, backend=AUTO):
+    """ Return the number of models over the variables of the given formula in
+        which it holds, counted with the given backend: TRUTH_TABLE, SAT for a
+        DPLL search with component caching on the Tseitin encoding, or BDD.
+        AUTO uses TRUTH_TABLE for at most AUTO_SAT_VARIABLES variables and BDD
+        for more """
+    return count_models_under(formula, {}, backend)
+
+
+def count_models_under(formula, partial_model, backend=AUTO):
+    """ Return the number of models over the variables of the given formula
+        that agree with the given partial model (whose other variables are
+        ignored) and in which the formula holds, counted with the given
+        backend as in count_models """
+    partial_model = {variable: value for variable, value in partial_model.items()
+                     if variable in formula.variables()}
+    free = formula.variables() - set(partial_model)
+    if backend == AUTO:
+        backend = BDD if len(free) > AUTO_SAT_VARIABLES else TRUTH_TABLE
+    if backend == SAT:
+        return counting.count_models(formula, partial_model)
+    elif backend == BDD:
+        manager = shared_manager()
+        return manager.count(manager.restrict(manager.from_formula(formula), partial_model), free)
+    elif backend != TRUTH_TABLE:
+        raise ValueError('Unknown backend ' + str(backend))
+    return TruthTable(_cofactor(formula, partial_model), sorted(free)).count()
+
+
+def print_truth_table(formula, form=MARKDOWN, only=None):
+    """ Print the truth table of the given formula, in the MARKDOWN or CSV
+        form of TruthTable.write, and only the rows where formula has the
+        given value if only is True or False """
     # Task 2.5
-    variables = list(formula.variables())
-    sorted_variables = sorted(variables)
-    print("|", end="")
-    for variable in sorted_variables:
-        print(" " + variable + " |", end="")
-    print(" " + formula.infix() + " |")
-    print("|", end="")
-    for variable in sorted_variables:
-        current_variable_hyphens = ""
-        for letter in range(len(variable)):
-            current_variable_hyphens += "-"
-        print("-" + current_variable_hyphens + "-|", end="")
-    formula_hyphens = ""
-    for letter in range(len(formula.infix())):
-        formula_hyphens += "-"
-    print("-" + formula_hyphens + "-|")
-    models = list(all_models(sorted_variables))
-    values = truth_values(formula, models)
-    formula_spaces = ""
-    for letter in range(len(formula.infix()) - 1):
-        formula_spaces += " "
-    for model, value in zip(models, values):
-        print("|", end="")
-        for variable in sorted_variables:
-            variable_spaces = ""
-            for i in range(len(variable)):
-                variable_spaces += " "
-            if model[variable]:
-                print(" T" + variable_spaces + "|", end="")
-            else:
-                print(" F" + variable_spaces + "|", end="")
-        if value:
-            print(" T" + formula_spaces + " |")
-        else:
-            print(" F" + formula_spaces + " |")
+    if form not in (MARKDOWN, CSV):
+        raise ValueError('Cannot print a truth table in form ' + str(form))
+    TruthTable(formula).write(sys.stdout, form, only)
 
 
 def synthesize_for_model(model):
@@ -204,10 +296,31 @@ def synthesize_for_model(model):
     return Formula.from_infix(propositional)
 
 
-def synthesize(models, values):
+def synthesize(models, values, backend=TRUTH_TABLE, minimize=False):
     """ Return a propositional formula that has the given list of respective
-        truth values in the given list of models """
+        truth values in the given list of models. The formula is a
+        disjunction of one conjunction per model where it is true, or, if
+        backend is BDD, is read off the decision diagram of these models. If
+        minimize is True, or is a method of minimization.minimize, the
+        formula is instead a sum of products minimized with that method, with
+        the models that are not given left free """
     # Task 2.7
+    if minimize:
+        models = list(models)
+        variables = list(models[0])
+        on = care = 0
+        for model, value in zip(models, values):
+            row = 1 << sum(1 << (len(variables) - 1 - position)
+                           for position, variable in enumerate(variables) if model[variable])
+            care |= row
+            if value:
+                on |= row
+        dont_care = ((1 << 2 ** len(variables)) - 1) ^ care
+        return minimization.minimize(variables, on, dont_care, None if minimize is True else minimize)
+    if backend == BDD:
+        models = list(models)
+        manager = shared_manager()
+        return manager.to_formula(manager.from_models(models, values), next(iter(models[0])))
     list_of_propositionals = []
     for model, value in zip(models, values):
         list_of_propositionals.append(synthesize_for_model(model))
@@ -231,25 +344,79 @@ def synthesize(models, values):
     return complex_formula
 
 
+def synthesize_many(variables, tables, method=None):
+    """ Return a list of sum of products formulae over the given list of
+        variables, one for each of the given truth tables. A table is either a
+        list of the truth values in the models of all_models(variables), in
+        order, or an integer whose bit i is the value in model number i. Each
+        table is minimized with the given method of minimization.minimize.
+        The literals of each cube are in the order of variables, and the
+        cubes of each formula are ordered by the number of tables using them,
+        so that cubes, partial products and partial sums common to several
+        tables are built once and shared by all the formulae (see
+        shared_size) """
+    variables = list(variables)
+    count = len(variables)
+    covers = []
+    for table in tables:
+        if not isinstance(table, int):
+            table = sum(1 << row for row, value in enumerate(table) if value)
+        covers.append(minimization.minimal_cubes(count, table, 0, method))
+    uses = {}
+    for cubes in covers:
+        for cube in cubes:
+            uses[cube] = uses.get(cube, 0) + 1
+    return [minimization.cubes_to_formula(variables, sorted(cubes, key=lambda cube: (-uses[cube], cube)))
+            for cubes in covers]
+
+
+@lru_cache(maxsize=256)
+def inference_checker(assumptions, conclusion):
+    """ Return an InferenceChecker for the given tuple of assumptions and
+        conclusion. Checkers are cached, so a rule is compiled once """
+    return InferenceChecker(assumptions, conclusion)
+
+
 def evaluate_inference(rule, model):
     """ Return whether the given inference rule holds in the given model """
     # Task 4.2
-    if len(rule.assumptions) == 0:
-        return is_tautology(rule.conclusion)
-    iter_assumps = iter(rule.assumptions)
-    all_assumptions = next(iter_assumps)
-    for assumption in iter_assumps:
-        all_assumptions = Formula('&', all_assumptions, assumption)
-    inference_rule = Formula('->', all_assumptions, rule.conclusion)
-    return evaluate(inference_rule, model)
+    return inference_checker(tuple(rule.assumptions), rule.conclusion).holds(model)
+
+
+def find_inference_counterexample(rule, backend=AUTO):
+    """ Return a model in which all the assumptions of the given inference
+        rule hold and its conclusion does not, or None if the rule is a
+        tautological inference. With the TRUTH_TABLE backend, the truth tables
+        of the assumptions are intersected from the most selective one and a
+        chunk of rows is skipped once no row is left. With the SAT backend,
+        the assumptions are unit clauses over their Tseitin encodings. Other
+        backends check the implication from the conjunction of the
+        assumptions to the conclusion """
+    checker = inference_checker(tuple(rule.assumptions), rule.conclusion)
+    if backend == AUTO:
+        backend = SAT if len(checker.variables) > AUTO_SAT_VARIABLES else TRUTH_TABLE
+    if backend == TRUTH_TABLE:
+        return checker.find_counterexample()
+    elif backend == SAT:
+        return checker.find_counterexample_with_sat()
+    formula = rule.conclusion
+    for assumption in reversed(checker.assumptions):
+        formula = Formula(IMP, assumption, formula)
+    return find_counterexample(formula, backend)
 
 
-def is_tautological_inference(rule):
+def is_tautological_inference(rule, backend=AUTO, workers=None):
     """ Return whether the given inference rule is a semantically correct
-        implication of its assumptions """
+        implication of its assumptions, checked with the given backend as in
+        find_inference_counterexample, or, if a number of workers is given,
+        by find_counterexample in that many processes """
     # Task 4.3
-    all_models_of_rule = all_models(rule.variables())
-    for model in all_models_of_rule:
-        if not evaluate_inference(rule, model):
-            return False
-    return True
+    if workers is None or workers <= 1:
+        return find_inference_counterexample(rule, backend) is None
+    formula = rule.conclusion
+    if len(rule.assumptions) > 0:
+        all_assumptions = rule.assumptions[0]
+        for assumption in rule.assumptions[1:]:
+            all_assumptions = Formula('&', all_assumptions, assumption)
+        formula = Formula('->', all_assumptions, formula)
+    return is_tautology(formula, backend, workers)
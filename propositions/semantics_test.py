@@ -314,3 +314,94 @@ def test_is_tautological_inference(debug=False):
         if debug:
             print('Testing whether', rule, 'is a tautological inference')
         assert is_tautological_inference(rule) == tautological
+
+
+def test_all_models_orders_and_forms(debug=False):
+    variables = ['p', 'q', 'r']
+    lexicographic = list(all_models(variables))
+    gray = [{'p': False, 'q': False, 'r': False}, {'p': False, 'q': False, 'r': True},
+            {'p': False, 'q': True, 'r': True}, {'p': False, 'q': True, 'r': False},
+            {'p': True, 'q': True, 'r': False}, {'p': True, 'q': True, 'r': True},
+            {'p': True, 'q': False, 'r': True}, {'p': True, 'q': False, 'r': False}]
+    for order, models in [[LEXICOGRAPHIC, lexicographic], [GRAY, gray]]:
+        if debug:
+            print('Testing all models over', variables, 'in', order, 'order')
+        assert list(all_models(variables, order)) == models
+        assert [model_at(variables, number, order) for number in range(8)] == models
+        for start, stop in [[0, 8], [3, 6], [5, 100], [7, 2]]:
+            part = models[start:stop]
+            assert list(all_models(variables, order, DICT, start, stop)) == part
+            assert [dict(model) for model in all_models(variables, order, SHARED, start, stop)] == part
+            assert [dict(zip(variables, values)) for values in
+                    all_models(variables, order, TUPLE, start, stop)] == part
+            assert [model_at(variables, number) for number in
+                    all_models(variables, order, BITS, start, stop)] == part
+    if debug:
+        print('Testing that all models are generated lazily')
+    models = all_models(['x' + str(i) for i in range(100)])
+    assert next(models) == {'x' + str(i): False for i in range(100)}
+    assert next(models)['x99']
+
+
+def test_parallel_tautology(debug=False):
+    for infix, tautology in [['(((p1->p2)&(p2->p3))->(p1->p3))', True], ['((p->q)->(q->p))', False],
+                             ['(((p|q)&(r|s))->((p&r)|(q|s)))', True], ['((p&q)|(r&(s<->x)))', False],
+                             ['T', True], ['~T', False]]:
+        formula = Formula.from_infix(infix)
+        if debug:
+            print('Testing parallel tautology checking of', infix)
+        for backend in [TRUTH_TABLE, SAT]:
+            assert is_tautology(formula, backend, workers=2) == tautology
+            model = find_counterexample(formula, backend, workers=3)
+            assert (model is None) == tautology
+            if model is not None:
+                assert set(model) == formula.variables()
+                assert not evaluate(formula, model)
+
+
+def test_count_models(debug=False):
+    for infix in ['T', 'F', 'p', '~(p&q7)', '(p?~q:(r<->s))', '((p-&q)->(q-|p))', '((p|q)&~(p|q))',
+                  '(((p1->p2)&(p2->p3))->(p1->p3))', '((p|q)&(~p|~r))']:
+        formula = Formula.from_infix(infix)
+        variables = sorted(formula.variables())
+        if debug:
+            print('Testing model counting of', infix)
+        for backend in [TRUTH_TABLE, SAT, BDD, AUTO]:
+            assert count_models(formula, backend) == sum(truth_values(formula, all_models(variables)))
+            for partial_model in [{}, {'p': True}, {'p': False, 'r': True, 'x': False}]:
+                count = len([model for model in all_models(variables)
+                             if evaluate(formula, model) and
+                             all(model[variable] == partial_model[variable]
+                                 for variable in variables if variable in partial_model)])
+                assert count_models_under(formula, partial_model, backend) == count
+    # One model per solution of each of 100 independent exclusive ors
+    formula = Formula(IFF, Formula('p0'), Formula('~', Formula('q0')))
+    for index in range(1, 100):
+        formula = Formula(AND, formula, Formula(IFF, Formula('p' + str(index)),
+                                                Formula('~', Formula('q' + str(index)))))
+    if debug:
+        print('Testing model counting over', len(formula.variables()), 'variables')
+    assert count_models(formula) == 2 ** 100
+    assert count_models(formula, BDD) == 2 ** 100
+    assert count_models_under(formula, {'p0': True, 'q1': True}) == 2 ** 98
+
+
+def test_synthesize_many(debug=False):
+    # The segments a-g of a seven-segment display of the digits 0-9, off for
+    # the codes 10-15
+    variables = ['p', 'q', 'r', 's']
+    digits = {'a': [0, 2, 3, 5, 6, 7, 8, 9], 'b': [0, 1, 2, 3, 4, 7, 8, 9], 'c': [0, 1, 3, 4, 5, 6, 7, 8, 9],
+              'd': [0, 2, 3, 5, 6, 8, 9], 'e': [0, 2, 6, 8], 'f': [0, 4, 5, 6, 8, 9], 'g': [2, 3, 4, 5, 6, 8, 9]}
+    tables = [[row in lit for row in range(16)] for lit in digits.values()]
+    if debug:
+        print('Testing synthesis of the seven segments')
+    formulae = synthesize_many(variables, tables)
+    models = list(all_models(variables))
+    for formula, table in zip(formulae, tables):
+        assert truth_values(formula, models) == table
+    separate = [synthesize(models, table) for table in tables]
+    assert shared_size(formulae) < sum(formula.size() for formula in formulae)
+    assert shared_size(formulae) < shared_size(separate)
+    bits = [sum(1 << row for row in lit) for lit in digits.values()]
+    assert synthesize_many(variables, bits) == formulae
+    assert synthesize_many(variables, bits, minimization.HEURISTIC)[4].variables() <= set(variables)
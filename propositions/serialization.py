@@ -0,0 +1,203 @@
+""" (c) This file is part of the course
+    Mathematical Logic through Programming
+    by Gonczarowski and Nisan.
+    File name: code/propositions/serialization.py """
+
+import mmap
+
+from propositions.syntax import *
+from propositions.proofs import *
+from propositions.arena import FormulaArena, OPERATORS, VARIABLE, NO_CHILD
+
+# Layout of a serialized object (all integers are unsigned LEB128 varints):
+#   MAGIC, one kind byte,
+#   the variable name table: count, then length and ASCII bytes of each name,
+#   the node table: count, then for each node its op code followed by either
+#       its name index (variables) or the node indices of its operands, which
+#       always precede it in the table,
+#   and finally the payload of the given kind, which refers to formulae by
+#   their node indices:
+#       formula: the root node,
+#       inference rule: the number of assumptions, the assumptions, and the
+#           conclusion,
+#       deductive proof: the statement (as an inference rule), the number of
+#           rules and each rule, the number of lines and for each line its
+#           conclusion, its rule plus one (zero for no rule), the length of its
+#           justification plus one (zero for no justification) and the
+#           justification line numbers.
+MAGIC = b'PLF1'
+FORMULA_KIND, RULE_KIND, PROOF_KIND = range(3)
+
+
+def _write_varint(out, value):
+    """ Append the varint encoding of the given natural number to out """
+    while value >= 0x80:
+        out.append((value & 0x7F) | 0x80)
+        value >>= 7
+    out.append(value)
+
+
+def _rule_formulae(rule):
+    return list(rule.assumptions) + [rule.conclusion]
+
+
+def dumps(obj):
+    """ Return the bytes encoding of the given Formula, InferenceRule or
+        DeductiveProof. Every distinct subformula is encoded once """
+    if type(obj) is Formula:
+        kind, formulae = FORMULA_KIND, [obj]
+    elif type(obj) is InferenceRule:
+        kind, formulae = RULE_KIND, _rule_formulae(obj)
+    else:
+        assert type(obj) is DeductiveProof
+        kind = PROOF_KIND
+        formulae = _rule_formulae(obj.statement)
+        for rule in obj.rules:
+            formulae.extend(_rule_formulae(rule))
+        formulae.extend(line.conclusion for line in obj.lines)
+    arena = FormulaArena()
+    roots = iter(arena.add_many(formulae))
+
+    out = bytearray(MAGIC)
+    out.append(kind)
+    _write_varint(out, len(arena.names))
+    for name in arena.names:
+        _write_varint(out, len(name))
+        out += name.encode('ascii')
+    _write_varint(out, len(arena))
+    for index in range(len(arena)):
+        op = arena.ops[index]
+        _write_varint(out, op)
+        if op == VARIABLE:
+            _write_varint(out, arena.firsts[index])
+        else:
+            for child in (arena.firsts[index], arena.seconds[index], arena.thirds[index]):
+                if child != NO_CHILD:
+                    _write_varint(out, child)
+
+    def write_rule(rule):
+        _write_varint(out, len(rule.assumptions))
+        for _ in range(len(rule.assumptions) + 1):
+            _write_varint(out, next(roots))
+
+    if kind == FORMULA_KIND:
+        _write_varint(out, next(roots))
+    elif kind == RULE_KIND:
+        write_rule(obj)
+    else:
+        write_rule(obj.statement)
+        _write_varint(out, len(obj.rules))
+        for rule in obj.rules:
+            write_rule(rule)
+        _write_varint(out, len(obj.lines))
+        for line in obj.lines:
+            _write_varint(out, next(roots))
+            _write_varint(out, 0 if line.rule is None else line.rule + 1)
+            if line.justification is None:
+                _write_varint(out, 0)
+            else:
+                _write_varint(out, len(line.justification) + 1)
+                for line_number in line.justification:
+                    _write_varint(out, line_number)
+    return bytes(out)
+
+
+class _Reader:
+    """ Reads varints from a buffer through a memoryview, without copying
+        the buffer """
+
+    def __init__(self, buffer):
+        self.view = memoryview(buffer).cast('B')
+        self.position = 0
+
+    def varint(self):
+        view = self.view
+        position = self.position
+        value = shift = 0
+        while True:
+            byte = view[position]
+            position += 1
+            value |= (byte & 0x7F) << shift
+            if byte < 0x80:
+                self.position = position
+                return value
+            shift += 7
+
+    def ascii(self, length):
+        start = self.position
+        self.position += length
+        return str(self.view[start:self.position], 'ascii')
+
+
+def loads(buffer):
+    """ Return the Formula, InferenceRule or DeductiveProof encoded in the
+        given bytes-like object (for example bytes, a memoryview or an mmap) """
+    reader = _Reader(buffer)
+    try:
+        return _read(reader)
+    finally:
+        reader.view.release()
+
+
+def _read(reader):
+    """ Return the object encoded in the buffer of the given reader """
+    if len(reader.view) <= len(MAGIC) or reader.view[:len(MAGIC)] != MAGIC:
+        raise ValueError('Not a serialized propositional object')
+    kind = reader.view[len(MAGIC)]
+    reader.position = len(MAGIC) + 1
+    varint = reader.varint
+
+    names = [reader.ascii(varint()) for _ in range(varint())]
+    nodes = []
+    for _ in range(varint()):
+        op = varint()
+        if op == VARIABLE:
+            nodes.append(Formula(names[varint()]))
+            continue
+        root = OPERATORS[op]
+        if is_constant(root):
+            nodes.append(Formula(root))
+        elif is_unary(root):
+            nodes.append(Formula(root, nodes[varint()]))
+        elif is_binary(root):
+            first = nodes[varint()]
+            nodes.append(Formula(root, first, nodes[varint()]))
+        else:
+            first = nodes[varint()]
+            second = nodes[varint()]
+            nodes.append(Formula(root, first, second, nodes[varint()]))
+
+    def read_rule():
+        assumptions = [nodes[varint()] for _ in range(varint())]
+        return InferenceRule(assumptions, nodes[varint()])
+
+    if kind == FORMULA_KIND:
+        return nodes[varint()]
+    elif kind == RULE_KIND:
+        return read_rule()
+    elif kind != PROOF_KIND:
+        raise ValueError('Unknown serialized kind %d' % kind)
+    statement = read_rule()
+    rules = [read_rule() for _ in range(varint())]
+    lines = []
+    for _ in range(varint()):
+        conclusion = nodes[varint()]
+        rule = varint() - 1
+        length = varint() - 1
+        justification = None if length < 0 else [varint() for _ in range(length)]
+        lines.append(DeductiveProof.Line(conclusion, None if rule < 0 else rule, justification))
+    return DeductiveProof(statement, rules, lines)
+
+
+def dump(obj, file):
+    """ Write the bytes encoding of the given Formula, InferenceRule or
+        DeductiveProof to the given binary file object """
+    file.write(dumps(obj))
+
+
+def load(path):
+    """ Return the Formula, InferenceRule or DeductiveProof stored in the file
+        at the given path, which is memory-mapped rather than read """
+    with open(path, 'rb') as file:
+        with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            return loads(mapped)
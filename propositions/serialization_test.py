@@ -0,0 +1,69 @@
+""" (c) This file is part of the course
+    Mathematical Logic through Programming
+    by Gonczarowski and Nisan.
+    File name: code/propositions/serialization_test.py """
+
+import os
+import tempfile
+
+from propositions.syntax import *
+from propositions.proofs import *
+from propositions.provers import prove_implies_self, prove_hypothetical_syllogism
+from propositions.serialization import *
+
+
+def test_formula_round_trip(debug=False):
+    for infix in ['p', '~x12', '(x&y)', '~~(x|~T)', '((x1&~x2)|F)', '(p?~q:(r<->s))',
+                  '((p-&q)->(q-|p))']:
+        if debug:
+            print('Testing serialization of', infix)
+        formula = Formula.from_infix(infix)
+        assert loads(dumps(formula)) is formula
+        assert loads(memoryview(dumps(formula))) is formula
+
+
+def test_rule_round_trip(debug=False):
+    rule = InferenceRule([Formula.from_infix('p'), Formula.from_infix('(p->q)')],
+                         Formula.from_infix('q'))
+    if debug:
+        print('Testing serialization of', rule)
+    assert loads(bytearray(dumps(rule))) == rule
+    rule = InferenceRule([], Formula.from_infix('(p->(q->p))'))
+    if debug:
+        print('Testing serialization of', rule)
+    assert loads(dumps(rule)) == rule
+
+
+def test_proof_round_trip(debug=False):
+    for proof in [prove_implies_self(), prove_hypothetical_syllogism()]:
+        if debug:
+            print('Testing serialization of proof of', proof.statement)
+        data = dumps(proof)
+        assert len(data) < len(str(proof))
+        loaded = loads(data)
+        assert str(loaded) == str(proof)
+        assert loaded.is_valid()
+
+
+def test_dump_and_load(debug=False):
+    if debug:
+        print('Testing dumping a proof to a file and loading it through mmap')
+    proof = prove_hypothetical_syllogism()
+    handle, path = tempfile.mkstemp()
+    try:
+        with os.fdopen(handle, 'wb') as file:
+            dump(proof, file)
+        assert str(load(path)) == str(proof)
+    finally:
+        os.remove(path)
+
+
+def test_loads_rejects_other_data(debug=False):
+    if debug:
+        print('Testing that data without the header is rejected')
+    for data in [b'', b'PLF', b'not a proof']:
+        try:
+            loads(data)
+            assert False
+        except ValueError:
+            pass
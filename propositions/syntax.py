@@ -3,6 +3,11 @@
     by Gonczarowski and Nisan.
     File name: code/propositions/syntax.py """
 
+import re
+from weakref import WeakValueDictionary
+
+_set = object.__setattr__
+
 
 def is_variable(s):
     """ Is s an atomic proposition?  """
@@ -30,174 +35,339 @@ def is_constant(s):
 
 
 class Formula:
-    """ A Propositional Formula """
+    """ A Propositional Formula. Formulae are immutable and hash-consed:
+        constructing a formula that is structurally equal to a live one returns
+        that same object, so equality is an identity check and the hash is
+        computed once, when the node is created. The size and depth are also
+        computed on creation, and the infix, prefix and variables of a formula
+        are cached on it the first time they are asked for """
+
+    __slots__ = ('root', 'first', 'second', 'third', '_operands', '_hash', '_size', '_depth',
+                 '_infix', '_prefix', '_variables', '__weakref__')
 
-    def __init__(self, root, first=None, second=None, third=None):
-        """ Create a new formula from its root (a string) and, when needed, the
-        first and second operands (each of them a Formula)."""
+    # Maps (root, first, second, third) to the unique live node with that shape.
+    # Children are themselves unique, so they are compared by identity.
+    _unique_table = WeakValueDictionary()
+
+    def __new__(cls, root, first=None, second=None, third=None):
+        """ Return the formula with the given root (a string) and, when needed,
+            the first, second and third operands (each of them a Formula) """
+        key = (root, first, second, third)
+        self = Formula._unique_table.get(key)
+        if self is not None:
+            return self
+        self = object.__new__(cls)
         if is_constant(root) or is_variable(root):
             assert first is None and second is None
-            self.root = root
-        elif is_unary(root):
-            assert type(first) is Formula and second is None
-            self.root, self.first = root, first
-        elif is_binary(root):
-            assert is_binary(root) and type(first) is Formula and type(second) is Formula
-            self.root, self.first, self.second = root, first, second
+            _set(self, 'root', root)
+            operands = ()
+            _set(self, '_infix', root)
+            _set(self, '_prefix', root)
+            _set(self, '_variables', frozenset() if is_constant(root) else frozenset([root]))
         else:
-            self.root, self.first, self.second, self.third = root, first, second, third
+            if is_unary(root):
+                assert type(first) is Formula and second is None
+                _set(self, 'root', root)
+                _set(self, 'first', first)
+                operands = (first,)
+            elif is_binary(root):
+                assert type(first) is Formula and type(second) is Formula
+                _set(self, 'root', root)
+                _set(self, 'first', first)
+                _set(self, 'second', second)
+                operands = (first, second)
+            else:
+                _set(self, 'root', root)
+                _set(self, 'first', first)
+                _set(self, 'second', second)
+                _set(self, 'third', third)
+                operands = (first, second, third)
+            _set(self, '_infix', None)
+            _set(self, '_prefix', None)
+            _set(self, '_variables', None)
+        _set(self, '_operands', operands)
+        _set(self, '_size', 1 + sum(operand._size for operand in operands))
+        _set(self, '_depth', 1 + max(operand._depth for operand in operands) if operands else 0)
+        _set(self, '_hash', hash(key))
+        Formula._unique_table[key] = self
+        return self
+
+    def __setattr__(self, name, value):
+        raise AttributeError('Formula objects are immutable')
+
+    def __delattr__(self, name):
+        raise AttributeError('Formula objects are immutable')
+
+    def __hash__(self):
+        return self._hash
+
+    def __copy__(self):
+        return self
+
+    def __deepcopy__(self, memo):
+        return self
+
+    def __reduce__(self):
+        # Pickle a flat table of the distinct subformulae rather than nested
+        # nodes, so that pickling does not recurse on deep formulae
+        indices = {}
+        table = []
+        for node in postorder(self):
+            indices[node] = len(table)
+            table.append((node.root,) + tuple(indices[operand] for operand in node._operands))
+        return _from_table, (table,)
 
     def __repr__(self):
         return self.infix()
 
     def __eq__(self, other):
-        return self.infix() == other.infix()
+        return self is other
 
     def __ne__(self, other):
         return not self == other
 
+    def operands(self):
+        """ Return the tuple of the operands of self (empty for variables and
+            constants) """
+        return self._operands
+
+    def size(self):
+        """ Return the number of operators, variables and constants in self """
+        return self._size
+
+    def depth(self):
+        """ Return the length of the longest path from the root of self to a
+            variable or a constant """
+        return self._depth
+
     def infix(self):
         """ Return an infix representation of self """
-        if is_constant(self.root) or is_variable(self.root):
-            return self.root
-        elif is_unary(self.root):
-            return self.root + self.first.infix()
-        elif is_binary(self.root):
-            return "(" + self.first.infix() + self.root + self.second.infix() + ")"
-        else:
-            return "(" + self.first.infix() + "?" + self.second.infix() + ":" + self.third.infix() + ")"
+        if self._infix is None:
+            parts = []
+            stack = [self]
+            while stack:
+                item = stack.pop()
+                if type(item) is str:
+                    parts.append(item)
+                elif item._infix is not None:
+                    parts.append(item._infix)
+                elif is_unary(item.root):
+                    parts.append(item.root)
+                    stack.append(item.first)
+                elif is_binary(item.root):
+                    parts.append("(")
+                    stack.extend([")", item.second, item.root, item.first])
+                else:
+                    parts.append("(")
+                    stack.extend([")", item.third, ":", item.second, "?", item.first])
+            _set(self, '_infix', ''.join(parts))
+        return self._infix
 
     @staticmethod
     def from_infix(s):
         """ Return a propositional formula whose infix representation is s """
-        if s[0] == '~':
-            return Formula('~', Formula.from_infix(s[1:]))
-        elif s[0] == '(':
-            parenthesis_counter = 0
-            for letter in range(1, len(s), 1):
-                if s[letter] == "(":
-                    parenthesis_counter += 1
-                elif s[letter] == ")":
-                    parenthesis_counter -= 1
-                elif s[letter] == '&' or s[letter] == '|':
-                    if parenthesis_counter == 0:
-                        return Formula(s[letter], Formula.from_infix(s[1:letter]),
-                                       Formula.from_infix((s[letter + 1:-1])))
-                elif s[letter] == '-':
-                    if parenthesis_counter == 0:
-                        return Formula(s[letter:letter + 2], Formula.from_infix(s[1:letter]),
-                                       Formula.from_infix((s[letter + 2:-1])))
-                elif s[letter] == '<':
-                    if parenthesis_counter == 0:
-                        return Formula(s[letter:letter + 3], Formula.from_infix(s[1:letter]),
-                                       Formula.from_infix((s[letter + 3:-1])))
-                elif s[letter] == '?':
-                    if parenthesis_counter == 0:
-                        second_parenthesis_counter = 0
-                        colon = letter
-                        while colon < len(s):
-                            if s[colon] == ":":
-                                if second_parenthesis_counter == 0:
-                                    break
-                            elif s[colon] == "(":
-                                second_parenthesis_counter += 1
-                            elif s[colon] == ")":
-                                second_parenthesis_counter -= 1
-                            colon += 1
-                        return Formula(s[letter] + s[colon], Formula.from_infix(s[1:letter]),
-                                       Formula.from_infix(s[letter + 1:colon]),
-                                       Formula.from_infix(s[colon + 1: -1]))
-        else:
-            return Formula(s)
+        return _parse_infix(_tokenize(s), s, Formula)
 
     def prefix(self):
         """ Return a prefix representation of self """
-        if is_constant(self.root) or is_variable(self.root):
-            return self.root
-        elif is_unary(self.root):
-            return self.root + self.first.prefix()
-        elif is_binary(self.root):
-            return self.root + self.first.prefix() + self.second.prefix()
-        else:
-            return self.root + self.first.prefix() + self.second.prefix() + self.third.prefix()
+        if self._prefix is None:
+            parts = [node.root if node._prefix is None else node._prefix
+                     for node in preorder(self, _has_prefix)]
+            _set(self, '_prefix', ''.join(parts))
+        return self._prefix
 
     @staticmethod
     def from_prefix(s):
         """ Return a propositional formula whose prefix representation is s """
-        if s[0] == '~':
-            return Formula('~', Formula.from_prefix(s[1:]))
-        elif s[0] == '&' or s[0] == "|" or s[0] == '-' or s[0] == '<' or s[0] == '?':
-            counter = 1
-            if s[0] == '-' or s[0] == '?':
-                letter = 2
-            elif s[0] == '<':
-                letter = 3
-            else:
-                letter = 1
-            while counter > 0:
-                if s[letter] == 'F' or s[letter] == 'T':
-                    counter -= 1
-                elif 'p' <= s[letter] <= 'z':
-                    while s[letter + 1].isdigit():
-                        letter += 1
-                    counter -= 1
-                elif s[letter] == '&' or s[letter] == '|':
-                    counter += 1
-                elif s[letter] == '-':
-                    counter += 1
-                    letter += 1
-                elif s[letter] == '<':
-                    counter += 1
-                    letter += 2
-                elif s[letter] == '?':
-                    counter += 2
-                    letter += 1
-                letter += 1
-            if s[0] == '-':
-                return Formula(s[0:2], Formula.from_prefix(s[2:letter]), Formula.from_prefix(s[letter:]))
-            elif s[0] == '<':
-                return Formula(s[0:3], Formula.from_prefix(s[3:letter]), Formula.from_prefix(s[letter:]))
-            elif s[0] == '?':
-                second_counter = 1
-                second_letter = letter
-                while second_counter > 0:
-                    if s[second_letter] == 'F' or s[second_letter] == 'T':
-                        second_counter -= 1
-                        second_letter += 1
-                    elif 'p' <= s[second_letter] <= 'z':
-                        while s[second_letter + 1].isdigit():
-                            second_letter += 1
-                        second_counter -= 1
-                        second_letter += 1
-                    elif s[second_letter] == '&' or s[second_letter] == '|':
-                        second_counter += 1
-                    elif s[second_letter] == '-':
-                        second_counter += 1
-                        second_letter += 2
-                    elif s[second_letter] == '<':
-                        second_counter += 1
-                        second_letter += 3
-                    elif s[second_letter] == '?':
-                        second_counter += 2
-                        second_letter += 2
-                return Formula(s[0:2], Formula.from_prefix(s[2:letter]),
-                               Formula.from_prefix(s[letter:second_letter]),
-                               Formula.from_prefix(s[second_letter:]))
-            else:
-                return Formula(s[0:1], Formula.from_prefix(s[1:letter]), Formula.from_prefix(s[letter:]))
-        else:
-            return Formula(s)
+        return _parse_prefix(_tokenize(s), s, Formula)
+
+    @staticmethod
+    def parse_many(strings, prefix=False):
+        """ Return a list of the propositional formulae represented by the
+            given strings, which are in prefix notation if prefix is True and
+            in infix notation otherwise. Repeated strings are parsed once """
+        parse = Formula.from_prefix if prefix else Formula.from_infix
+        parsed = {}
+        formulae = []
+        for s in strings:
+            formula = parsed.get(s)
+            if formula is None:
+                formula = parsed[s] = parse(s)
+            formulae.append(formula)
+        return formulae
 
     def variables(self):
         """ Return the set of atomic propositions (variables) used in self """
-        if is_constant(self.root) or is_variable(self.root):
-            if self.root == 'T' or self.root == 'F':
-                return set()
+        if self._variables is None:
+            variables = set()
+            for node in postorder(self, _has_variables):
+                if node._variables is not None:
+                    variables |= node._variables
+            _set(self, '_variables', frozenset(variables))
+        return set(self._variables)
+
+
+def _has_prefix(formula):
+    return formula._prefix is not None
+
+
+def _has_variables(formula):
+    return formula._variables is not None
+
+
+def _from_table(table):
+    """ Return the last formula of a table built by Formula.__reduce__ """
+    nodes = []
+    for entry in table:
+        nodes.append(Formula(entry[0], *[nodes[index] for index in entry[1:]]))
+    return nodes[-1]
+
+
+def preorder(formula, prune=None):
+    """ Return an iterator over the subformulae of the given formula in
+        preorder, visiting a subformula once per occurrence. The operands of
+        subformulae for which prune returns True are not visited. Uses an
+        explicit stack, so the depth of formula is limited only by memory """
+    stack = [formula]
+    while stack:
+        node = stack.pop()
+        yield node
+        if prune is None or not prune(node):
+            stack.extend(reversed(node._operands))
+
+
+def postorder(formula, prune=None):
+    """ Return an iterator over the distinct subformulae of the given formula,
+        each appearing after all of its operands. The operands of subformulae
+        for which prune returns True are not visited. Uses an explicit stack,
+        so the depth of formula is limited only by memory """
+    done = set()
+    stack = [formula]
+    while stack:
+        node = stack[-1]
+        if node in done:
+            stack.pop()
+            continue
+        if prune is None or not prune(node):
+            pending = [operand for operand in node._operands if operand not in done]
+            if pending:
+                stack.extend(reversed(pending))
+                continue
+        stack.pop()
+        done.add(node)
+        yield node
+
+
+def shared_size(formulae):
+    """ Return the number of distinct subformulae of the given formulae, that
+        is, the number of nodes of the single DAG that represents them all """
+    seen = set()
+    for formula in formulae:
+        for node in postorder(formula, seen.__contains__):
+            seen.add(node)
+    return len(seen)
+
+
+def fold(formula, combine, results=None):
+    """ Return combine(node, operand_results) computed bottom-up for the given
+        formula, where operand_results is the list of the values computed for
+        the operands of node. combine is called once per distinct subformula.
+        If a results dictionary is given, the values already in it are reused
+        and the newly computed values are added to it """
+    if results is None:
+        results = {}
+    for node in postorder(formula, results.__contains__):
+        if node not in results:
+            results[node] = combine(node, [results[operand] for operand in node._operands])
+    return results[formula]
+
+
+# Operators and constants are listed longest first, so that '->' is not read as
+# a '-' followed by a '>'. '?:' is a single token in prefix notation only.
+_TOKEN = re.compile(r'[p-z][0-9]*|<->|->|-&|-\||\?:|[TF~&|()?:]')
+
+
+def _tokenize(s):
+    """ Return the list of tokens of the given infix or prefix string """
+    tokens = _TOKEN.findall(s)
+    if sum(map(len, tokens)) != len(s):
+        position = 0
+        while position < len(s):
+            token = _TOKEN.match(s, position)
+            if token is None:
+                raise ValueError('Unexpected character %r at position %d of %r' %
+                                 (s[position], position, s))
+            position = token.end()
+    return tokens
+
+
+def _parse_infix(tokens, s, make):
+    """ Return the formula whose infix tokens are given, using an explicit
+        stack instead of recursion. The stack holds pending '~' and '('
+        markers and operators (all strings), and the formulae parsed so far.
+        Formulae are built by calling make(root, first, second, third) """
+    stack = []
+    for token in tokens:
+        if token == '~' or token == '(':
+            if stack and type(stack[-1]) is not str:
+                raise ValueError('Unexpected %r in %r' % (token, s))
+            stack.append(token)
+            continue
+        if token == ')':
+            if len(stack) >= 4 and stack[-4] == '(' and is_binary(stack[-2]):
+                formula = make(stack[-2], stack[-3], stack[-1], None)
+                del stack[-4:]
+            elif len(stack) >= 6 and stack[-6] == '(' and stack[-4] == '?' and stack[-2] == ':':
+                formula = make('?:', stack[-5], stack[-3], stack[-1])
+                del stack[-6:]
             else:
-                return {self.root}
-        elif is_unary(self.root):
-            return self.first.variables()
-        elif is_binary(self.root):
-            return self.first.variables() | self.second.variables()
+                raise ValueError('Unbalanced or malformed parentheses in %r' % s)
+        elif is_binary(token) or token == '?' or token == ':':
+            if not stack or type(stack[-1]) is str:
+                raise ValueError('Operator %r is missing its first operand in %r' % (token, s))
+            stack.append(token)
+            continue
+        elif is_variable(token) or is_constant(token):
+            if stack and type(stack[-1]) is not str:
+                raise ValueError('Unexpected %r in %r' % (token, s))
+            formula = make(token, None, None, None)
+        else:
+            raise ValueError('Unexpected %r in %r' % (token, s))
+        while stack and stack[-1] == '~':
+            stack.pop()
+            formula = make('~', formula, None, None)
+        stack.append(formula)
+    if len(stack) != 1 or type(stack[0]) is str:
+        raise ValueError('Incomplete formula %r' % s)
+    return stack[0]
+
+
+def _parse_prefix(tokens, s, make):
+    """ Return the formula whose prefix tokens are given. The tokens are read
+        from right to left, so that every operator finds its operands on top
+        of the stack. Formulae are built by calling
+        make(root, first, second, third) """
+    stack = []
+    for token in reversed(tokens):
+        if is_variable(token) or is_constant(token):
+            stack.append(make(token, None, None, None))
+        elif is_unary(token):
+            if not stack:
+                raise ValueError('Operator %r is missing its operand in %r' % (token, s))
+            stack.append(make(token, stack.pop(), None, None))
+        elif is_binary(token):
+            if len(stack) < 2:
+                raise ValueError('Operator %r is missing operands in %r' % (token, s))
+            first = stack.pop()
+            stack.append(make(token, first, stack.pop(), None))
+        elif is_ternary(token):
+            if len(stack) < 3:
+                raise ValueError('Operator %r is missing operands in %r' % (token, s))
+            first = stack.pop()
+            second = stack.pop()
+            stack.append(make(token, first, second, stack.pop()))
         else:
-            return self.first.variables() | self.second.variables() | self.third.variables()
+            raise ValueError('Unexpected %r in %r' % (token, s))
+    if len(stack) != 1:
+        raise ValueError('Incomplete formula %r' % s)
+    return stack[0]
@@ -3,7 +3,7 @@
     by Gonczarowski and Nisan.
     File name: code/propositions/syntax_test.py """
 
-from propositions.syntax import Formula
+from propositions.syntax import Formula, preorder, postorder, fold, shared_size
 
 
 def test_infix(debug=False):
@@ -117,3 +117,129 @@ def test_variables_all_operators(debug=False):
         if debug:
             print("Testing variables of", formula)
         assert formula.variables() == variables
+
+
+def test_hash_consing(debug=False):
+    for infix in ['p', '~x12', '(x&y)', '~~(x|~T)', '((x1&~x2)|F)', '(p?q:r)']:
+        if debug:
+            print("Testing that structurally equal copies of", infix, "are shared")
+        formula = Formula.from_infix(infix)
+        assert Formula.from_infix(infix) is formula
+        assert hash(Formula.from_prefix(formula.prefix())) == hash(formula)
+    if debug:
+        print("Testing that equal subformulae are shared")
+    formula = Formula.from_infix('((p&q)|~(p&q))')
+    assert formula.first is formula.second.first
+    assert formula != formula.second
+    if debug:
+        print("Testing that formulae cannot be modified")
+    try:
+        formula.first = Formula('p')
+        assert False
+    except AttributeError:
+        pass
+
+
+def test_parse_deep(debug=False):
+    if debug:
+        print("Testing parsing of a formula nested 20000 levels deep")
+    infix = 'p'
+    for i in range(10000):
+        infix = '~(q&' + infix + ')'
+    formula = Formula.from_infix(infix)
+    assert formula.root == '~' and formula.first.first.root == 'q'
+    prefix = '~&q' * 10000 + 'p'
+    assert Formula.from_prefix(prefix) is formula
+
+
+def test_parse_many(debug=False):
+    infixes = ['p', '~x12', '(x&y)', '(p?q:r)', '(x&y)', '((x1<->~x2)-|F)']
+    if debug:
+        print("Testing bulk parsing of", infixes)
+    formulae = Formula.parse_many(infixes)
+    assert [formula.infix() for formula in formulae] == infixes
+    prefixes = [formula.prefix() for formula in formulae]
+    assert Formula.parse_many(prefixes, prefix=True) == formulae
+
+
+def test_parse_errors(debug=False):
+    for s in ['', '(p&q', 'p&q', '(p)', '~', '&p', 'pq', '(p?q)', 'p q', '(p%q)']:
+        if debug:
+            print("Testing that parsing", repr(s), "fails")
+        try:
+            Formula.from_infix(s)
+            assert False
+        except ValueError:
+            pass
+
+
+def test_size_and_depth(debug=False):
+    for infix, size, depth in [['p', 1, 0],
+                               ['~x12', 2, 1],
+                               ['~~(x|~T)', 6, 4],
+                               ['((x1&~x2)|F)', 6, 3],
+                               ['(p?q:~r)', 5, 2]]:
+        formula = Formula.from_infix(infix)
+        if debug:
+            print("Testing size and depth of", formula)
+        assert formula.size() == size
+        assert formula.depth() == depth
+
+
+def test_cached_representations(debug=False):
+    if debug:
+        print("Testing that representations are cached and not shared as mutable sets")
+    formula = Formula.from_infix('((x1&~x2)|(p?q:~~x1))')
+    assert formula.infix() is formula.infix()
+    assert formula.prefix() is formula.prefix()
+    variables = formula.variables()
+    variables.add('y')
+    assert formula.variables() == {'x1', 'x2', 'p', 'q'}
+    assert formula.first.variables() == {'x1', 'x2'}
+    assert formula.second.infix() == '(p?q:~~x1)'
+
+
+def test_traversals(debug=False):
+    formula = Formula.from_infix('((p&q)|~(p&q))')
+    if debug:
+        print("Testing preorder and postorder traversals of", formula)
+    assert [node.root for node in preorder(formula)] == ['|', '&', 'p', 'q', '~', '&', 'p', 'q']
+    assert [node.infix() for node in postorder(formula)] == \
+           ['p', 'q', '(p&q)', '~(p&q)', '((p&q)|~(p&q))']
+    assert [node.root for node in preorder(formula, lambda node: node.root == '~')] == \
+           ['|', '&', 'p', 'q', '~']
+    if debug:
+        print("Testing fold over", formula)
+    calls = []
+
+    def count_leaves(node, operands):
+        calls.append(node)
+        return sum(operands) if operands else 1
+
+    assert fold(formula, count_leaves) == 4
+    assert len(calls) == 5
+
+
+def test_deep_formulae(debug=False):
+    if debug:
+        print("Testing infix, prefix, variables and pickling of a formula 100000 levels deep")
+    import pickle
+    formula = Formula('p')
+    for i in range(100000):
+        formula = Formula('&', formula, Formula('q' + str(i % 7)))
+    assert formula.depth() == 100000
+    assert formula.variables() == {'p'} | {'q' + str(i) for i in range(7)}
+    assert Formula.from_infix(formula.infix()) is formula
+    assert Formula.from_prefix(formula.prefix()) is formula
+    assert pickle.loads(pickle.dumps(formula)) is formula
+
+
+def test_shared_size(debug=False):
+    first = Formula.from_infix('((p&q)|(p&r))')
+    second = Formula.from_infix('(~(p&q)->(p&r))')
+    if debug:
+        print('Testing the shared size of', first, 'and', second)
+    assert shared_size([first]) == 6
+    assert shared_size([first, second]) == 8
+    assert shared_size([first, first.first, Formula('p')]) == 6
+    assert shared_size([]) == 0
@@ -7,6 +7,7 @@ from propositions.syntax import *
 from propositions.proofs import *
 from propositions.provers import MP, I1, I2, inverse_mp
 from propositions.semantics import *
+from propositions.incremental import sweep
 
 # Axiomatic Inference Rules (MP, I1, and I2 are imported from provers.py)
 
@@ -582,16 +583,14 @@ def proof_or_counterexample(formula):
 
 
 def get_models(rule):
-    models = []
-    for model in all_models(rule.conclusion.variables()):
-        if evaluate(rule.conclusion, model):
-            bol = True
-            for ass in rule.assumptions:
-                if not evaluate(ass, model):
-                    bol = False
-            if bol:
-                models.append(model)
-    return models
+    """ Return the list of the models over the variables of the conclusion of
+        the given rule in which the conclusion and all of the assumptions hold.
+        The models are swept in Gray code order, re-evaluating incrementally """
+    formula = rule.conclusion
+    for assumption in rule.assumptions:
+        formula = Formula(AND, formula, assumption)
+    return [dict(model) for model, value in sweep(formula, sorted(rule.conclusion.variables()))
+            if value]
 
 
 def proof_or_counterexample_for_inference(rule):
@@ -649,17 +648,10 @@ def model_or_inconsistent(formulae):
     for formula in iter_formulae:
         conjunction = Formula(AND, conjunction, formula)
     negate_conjunction = Formula(NOT, conjunction)
-    if is_tautology(negate_conjunction):
+    model = find_counterexample(negate_conjunction)
+    if model is None:
         first_proof = proof_or_counterexample_for_inference(InferenceRule(formulae, conjunction))
         second_proof = proof_or_counterexample(negate_conjunction)
         second_proof.statement.assumptions = formulae
         return [first_proof, second_proof]
-    else:
-        for model in all_models(conjunction.variables()):
-            all_formulae_true = True
-            for formula in formulae:
-                if not evaluate(formula, model):
-                    all_formulae_true = False
-                    break
-            if all_formulae_true:
-                return model
+    return model
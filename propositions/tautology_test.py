@@ -238,4 +238,16 @@ def __test_model_or_inconsistent(prover, tests, rules, debug):
                    Formula('~', result[0].statement.conclusion)
 
 
+def test_get_models(debug=False):
+    rule = InferenceRule([Formula.from_infix('(p|q)'), Formula.from_infix('~r')],
+                         Formula.from_infix('(p->(q|r))'))
+    if debug:
+        print('Testing get_models for', rule)
+    models = get_models(rule)
+    expected = [model for model in all_models(['p', 'q', 'r'])
+                if evaluate(rule.conclusion, model) and
+                all(evaluate(assumption, model) for assumption in rule.assumptions)]
+    assert sorted(models, key=str) == sorted(expected, key=str)
+
+
 test_prove_in_model(True)
\ No newline at end of file
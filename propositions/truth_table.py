@@ -0,0 +1,232 @@
+""" (c) This file is part of the course
+    Mathematical Logic through Programming
+    by Gonczarowski and Nisan.
+    File name: code/propositions/truth_table.py """
+
+from functools import lru_cache
+
+from propositions.syntax import *
+
+# Tables with more rows than 2**DEFAULT_CHUNK_VARIABLES are computed in chunks
+# of that many rows, so that every column takes at most 32KB
+DEFAULT_CHUNK_VARIABLES = 18
+
+# Forms of written truth tables
+MARKDOWN = 'markdown'
+CSV = 'csv'
+PACKED = 'packed'
+
+# Written text is passed to the file in pieces of about this many rows, and
+# packed bits in pieces of about this many bytes
+BUFFER_ROWS = 4096
+BUFFER_BYTES = 1 << 16
+
+# Rows are rendered from a prefix for the first variables and a suffix,
+# precomputed for all values of at most this many last variables
+SUFFIX_VARIABLES = 8
+
+
+def evaluate_columns(formula, columns, full):
+    """ Return the column of the given formula, given the columns of its
+        variables. A column is an integer whose bit i is the truth value in
+        row i, and full is the column that is true in all rows. Every distinct
+        subformula is computed once, with one bitwise operation, and its column
+        is dropped as soon as all the subformulae using it are computed """
+    order = list(postorder(formula))
+    uses = {}
+    for node in order:
+        for operand in node.operands():
+            uses[operand] = uses.get(operand, 0) + 1
+    values = {}
+    for node in order:
+        root = node.root
+        if is_variable(root):
+            value = columns[root]
+        elif is_constant(root):
+            value = full if root == 'T' else 0
+        elif is_unary(root):
+            value = full ^ values[node.first]
+        elif is_ternary(root):
+            first = values[node.first]
+            value = (first & values[node.second]) | ((full ^ first) & values[node.third])
+        else:
+            first, second = values[node.first], values[node.second]
+            if root == '&':
+                value = first & second
+            elif root == '|':
+                value = first | second
+            elif root == '->':
+                value = (full ^ first) | second
+            elif root == '<->':
+                value = full ^ first ^ second
+            elif root == '-&':
+                value = full ^ (first & second)
+            else:
+                value = full ^ (first | second)
+        values[node] = value
+        for operand in node.operands():
+            uses[operand] -= 1
+            if uses[operand] == 0:
+                del values[operand]
+    return values[formula]
+
+
+@lru_cache(maxsize=64)
+def bit_column(rows_log, bit):
+    """ Return the column of 2**rows_log rows that is true exactly in the rows
+        whose number has the given bit set """
+    width = 2 << bit
+    column = ((1 << (1 << bit)) - 1) << (1 << bit)
+    while width < 1 << rows_log:
+        column |= column << width
+        width *= 2
+    return column
+
+
+def column_bits(column, rows):
+    """ Return the list of the truth values of the given column in each of the
+        given number of rows """
+    return [bit == '1' for bit in reversed(bin(column)[2:].zfill(rows))]
+
+
+class TruthTable:
+    """ The truth table of a formula over a list of variables, with row i
+        being model number i in the order of all_models(variables). The table
+        is computed with one bitwise operation per distinct subformula on
+        columns of rows packed into integers. Tables of more than
+        2**chunk_variables rows are computed lazily in chunks of that many
+        rows, each chunk fixing the values of the first variables """
+
+    def __init__(self, formula, variables=None, chunk_variables=DEFAULT_CHUNK_VARIABLES):
+        if variables is None:
+            variables = sorted(formula.variables())
+        self.formula = formula
+        self.variables = list(variables)
+        self.rows = 2 ** len(self.variables)
+        self.chunk_variables = min(chunk_variables, len(self.variables))
+        self.chunk_rows = 2 ** self.chunk_variables
+
+    def chunk(self, number):
+        """ Return the column of the given chunk of self """
+        fixed = len(self.variables) - self.chunk_variables
+        full = (1 << self.chunk_rows) - 1
+        columns = {}
+        for position, variable in enumerate(self.variables):
+            if position < fixed:
+                columns[variable] = full if number >> (fixed - 1 - position) & 1 else 0
+            else:
+                columns[variable] = bit_column(self.chunk_variables, len(self.variables) - 1 - position)
+        return evaluate_columns(self.formula, columns, full)
+
+    def chunks(self):
+        """ Return an iterator over pairs of the number of the first row of
+            each chunk of self, and the column of that chunk """
+        for number in range(self.rows // self.chunk_rows):
+            yield number * self.chunk_rows, self.chunk(number)
+
+    def values(self):
+        """ Return an iterator over the truth values of all rows of self """
+        for first_row, column in self.chunks():
+            yield from column_bits(column, self.chunk_rows)
+
+    def count(self):
+        """ Return the number of rows of self in which the formula is true """
+        return sum(bin(column).count('1') for first_row, column in self.chunks())
+
+    def first_row(self, value):
+        """ Return the number of the first row of self in which the formula has
+            the given truth value, or None if there is no such row """
+        full = (1 << self.chunk_rows) - 1
+        for first_row, column in self.chunks():
+            if not value:
+                column ^= full
+            if column:
+                return first_row + (column & -column).bit_length() - 1
+        return None
+
+    def is_tautology(self):
+        """ Return whether the formula is true in all rows of self """
+        return self.first_row(False) is None
+
+    def _cells(self, form):
+        """ Return the header of self in the given text form, and for each
+            variable, the cells of its two values """
+        infix = self.formula.infix()
+        if form == CSV:
+            header = ','.join(self.variables + [infix]) + '\n'
+            cells = [('F,', 'T,') for variable in self.variables]
+        elif form == MARKDOWN:
+            header = '|' + ''.join(' ' + variable + ' |' for variable in self.variables) + ' ' + infix + ' |\n' + \
+                     '|' + ''.join('-' * (len(variable) + 2) + '|' for variable in self.variables) + \
+                     '-' * (len(infix) + 2) + '|\n'
+            cells = [(' F' + ' ' * len(variable) + '|', ' T' + ' ' * len(variable) + '|')
+                     for variable in self.variables]
+        else:
+            raise ValueError('Unknown form ' + str(form))
+        return header, cells
+
+    def write(self, file, form=MARKDOWN, only=None):
+        """ Write self to the given file, and return the number of rows
+            written. In the MARKDOWN and CSV forms, file is a text file, and
+            gets a header and then one line per row with the truth values of
+            the variables and the formula as T or F. If only is True or False,
+            only the rows where the formula has that value are written. In the
+            PACKED form, file is a binary file, and gets the values of the
+            formula in all rows as bits, row 8j+i being bit i of byte j. Rows
+            are generated a chunk at a time and written in pieces, so tables
+            of any number of rows are written in bounded memory """
+        if form == PACKED:
+            if only is not None:
+                raise ValueError('Packed tables have all rows')
+            return self._write_packed(file)
+        header, cells = self._cells(form)
+        if form == CSV:
+            values = ('F\n', 'T\n')
+        else:
+            values = tuple(' ' + value + ' ' * (len(self.formula.infix()) - 1) + ' |\n' for value in 'FT')
+        count = len(self.variables)
+        suffix_count = min(count, SUFFIX_VARIABLES)
+        suffixes = ['']
+        for position in range(count - suffix_count, count):
+            suffixes = [suffix + cell for suffix in suffixes for cell in cells[position]]
+        start = '|' if form == MARKDOWN else ''
+        file.write(header)
+        written = 0
+        lines = []
+        prefixes = {}
+        for first_row, column in self.chunks():
+            bits = column_bits(column, self.chunk_rows)
+            if only is None:
+                rows = range(self.chunk_rows)
+            else:
+                rows = [row for row, bit in enumerate(bits) if bit == only]
+            for row in rows:
+                number = first_row + row
+                high = number >> suffix_count
+                prefix = prefixes.get(high)
+                if prefix is None:
+                    prefixes.clear()
+                    prefix = prefixes[high] = start + ''.join(
+                        cells[position][number >> (count - 1 - position) & 1]
+                        for position in range(count - suffix_count))
+                lines.append(prefix + suffixes[number & ((1 << suffix_count) - 1)] + values[bits[row]])
+                if len(lines) >= BUFFER_ROWS:
+                    file.write(''.join(lines))
+                    written += len(lines)
+                    lines = []
+        file.write(''.join(lines))
+        return written + len(lines)
+
+    def _write_packed(self, file):
+        bits = 0
+        pending = 0
+        for first_row, column in self.chunks():
+            pending |= column << bits
+            bits += self.chunk_rows
+            if bits >= 8 * BUFFER_BYTES:
+                file.write((pending & ((1 << (bits // 8 * 8)) - 1)).to_bytes(bits // 8, 'little'))
+                pending >>= bits // 8 * 8
+                bits %= 8
+        file.write(pending.to_bytes((bits + 7) // 8, 'little'))
+        return self.rows
+
@@ -0,0 +1,103 @@
+""" (c) This file is part of the course
+    Mathematical Logic through Programming
+    by Gonczarowski and Nisan.
+    File name: code/propositions/truth_table_test.py """
+
+from propositions.syntax import *
+from propositions.semantics import *
+from propositions.truth_table import *
+
+infixes = ['T', 'F', 'p', '~(p&q7)', '(p?~q:(r<->s))', '((p-&q)->(q-|p))', '((p|q)&~(p|q))',
+           '(p1->(p2|(p3&p4)))']
+
+
+def test_truth_table(debug=False):
+    for infix in infixes:
+        formula = Formula.from_infix(infix)
+        for chunk_variables in [0, 1, 2, DEFAULT_CHUNK_VARIABLES]:
+            if debug:
+                print('Testing truth table of', infix, 'in chunks of', 2 ** chunk_variables, 'rows')
+            table = TruthTable(formula, chunk_variables=chunk_variables)
+            values = [evaluate(formula, model) for model in all_models(table.variables)]
+            assert list(table.values()) == values
+            assert table.count() == values.count(True)
+            assert table.is_tautology() == all(values)
+            for value in [False, True]:
+                assert table.first_row(value) == (values.index(value) if value in values else None)
+
+
+def test_truth_table_over_given_variables(debug=False):
+    formula = Formula.from_infix('(q->p)')
+    if debug:
+        print('Testing truth table of', formula, 'over given variables')
+    table = TruthTable(formula, ['p', 'q', 'r'], chunk_variables=1)
+    assert table.rows == 8
+    assert list(table.values()) == [True, True, False, False, True, True, True, True]
+
+
+def test_evaluate_columns(debug=False):
+    formula = Formula.from_infix('((p&q)|~(p&q))')
+    if debug:
+        print('Testing evaluation of', formula, 'on given columns')
+    assert evaluate_columns(formula, {'p': 0b0011, 'q': 0b0101}, 0b1111) == 0b1111
+    assert evaluate_columns(Formula.from_infix('(p&q)'), {'p': 0b0011, 'q': 0b0101}, 0b1111) == 0b0001
+    assert column_bits(0b0110, 5) == [False, True, True, False, False]
+
+
+def test_write(debug=False):
+    from io import StringIO, BytesIO
+    formula = Formula.from_infix('(x&(~z|y12))')
+    markdown = '| x | y12 | z | (x&(~z|y12)) |\n' \
+               '|---|-----|---|--------------|\n' \
+               '| F | F   | F | F            |\n' \
+               '| F | F   | T | F            |\n' \
+               '| F | T   | F | F            |\n' \
+               '| F | T   | T | F            |\n' \
+               '| T | F   | F | T            |\n' \
+               '| T | F   | T | F            |\n' \
+               '| T | T   | F | T            |\n' \
+               '| T | T   | T | T            |\n'
+    csv = 'x,y12,z,(x&(~z|y12))\n' \
+          'T,F,F,T\n' \
+          'T,T,F,T\n' \
+          'T,T,T,T\n'
+    for chunk_variables in [0, 1, 3]:
+        table = TruthTable(formula, chunk_variables=chunk_variables)
+        if debug:
+            print('Testing writing', formula, 'in chunks of', table.chunk_rows, 'rows')
+        output = StringIO()
+        assert table.write(output) == 8
+        assert output.getvalue() == markdown
+        output = StringIO()
+        assert table.write(output, CSV, True) == 3
+        assert output.getvalue() == csv
+        output = StringIO()
+        assert table.write(output, MARKDOWN, False) == 5
+        lines = markdown.splitlines(True)
+        assert output.getvalue() == ''.join(lines[:6] + lines[7:8])
+        output = BytesIO()
+        assert table.write(output, PACKED) == 8
+        assert output.getvalue() == bytes([0b11010000])
+    formula = Formula.from_infix('((p1|p2)->(p3<->p4))')
+    table = TruthTable(formula, ['p' + str(index) for index in range(12)], chunk_variables=5)
+    if debug:
+        print('Testing writing', formula, 'over 12 variables')
+    output = BytesIO()
+    table.write(output, PACKED)
+    assert output.getvalue() == TruthTable(formula, table.variables).chunk(0).to_bytes(512, 'little')
+    output = StringIO()
+    assert table.write(output, CSV, True) == table.count()
+    lines = output.getvalue().splitlines()
+    assert len(lines) == table.count() + 1
+    assert lines[1] == 'F,F,F,F,F,F,F,F,F,F,F,F,T'
+
+
+def test_print_truth_table_forms(debug=False):
+    formula = Formula.from_infix('(p|q)')
+    if debug:
+        print('Testing that print_truth_table rejects the packed form')
+    try:
+        print_truth_table(formula, PACKED)
+        assert False
+    except ValueError:
+        pass
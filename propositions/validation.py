@@ -0,0 +1,274 @@
+""" (c) This file is part of the course
+    Mathematical Logic through Programming
+    by Gonczarowski and Nisan.
+    File name: code/propositions/validation.py """
+
+from functools import lru_cache
+from multiprocessing import Pool
+
+from propositions.syntax import *
+from propositions.arena import FormulaArena
+
+# A parallel validation splits the lines into about this many ranges per
+# worker, so that workers that finish early get more work
+RANGES_PER_WORKER = 4
+
+
+def _matcher_lines(templates, failure):
+    """ Return the lines of Python code that return failure unless the formulae
+        in the locals _0, _1, ... are obtained from the given templates, in
+        order, by substituting formulae for variables consistently. Each
+        template variable becomes a local of the same name bound to the
+        formula substituted for it, and, since formulae are hash-consed,
+        further occurrences are compared by identity """
+    lines = []
+    bound = set()
+    pending = [(template, '_' + str(position)) for position, template in reversed(list(enumerate(templates)))]
+    count = len(templates)
+    while pending:
+        template, name = pending.pop()
+        root = template.root
+        if is_variable(root):
+            if root in bound:
+                lines.append('if %s is not %s: return %s' % (name, root, failure))
+            else:
+                bound.add(root)
+                lines.append('%s = %s' % (root, name))
+            continue
+        lines.append('if %s.root != %r: return %s' % (name, root, failure))
+        operands = []
+        for attribute, operand in zip(('first', 'second', 'third'), template.operands()):
+            if is_variable(operand.root) or is_constant(operand.root):
+                operands.append((operand, '%s.%s' % (name, attribute)))
+            else:
+                local = '_' + str(count)
+                count += 1
+                lines.append('%s = %s.%s' % (local, name, attribute))
+                operands.append((operand, local))
+        pending.extend(reversed(operands))
+    return lines
+
+
+@lru_cache(maxsize=1024)
+def _compile(assumptions, conclusion):
+    arguments = ', '.join('_' + str(position) for position in range(len(assumptions) + 1))
+    templates = (conclusion,) + assumptions
+    variables = sorted(set(conclusion.variables()).union(*[assumption.variables() for assumption in assumptions]))
+    source = ['def matches(%s):' % arguments]
+    source += ['    ' + line for line in _matcher_lines(templates, 'False')]
+    source += ['    return True', '', 'def instantiation(%s):' % arguments]
+    source += ['    ' + line for line in _matcher_lines(templates, 'None')]
+    source.append('    return {%s}' % ', '.join('%r: %s' % (variable, variable) for variable in variables))
+    namespace = {}
+    exec(compile('\n'.join(source), '<rule>', 'exec'), namespace)
+    function = namespace['matches']
+    function.instantiation = namespace['instantiation']
+    return function
+
+
+def compile_rule(rule):
+    """ Return a Python function that takes a conclusion followed by the
+        assumptions of an inference rule with as many assumptions as the
+        given rule, and returns whether that rule is an instance of the given
+        rule. The conclusion is matched first, as it is usually the most
+        selective. The function also has an instantiation attribute, a
+        function that takes the same arguments and returns the map from the
+        variables of the given rule to the formulae substituted for them, or
+        None if there is no such map. Compiled rules are cached """
+    return _compile(tuple(rule.assumptions), rule.conclusion)
+
+
+class ProofValidator:
+    """ Validates lines of deductive proofs of a statement via a list of
+        inference rules. The assumptions of the statement are hashed and the
+        rules are compiled once, and each line is then checked against the
+        conclusions of the earlier lines without building inference rules """
+
+    def __init__(self, statement, rules):
+        self.statement = statement
+        self.rules = rules
+        self.assumptions = set(statement.assumptions)
+        self.conclusion = statement.conclusion
+        self.matchers = [compile_rule(rule) for rule in rules]
+        self.arities = [len(rule.assumptions) for rule in rules]
+
+    def check_line(self, lines, number):
+        """ Return None if the line with the given number is validly justified
+            by the lines before it, and otherwise a string with the reason why
+            it is not """
+        line = lines[number]
+        rule = line.rule
+        if rule is None:
+            if line.conclusion in self.assumptions:
+                return None
+            return 'not an assumption of the statement'
+        justification = line.justification
+        if justification is None:
+            return 'no justification'
+        if type(rule) is not int or not 0 <= rule < len(self.matchers):
+            return 'no inference rule ' + str(rule)
+        if len(justification) != self.arities[rule]:
+            return 'inference rule %d takes %d assumptions, not %d' % \
+                   (rule, self.arities[rule], len(justification))
+        for index in justification:
+            if type(index) is not int or not 0 <= index < number:
+                return 'line %s is not a previous line' % (index,)
+        matches = self.matchers[rule]
+        count = len(justification)
+        if count == 0:
+            valid = matches(line.conclusion)
+        elif count == 1:
+            valid = matches(line.conclusion, lines[justification[0]].conclusion)
+        elif count == 2:
+            valid = matches(line.conclusion, lines[justification[0]].conclusion,
+                            lines[justification[1]].conclusion)
+        else:
+            valid = matches(line.conclusion, *[lines[index].conclusion for index in justification])
+        return None if valid else 'not an instance of inference rule ' + str(rule)
+
+    def first_error(self, lines, workers=None):
+        """ Return None if the given lines are a valid proof of the statement,
+            and otherwise a pair of the number of the first invalid line and
+            the reason why it is invalid. If every line is valid but the lines
+            do not prove the statement, the number is None. If a number of
+            workers is given, the lines are checked in a pool of that many
+            processes """
+        if workers is not None and workers > 1:
+            error = _first_error_in_parallel(self.statement, self.rules, lines, workers)
+            if error is not None:
+                return error
+        else:
+            for number in range(len(lines)):
+                reason = self.check_line(lines, number)
+                if reason is not None:
+                    return number, reason
+        return self.final_error(lines)
+
+    def final_error(self, lines):
+        """ Return None if the given lines, each of which is valid, prove the
+            statement, and otherwise a pair of None and the reason why not """
+        if len(lines) == 0:
+            if self.conclusion == Formula('T') or self.conclusion == Formula('~', Formula('F')):
+                return None
+            return None, 'no lines'
+        if lines[-1].conclusion != self.conclusion:
+            return None, 'the last line is not the conclusion of the statement'
+        return None
+
+
+class IncrementalValidator:
+    """ Validates a proof whose lines (and rules) may grow by being appended
+        to, checking every line only once. The lines and rules already
+        checked should not be changed """
+
+    def __init__(self, proof):
+        self.proof = proof
+        self.validator = ProofValidator(proof.statement, proof.rules)
+        self.rule_count = len(proof.rules)
+        self.checked = 0
+        self.error = None
+
+    def first_error(self):
+        """ Return the first error in the proof, as ProofValidator.first_error
+            does, checking only the lines appended since the last call """
+        if len(self.proof.rules) != self.rule_count:
+            self.validator = ProofValidator(self.proof.statement, self.proof.rules)
+            self.rule_count = len(self.proof.rules)
+        lines = self.proof.lines
+        while self.error is None and self.checked < len(lines):
+            reason = self.validator.check_line(lines, self.checked)
+            if reason is None:
+                self.checked += 1
+            else:
+                self.error = self.checked, reason
+        if self.error is not None:
+            return self.error
+        return self.validator.final_error(lines)
+
+    def is_valid(self):
+        """ Return whether the proof is valid """
+        return self.first_error() is None
+
+
+class _Rule:
+    """ The assumptions and conclusion of a rule or line, as rebuilt by a
+        worker process """
+
+    def __init__(self, assumptions, conclusion):
+        self.assumptions = assumptions
+        self.conclusion = conclusion
+
+
+class _Line:
+    def __init__(self, conclusion, rule, justification):
+        self.conclusion = conclusion
+        self.rule = rule
+        self.justification = justification
+
+
+def _table(statement, rules, lines):
+    """ Return a picklable table of the given statement, rules and lines, in
+        which all their formulae are stored once in a FormulaArena and are
+        referred to by their indices there """
+    formulae = list(statement.assumptions) + [statement.conclusion]
+    for rule in rules:
+        formulae.extend(rule.assumptions)
+        formulae.append(rule.conclusion)
+    formulae.extend(line.conclusion for line in lines)
+    arena = FormulaArena()
+    roots = iter(arena.add_many(formulae))
+
+    def rule_table(rule):
+        return [next(roots) for assumption in rule.assumptions], next(roots)
+
+    return arena, rule_table(statement), [rule_table(rule) for rule in rules], \
+           [(next(roots), line.rule, line.justification) for line in lines]
+
+
+_worker_validator = None
+_worker_lines = None
+
+
+def _start_worker(table):
+    """ Rebuild the formulae, the validator and the lines of the given table
+        in a worker process """
+    global _worker_validator, _worker_lines
+    arena, statement, rules, lines = table
+    nodes = []
+    for index in range(len(arena)):
+        nodes.append(Formula(arena.root(index), *[nodes[operand] for operand in arena.operands(index)]))
+
+    def rule_from_table(rule):
+        assumptions, conclusion = rule
+        return _Rule([nodes[assumption] for assumption in assumptions], nodes[conclusion])
+
+    _worker_validator = ProofValidator(rule_from_table(statement), [rule_from_table(rule) for rule in rules])
+    _worker_lines = [_Line(nodes[conclusion], rule, justification) for conclusion, rule, justification in lines]
+
+
+def _check_range(task):
+    start, end = task
+    for number in range(start, end):
+        reason = _worker_validator.check_line(_worker_lines, number)
+        if reason is not None:
+            return number, reason
+    return None
+
+
+def _first_error_in_parallel(statement, rules, lines, workers):
+    """ Return the first invalid line of the given lines and the reason why
+        it is invalid, or None if they are all valid. The lines are split into
+        ranges, about RANGES_PER_WORKER per worker, which are checked in a
+        pool of the given number of processes, each of which gets a table of
+        the statement, rules and lines once. The ranges are collected in
+        order, and all processes are terminated as soon as an invalid line is
+        found before which all lines are known to be valid """
+    count = min(len(lines), RANGES_PER_WORKER * workers)
+    if count == 0:
+        return None
+    bounds = [len(lines) * position // count for position in range(count + 1)]
+    with Pool(workers, _start_worker, (_table(statement, rules, lines),)) as pool:
+        for error in pool.imap(_check_range, zip(bounds, bounds[1:])):
+            if error is not None:
+                return error
+    return None
@@ -0,0 +1,93 @@
+""" (c) This file is part of the course
+    Mathematical Logic through Programming
+    by Gonczarowski and Nisan.
+    File name: code/propositions/validation_test.py """
+
+from propositions.syntax import *
+from propositions.proofs import *
+from propositions.validation import *
+
+
+def test_compile_rule(debug=False):
+    rule = InferenceRule([Formula.from_infix('p'), Formula.from_infix('(p->q)')], Formula.from_infix('q'))
+    for assumptions, conclusion in [[['x', '(x->y)'], 'y'], [['(x|y)', '((x|y)->~z)'], '~z'],
+                                    [['x', '(y->z)'], 'z'], [['x', '(x|z)'], 'z'], [['x', '(x->F)'], 'F'],
+                                    [['(T&x)', '((T&x)->(T&x))'], '(T&x)'], [['x', '(x->y)'], 'x']]:
+        instance = InferenceRule([Formula.from_infix(assumption) for assumption in assumptions],
+                                 Formula.from_infix(conclusion))
+        if debug:
+            print('Testing whether', instance, 'is an instance of', rule)
+        assert compile_rule(rule)(instance.conclusion, *instance.assumptions) == instance.is_instance_of(rule)
+    rule = InferenceRule([], Formula.from_infix('((T?p:~p)<->(p-&F))'))
+    assert compile_rule(rule)(Formula.from_infix('((T?(x|y):~(x|y))<->((x|y)-&F))'))
+    assert not compile_rule(rule)(Formula.from_infix('((F?(x|y):~(x|y))<->((x|y)-&F))'))
+    assert not compile_rule(rule)(Formula.from_infix('((T?(x|y):~(x|z))<->((x|y)-&F))'))
+
+
+def test_first_error(debug=False):
+    statement = InferenceRule([Formula.from_infix('(x|y)')], Formula.from_infix('(y|x)'))
+    rules = [InferenceRule([Formula.from_infix('(p|q)')], Formula.from_infix('(q|p)')),
+             InferenceRule([Formula.from_infix('p'), Formula.from_infix('(p->q)')], Formula.from_infix('q'))]
+    for lines, error in [[[['(x|y)']], (None, 'the last line is not the conclusion of the statement')],
+                         [[['(x|y)'], ['(y|x)', 0, [0]]], None],
+                         [[['(y|x)']], (0, 'not an assumption of the statement')],
+                         [[['(x|y)'], ['(y|x)', 2, [0]]], (1, 'no inference rule 2')],
+                         [[['(x|y)'], ['(y|x)', 0, None]], (1, 'no justification')],
+                         [[['(x|y)'], ['(y|x)', 0, [0, 0]]], (1, 'inference rule 0 takes 1 assumptions, not 2')],
+                         [[['(x|y)'], ['(y|x)', 0, [1]]], (1, 'line 1 is not a previous line')],
+                         [[['(x|y)'], ['(x|y)', 0, [0]], ['(y|x)', 0, [0]]],
+                          (1, 'not an instance of inference rule 0')],
+                         [[], (None, 'no lines')]]:
+        proof = DeductiveProof(statement, rules, [DeductiveProof.Line(Formula.from_infix(line[0]), *line[1:])
+                                                  for line in lines])
+        if debug:
+            print('Testing the first error of the following deductive proof:\n' + str(proof))
+        assert proof.first_error() == error
+        assert proof.is_valid() == (error is None)
+    proof = DeductiveProof(InferenceRule([], Formula.from_infix('~F')), rules, [])
+    assert proof.first_error() is None
+
+
+def test_parallel_validation(debug=False):
+    statement = InferenceRule([Formula.from_infix('(x|y)')], Formula.from_infix('(x|y)'))
+    rules = [InferenceRule([Formula.from_infix('(p|q)')], Formula.from_infix('(q|p)'))]
+    lines = [DeductiveProof.Line(Formula.from_infix('(x|y)'))]
+    for line in range(100):
+        lines.append(DeductiveProof.Line(Formula.from_infix('(y|x)' if line % 2 == 0 else '(x|y)'), 0, [line]))
+    proof = DeductiveProof(statement, rules, lines)
+    for workers in [None, 1, 2, 3]:
+        if debug:
+            print('Testing the validation of a proof of', len(lines), 'lines with', workers, 'workers')
+        assert proof.is_valid(workers)
+    lines[70].justification = [68]
+    lines[90].conclusion = Formula.from_infix('(x|x)')
+    for workers in [None, 2, 3]:
+        assert proof.first_error(workers) == (70, 'not an instance of inference rule 0')
+    lines[70].justification = [69]
+    for workers in [None, 2, 3]:
+        assert proof.first_error(workers) == (90, 'not an instance of inference rule 0')
+    del lines[90:]
+    for workers in [None, 2, 3]:
+        assert proof.first_error(workers) == (None, 'the last line is not the conclusion of the statement')
+
+
+def test_incremental_validator(debug=False):
+    statement = InferenceRule([Formula.from_infix('(x|y)')], Formula.from_infix('(x|y)'))
+    proof = DeductiveProof(statement, [InferenceRule([Formula.from_infix('(p|q)')], Formula.from_infix('(q|p)'))],
+                           [])
+    validator = IncrementalValidator(proof)
+    assert validator.first_error() == (None, 'no lines')
+    proof.lines.append(DeductiveProof.Line(Formula.from_infix('(x|y)')))
+    assert validator.is_valid()
+    proof.lines.append(DeductiveProof.Line(Formula.from_infix('(y|x)'), 0, [0]))
+    assert validator.first_error() == (None, 'the last line is not the conclusion of the statement')
+    assert validator.checked == 2
+    proof.rules.append(InferenceRule([], Formula.from_infix('(p|q)')))
+    proof.lines.append(DeductiveProof.Line(Formula.from_infix('(x|y)'), 1, []))
+    assert validator.is_valid()
+    proof.lines.append(DeductiveProof.Line(Formula.from_infix('(z|y)'), 0, [3]))
+    proof.lines.append(DeductiveProof.Line(Formula.from_infix('(x|y)'), 1, []))
+    if debug:
+        print('Testing the incremental validation of the following proof:\n' + str(proof))
+    assert validator.first_error() == (3, 'line 3 is not a previous line')
+    assert validator.checked == 3